@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class AnalysisJob:
+    def __init__(self, name, fn, period, budget=None):
+        self.name = name
+        self.fn = fn
+        self.period = period      # 실행 주기 (초)
+        self.budget = budget      # 한 번 실행에 허용하는 CPU 시간 (초), None이면 제한 없음
+        self.next_due = 0.0
+        self.running = False
+        self.runs = 0
+        self.coalesced = 0        # 이전 실행이 끝나지 않아 합쳐진(건너뛴) 횟수
+        self.over_budget = 0
+        self.last_cpu = 0.0
+
+
+class AnalysisScheduler(QObject):
+    """Runs periodic analysis jobs on a thread pool, off the GUI thread.
+
+    Each job has a period and an optional CPU budget per run. A job is never
+    queued behind itself: if it is still running (or several periods overdue)
+    when it comes due, the missed runs are coalesced into the next one. A run
+    that uses more CPU than its budget stretches the following delay by the
+    same ratio, so a slow analysis backs off instead of starving the others.
+    Results and errors come back through Qt signals on the receiver's thread.
+    """
+
+    # (작업 이름, fn 결과); fn이 None을 반환하면 보내지 않음
+    result_ready = pyqtSignal(str, object)
+    error = pyqtSignal(str, str)
+
+    def __init__(self, max_workers=2):
+        super().__init__()
+        self.max_workers = max_workers
+        self.jobs = {}
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._pool = None
+
+    def add_job(self, name, fn, period, budget=None, delay=None):
+        job = AnalysisJob(name, fn, period, budget)
+        job.next_due = time.monotonic() + (period if delay is None else delay)
+        with self._cond:
+            self.jobs[name] = job
+            self._cond.notify()
+        return job
+
+    def remove_job(self, name):
+        with self._cond:
+            self.jobs.pop(name, None)
+
+    def start(self):
+        self._running = True
+        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="analysis")
+        self._thread = threading.Thread(target=self._run, name="analysis-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _run(self):
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                for job in self.jobs.values():
+                    if job.next_due > now:
+                        continue
+                    if job.running:
+                        # 아직 실행 중: 밀린 실행은 쌓지 않고 다음 주기로 합침
+                        job.coalesced += 1
+                        job.next_due = now + job.period
+                        continue
+                    missed = int((now - job.next_due) // job.period)
+                    job.coalesced += missed
+                    job.next_due += (missed + 1) * job.period
+                    job.running = True
+                    self._pool.submit(self._execute, job)
+                wait = min((job.next_due for job in self.jobs.values()), default=now + 1.0) - now
+                self._cond.wait(max(wait, 0.001))
+
+    def _execute(self, job):
+        start = time.thread_time()
+        try:
+            result = job.fn()
+        except Exception as e:
+            result = None
+            self.error.emit(job.name, str(e))
+        cpu = time.thread_time() - start
+        with self._cond:
+            job.running = False
+            job.runs += 1
+            job.last_cpu = cpu
+            if job.budget is not None and cpu > job.budget:
+                # 예산 초과: 다음 실행을 초과 비율만큼 늦춤
+                job.over_budget += 1
+                job.next_due = max(job.next_due, time.monotonic() + job.period * cpu / job.budget)
+        if result is not None:
+            self.result_ready.emit(job.name, result)
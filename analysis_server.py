@@ -0,0 +1,559 @@
+import argparse
+import asyncio
+import bisect
+import json
+import multiprocessing
+import socket
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+import settings
+from instrumentation import get_logger, table_cell
+from note_table import note_to_hz
+from pitch_estimators import create_estimator
+from resampler import StreamingResampler
+from ring_buffer import RingBuffer
+from voice_activity import GatedEstimator
+from voice_quality import StreamingJitterShimmer, analyze_voice
+
+log = get_logger('analysis_server')
+
+DEFAULT_PORT = 8765
+FMIN = note_to_hz('C2')
+FMAX = note_to_hz('C6')
+# 클라이언트 -> 서버 메시지: 종류 1바이트 + 길이(uint32 LE) + 내용
+HEADER = struct.Struct('<cI')
+HELLO, AUDIO, PRAAT, STATS, END = b'H', b'A', b'P', b'S', b'E'
+MAX_MESSAGE = 1 << 20
+RING_SECONDS = 4.0       # 세션별 오디오 링 (분석이 이보다 밀리면 건너뜀)
+PRAAT_SECONDS = 3.0      # Praat 요청 시 분석하는 최근 구간
+MAX_SESSIONS = 64
+MAX_BATCH = 512          # CREPE 한 번에 추론하는 최대 프레임 수
+MAX_DELAY = 0.02         # 가장 오래 기다린 요청 기준 배치 마감 시간 (초)
+CLIENT_BLOCK = 1024      # 합성 클라이언트가 한 번에 보내는 샘플 수
+
+# 백엔드별 세션 설정 (CREPE는 16 kHz 고정)
+BACKEND_OPTIONS = {
+    'crepe': dict(sr=16000, hop_length=160, viterbi=True),
+    'pyin': dict(sr=22050, frame_length=2048, hop_length=512),
+    'yin': dict(sr=16000, frame_length=1024, hop_length=160),
+    'numba_yin': dict(sr=16000, frame_length=1024, hop_length=160),
+}
+
+
+class FrameBatcher:
+    """Shares one CREPE model between sessions by batching their frames.
+
+    Stands in for ``CrepeBackend`` inside each session's ``StreamingCREPE``:
+    ``activation(frames)`` queues the frames and blocks the calling session
+    thread until its rows come back. A single model thread takes everything
+    queued and runs it as one batch once ``max_batch`` frames are waiting,
+    every session currently analysing (``begin`` / ``end``) has queued its
+    frames, or the oldest request has waited ``max_delay`` seconds, whichever
+    comes first; the batch size therefore follows the load.
+    """
+
+    def __init__(self, backend, max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.running = 0
+        self.batches = 0
+        self.frames = 0
+        self.waited = 0.0
+        self._queue = []
+        self._queued = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='crepe-batcher', daemon=True)
+        self._thread.start()
+
+    def begin(self):
+        with self._cond:
+            self.running += 1
+
+    def end(self):
+        with self._cond:
+            self.running -= 1
+            self._cond.notify()
+
+    def activation(self, frames):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("batcher is closed")
+            self._queue.append((np.asarray(frames, dtype=np.float32), future, time.perf_counter()))
+            self._queued += len(frames)
+            self._cond.notify()
+        return future.result()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _ready(self):
+        # 배치를 마감할 조건 (락 안에서 호출)
+        if not self._queue:
+            return False
+        return (self._queued >= self.max_batch or len(self._queue) >= self.running
+                or time.perf_counter() >= self._queue[0][2] + self.max_delay)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._ready():
+                    timeout = self._queue[0][2] + self.max_delay - time.perf_counter() if self._queue else None
+                    self._cond.wait(timeout)
+                if self._closed and not self._queue:
+                    return
+                # 요청 단위로 max_batch까지 (요청 하나가 더 커도 최소 하나는 가져감)
+                batch, n = [], 0
+                while self._queue and (not batch or n + len(self._queue[0][0]) <= self.max_batch):
+                    request = self._queue.pop(0)
+                    batch.append(request)
+                    n += len(request[0])
+                self._queued -= n
+
+            started = time.perf_counter()
+            try:
+                activation = self.backend.activation(np.concatenate([frames for frames, _, _ in batch]))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.frames += n
+            self.waited += sum(started - queued for _, _, queued in batch)
+            offset = 0
+            for frames, future, _ in batch:
+                future.set_result(activation[offset:offset + len(frames)])
+                offset += len(frames)
+
+
+class Session:
+    # 클라이언트 한 명의 스트림: 링 버퍼 -> 게이트 -> 피치 추정 (-> 발성 분석)
+    def __init__(self, number, estimator, voice_quality=False, input_rate=None):
+        self.number = number
+        self.sr = estimator.sr
+        self.ring = RingBuffer(int(RING_SECONDS * self.sr))
+        # 클라이언트가 다른 레이트로 보내면 세션마다 스트리밍 리샘플러로 백엔드 레이트에 맞춤
+        self.resampler = None
+        if input_rate and input_rate != self.sr:
+            self.resampler = StreamingResampler(input_rate, self.sr)
+        self.tracker = GatedEstimator(estimator)
+        self.quality = StreamingJitterShimmer(self.sr) if voice_quality else None
+        self.ending = False
+        self.frames = 0
+
+    def write(self, samples):
+        if self.resampler is not None:
+            samples = self.resampler.process(samples)
+        self.ring.write(samples)
+
+    def analyze(self):
+        # 풀 스레드에서 호출; 링에는 이벤트 루프가 계속 씀
+        total = self.ring.total
+        return total, self._update(self.tracker.process(self.ring))
+
+    def finish(self):
+        return self.ring.total, self._update(self.tracker.flush())
+
+    def praat(self):
+        window = np.array(self.ring.latest(min(self.ring.total, int(PRAAT_SECONDS * self.sr))), dtype=np.float64)
+        return analyze_voice(window, self.sr)
+
+    def _update(self, frames):
+        self.frames += len(frames.frame)
+        if self.quality is not None and len(frames.frame):
+            try:
+                self.quality.update(self.ring, frames)
+            except Exception as e:
+                log.warning("voice quality error (session %d): %s", self.number, e)
+                self.quality.reset()
+        return frames
+
+    def message(self, total, frames):
+        # 피치 결과 한 줄: until은 분석을 시작할 때까지 받은 샘플 수 (지연 측정용)
+        message = dict(type='pitch', until=int(total), frame=int(frames.frame[0]) if len(frames.frame) else None,
+                       f0=np.round(np.nan_to_num(frames.f0), 2).tolist(), voiced=frames.voiced.tolist(),
+                       confidence=np.round(frames.confidence, 3).tolist())
+        if self.quality is not None:
+            message.update(jitter=_number(self.quality.jitter()), shimmer=_number(self.quality.shimmer()))
+        return message
+
+
+def _number(value):
+    return None if value != value else round(float(value), 4)
+
+
+async def read_message(reader):
+    kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_MESSAGE:
+        raise ValueError(f"message too large: {length} bytes")
+    return kind, await reader.readexactly(length)
+
+
+def write_message(writer, kind, payload=b''):
+    writer.write(HEADER.pack(kind, len(payload)) + payload)
+
+
+def send(writer, message):
+    writer.write(json.dumps(message).encode() + b'\n')
+
+
+class AnalysisServer:
+    """Pitch and voice analysis for many concurrent audio streams over TCP.
+
+    A client connects, sends ``HELLO`` (JSON: optional ``sr`` of the audio it
+    will send, resampled per session if it differs from the backend's, and
+    ``voice_quality``) and gets a ``ready`` line back, then streams float32
+    mono ``AUDIO`` messages; the server answers with one JSON line per
+    analysis pass (``pitch``: frames since the last pass, plus streaming
+    jitter/shimmer), a ``praat`` line for each ``PRAAT`` request (Praat
+    ``analyze_voice`` over the last ``PRAAT_SECONDS``) and an ``end`` line
+    after ``END``. Each session runs the same gated streaming estimator as the
+    apps on a shared thread pool; new audio that arrives while a session is
+    being analysed is picked up by its next pass. With the CREPE backend all
+    sessions share one model through ``FrameBatcher``.
+    """
+
+    def __init__(self, backend='crepe', max_sessions=MAX_SESSIONS, max_batch=MAX_BATCH, max_delay=MAX_DELAY,
+                 **options):
+        self.backend = backend
+        self.options = dict(BACKEND_OPTIONS.get(backend, {}), **options)
+        self.sr = self.options.pop('sr', 16000)
+        self.max_sessions = max_sessions
+        self.batcher = None
+        if backend == 'crepe':
+            from crepe_backend import get_backend
+            self.batcher = FrameBatcher(get_backend(), max_batch, max_delay)
+            self.options['backend'] = self.batcher
+        # 세션마다 분석 한 번 + Praat 요청용 여유 (CREPE 세션은 배치를 기다리며 스레드를 잡고 있음)
+        self.pool = ThreadPoolExecutor(max_sessions + 4, thread_name_prefix='session')
+        self.sessions = {}
+        self._numbers = 0
+        self.warm_up()
+
+    def warm_up(self):
+        # listen 전에 모델 로딩/JIT 컴파일/Praat을 끝내 첫 세션이 그 비용을 떠안지 않게 함
+        # (CREPE는 배처가 아닌 같은 모델로 직접 예열; 모델은 get_backend가 프로세스당 하나로 캐시)
+        from startup import prewarm
+        options = {key: value for key, value in self.options.items() if key != 'backend'}
+        timings = prewarm(self.backend, self.sr, dict(fmin=FMIN, fmax=FMAX, **options), praat=True)
+        log.info("🔥 예열 완료 (%s)", ", ".join(f"{key} {value:.2f} s" for key, value in timings.items()))
+
+    def create_session(self, config):
+        if len(self.sessions) >= self.max_sessions:
+            raise ValueError(f"server is full ({self.max_sessions} sessions)")
+        estimator = create_estimator(self.backend, sr=self.sr, fmin=FMIN, fmax=FMAX, **self.options)
+        self._numbers += 1
+        session = Session(self._numbers, estimator, bool(config.get('voice_quality')), config.get('sr'))
+        self.sessions[session.number] = session
+        return session
+
+    def stats(self):
+        # 벤치마크용: 프로세스 CPU 시간과 배치 통계
+        batcher = self.batcher
+        return dict(type='stats', backend=self.backend, sr=self.sr, sessions=len(self.sessions),
+                    cpu=time.process_time(), wall=time.perf_counter(),
+                    batches=batcher.batches if batcher else 0, batch_frames=batcher.frames if batcher else 0,
+                    batch_wait=batcher.waited if batcher else 0.0)
+
+    async def _run(self, session, fn):
+        if self.batcher is not None:
+            self.batcher.begin()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn)
+        finally:
+            if self.batcher is not None:
+                self.batcher.end()
+
+    async def _analyze_loop(self, session, pending, writer):
+        # 새 오디오가 올 때마다 한 번씩 (분석 중에 온 블록은 다음 번에 모아서)
+        while not session.ending or pending.is_set():
+            await pending.wait()
+            pending.clear()
+            total, frames = await self._run(session, session.analyze)
+            if len(frames.frame):
+                send(writer, session.message(total, frames))
+                await writer.drain()
+
+    async def _praat(self, session, writer):
+        try:
+            jitter, shimmer = await asyncio.get_running_loop().run_in_executor(self.pool, session.praat)
+            send(writer, dict(type='praat', until=int(session.ring.total),
+                              jitter=_number(jitter), shimmer=_number(shimmer)))
+        except Exception as e:
+            send(writer, dict(type='error', message=f"praat: {e}"))
+
+    async def handle(self, reader, writer):
+        session = None
+        analyzer = None
+        praats = []     # 진행 중인 Praat 요청
+        try:
+            kind, payload = await read_message(reader)
+            if kind == STATS:
+                send(writer, self.stats())
+                return
+            if kind != HELLO:
+                raise ValueError("expected HELLO")
+            try:
+                session = self.create_session(json.loads(payload or b'{}'))
+            except ValueError as e:
+                send(writer, dict(type='error', message=str(e)))
+                return
+            send(writer, dict(type='ready', session=session.number, sr=self.sr, backend=self.backend,
+                              hop=session.tracker.hop_length, latency=int(session.tracker.latency())))
+            log.info("🔌 세션 %d 연결 (%d개 접속 중)", session.number, len(self.sessions))
+
+            pending = asyncio.Event()
+            analyzer = asyncio.create_task(self._analyze_loop(session, pending, writer))
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == AUDIO:
+                    session.write(np.frombuffer(payload, dtype='<f4'))
+                    pending.set()
+                elif kind == PRAAT:
+                    praats.append(asyncio.create_task(self._praat(session, writer)))
+                elif kind == STATS:
+                    send(writer, self.stats())
+                elif kind == END:
+                    break
+                if analyzer.done():
+                    break  # 분석 중 오류 (아래에서 다시 올림)
+
+            session.ending = True
+            pending.set()
+            await analyzer
+            total, frames = await self._run(session, session.finish)
+            if len(frames.frame):
+                send(writer, session.message(total, frames))
+            # 아직 도는 Praat 요청의 응답을 보낸 뒤에 end (END 직전의 PRAAT도 답을 받음)
+            await asyncio.gather(*praats)
+            send(writer, dict(type='end', frames=int(session.frames), skipped=int(session.tracker.skipped)))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # 클라이언트가 먼저 끊음
+        except Exception as e:
+            log.error("session %s error: %s", session.number if session else '-', e)
+            send(writer, dict(type='error', message=str(e)))
+        finally:
+            if analyzer is not None and not analyzer.done():
+                analyzer.cancel()
+            for task in praats:
+                task.cancel()   # 끝난 작업에는 영향 없음
+            if session is not None:
+                del self.sessions[session.number]
+                log.info("👋 세션 %d 종료 (프레임 %d개)", session.number, session.frames)
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        log.info("🎧 분석 서버 %s:%d (backend=%s, sr=%d)", host, port, self.backend, self.sr)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+        self.pool.shutdown(wait=False)
+
+
+# ---------------------------------------------------------------- 합성 클라이언트
+
+async def run_client(audio, host='127.0.0.1', port=DEFAULT_PORT, block=CLIENT_BLOCK, speed=1.0,
+                     voice_quality=False, praat=False, sr=None):
+    """Stream ``audio`` to the server like a live microphone and time the replies.
+
+    Blocks are paced at ``speed`` times real time (``0`` = as fast as
+    possible). The latency of a ``pitch`` reply is measured from the moment
+    the block that completed its input was sent. ``sr`` is the rate of
+    ``audio`` if it is not the server's.
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_MESSAGE)
+    hello = dict(voice_quality=voice_quality)
+    if sr is not None:
+        hello['sr'] = sr
+    write_message(writer, HELLO, json.dumps(hello).encode())
+    ready = json.loads(await reader.readline())
+    if ready['type'] != 'ready':
+        writer.close()
+        raise RuntimeError(ready.get('message', ready))
+    server_sr = ready['sr']
+    sr = sr or server_sr
+    positions, sent = [], []    # 보낸 블록의 끝 위치(입력 샘플)와 보낸 시각
+    latencies, replies = [], []
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("server closed the connection")
+            message = json.loads(line)
+            replies.append(message)
+            if message['type'] == 'pitch':
+                # 서버 레이트의 until을 입력 위치로 바꿔 그 입력을 끝낸 블록을 찾음
+                index = bisect.bisect_left(positions, message['until'] * sr / server_sr - 1e-6)
+                if index < len(positions):
+                    latencies.append(time.perf_counter() - sent[index])
+            elif message['type'] in ('end', 'error'):
+                return message
+
+    receiver = asyncio.create_task(receive())
+    started = time.perf_counter()
+    audio = np.asarray(audio, dtype='<f4')
+    for position in range(0, len(audio), block):
+        if speed > 0:
+            delay = started + (position + block) / (sr * speed) - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        chunk = audio[position:position + block]
+        positions.append(position + len(chunk))
+        sent.append(time.perf_counter())
+        write_message(writer, AUDIO, chunk.tobytes())
+        await writer.drain()
+        if receiver.done():
+            break
+    if praat:
+        write_message(writer, PRAAT)
+    write_message(writer, END)
+    await writer.drain()
+    last = await receiver
+    writer.close()
+    if last['type'] == 'error':
+        raise RuntimeError(last['message'])
+    return dict(latencies=latencies, replies=replies, seconds=len(audio) / sr)
+
+
+async def server_stats(host='127.0.0.1', port=DEFAULT_PORT):
+    reader, writer = await asyncio.open_connection(host, port)
+    write_message(writer, STATS)
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+def synthetic_audio(sr, seconds, index):
+    # benchmark.py의 합성 목소리를 세션마다 돌려가며 (길이는 반복해서 맞춤)
+    from benchmark import SIGNALS
+    names = sorted(SIGNALS)
+    audio, _ = SIGNALS[names[index % len(names)]](sr)
+    repeats = int(np.ceil(seconds * sr / len(audio)))
+    return np.tile(audio, repeats)[:int(seconds * sr)].astype(np.float32)
+
+
+async def run_load(n_sessions, seconds, host='127.0.0.1', port=DEFAULT_PORT, speed=1.0, voice_quality=False):
+    """N synthetic clients at once; returns latency and server CPU use for the run."""
+    before = await server_stats(host, port)
+    clips = [synthetic_audio(before['sr'], seconds, i) for i in range(n_sessions)]
+    before = await server_stats(host, port)
+    results = await asyncio.gather(*(run_client(clip, host, port, speed=speed, voice_quality=voice_quality)
+                                     for clip in clips))
+    after = await server_stats(host, port)
+    latencies = np.concatenate([r['latencies'] for r in results]) * 1000
+    wall = after['wall'] - before['wall']
+    cores = (after['cpu'] - before['cpu']) / wall
+    batches = after['batches'] - before['batches']
+    batch_frames = after['batch_frames'] - before['batch_frames']
+    return dict(
+        sessions=n_sessions,
+        backend=before['backend'],
+        realtime=sum(r['seconds'] for r in results) / wall,
+        p50_ms=float(np.percentile(latencies, 50)) if len(latencies) else np.nan,
+        p95_ms=float(np.percentile(latencies, 95)) if len(latencies) else np.nan,
+        cores=cores,
+        # 서버가 쓴 코어 하나당 감당한 세션 수 (실시간 속도로 보낼 때 의미가 있음)
+        sessions_per_core=n_sessions / cores if cores > 0 else np.nan,
+        mean_batch=batch_frames / batches if batches else np.nan,
+        batch_wait_ms=(after['batch_wait'] - before['batch_wait']) / batch_frames * 1000 if batch_frames else np.nan,
+    )
+
+
+def _serve(host, port, backend, max_sessions, max_batch, max_delay):
+    server = AnalysisServer(backend, max_sessions=max_sessions, max_batch=max_batch, max_delay=max_delay)
+    try:
+        asyncio.run(server.serve(host, port))
+    finally:
+        server.close()
+
+
+def _wait_for_port(host, port, process, timeout=120.0):
+    # 서버 프로세스가 모델을 올리고 listen할 때까지 대기
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if not process.is_alive():
+            raise RuntimeError(f"server exited (code {process.exitcode})")
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"server did not start on {host}:{port}")
+
+
+def bench(args):
+    # 서버는 별도 프로세스에서 (클라이언트 부하가 서버 CPU 측정에 섞이지 않게)
+    process = None
+    if not args.connect:
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(target=_serve, daemon=True, name='vocalfry-server',
+                                  args=(args.host, args.port, args.backend, max(args.sessions), args.max_batch,
+                                        args.max_delay))
+        process.start()
+        _wait_for_port(args.host, args.port, process)
+    rows = []
+    try:
+        print(f"\n{'sessions':>8}{'x RT':>8}{'p50ms':>8}{'p95ms':>8}{'cores':>7}{'sess/core':>11}{'batch':>7}"
+              f"{'waitms':>8}")
+        for n in args.sessions:
+            row = asyncio.run(run_load(n, args.seconds, args.host, args.port, args.speed, args.voice_quality))
+            rows.append(row)
+            print(f"{n:>8}{row['realtime']:>8.1f}" + table_cell(row['p50_ms'], '.1f', 8)
+                  + table_cell(row['p95_ms'], '.1f', 8) + f"{row['cores']:>7.2f}"
+                  + table_cell(row['sessions_per_core'], '.1f', 11) + table_cell(row['mean_batch'], '.1f', 7)
+                  + table_cell(row['batch_wait_ms'], '.1f', 8), flush=True)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=1)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="여러 세션의 오디오 스트림을 받는 로컬 분석 서버")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="서버 실행")
+    load = commands.add_parser('bench', help="합성 클라이언트로 세션 수별 처리량 측정")
+    for sub in (serve, load):
+        sub.add_argument('--host', default='127.0.0.1')
+        sub.add_argument('--port', type=int, default=DEFAULT_PORT)
+        sub.add_argument('--backend', default=settings.PITCH_BACKEND or 'crepe', choices=sorted(BACKEND_OPTIONS))
+        sub.add_argument('--max-batch', type=int, default=MAX_BATCH, help="CREPE 배치 최대 프레임 수")
+        sub.add_argument('--max-delay', type=float, default=MAX_DELAY, help="CREPE 배치 마감 시간 (초)")
+    serve.add_argument('--max-sessions', type=int, default=MAX_SESSIONS)
+    load.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    load.add_argument('--seconds', type=float, default=10.0, help="세션마다 보내는 오디오 길이")
+    load.add_argument('--speed', type=float, default=1.0, help="전송 배속 (0이면 최대 속도)")
+    load.add_argument('--voice-quality', action='store_true', help="세션마다 스트리밍 jitter/shimmer도 계산")
+    load.add_argument('--connect', action='store_true', help="서버를 띄우지 않고 이미 실행 중인 서버에 접속")
+    load.add_argument('--output', help="결과를 저장할 JSON 파일")
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        return bench(args)
+    _serve(args.host, args.port, args.backend, args.max_sessions, args.max_batch, args.max_delay)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import settings
+from instrumentation import get_logger
+from pitch_frames import PitchFrames, frames_from_rows, frames_to_rows
+
+log = get_logger('audio_source')
+
+DEFAULT_BLOCKSIZE = 512      # 파일 재생 시 blocksize=0(가변)이면 쓰는 블록 크기
+RECORD_SECONDS = 600         # 녹음 파일을 미리 잡아두고, 모자라기 전에 이만큼씩 늘리는 길이
+GROW_CHECK_SECONDS = 0.5     # 녹음 파일의 남은 자리를 확인하는 주기 (오디오 콜백 밖의 스레드)
+MAX_AHEAD_SECONDS = 2.0      # speed=0 재생이 앱이 보고한 분석 위치보다 앞설 수 있는 길이
+STALL_SECONDS = 1.0          # 이만큼 분석 보고가 없으면 더 기다리지 않음 (record_frames를 부르지 않는 앱)
+FRAME_FIELDS = len(PitchFrames._fields)
+
+
+class AudioSource:
+    """Input stream interface shared by the live and offline sources.
+
+    Mirrors the part of ``sounddevice.InputStream`` the apps use: the callback
+    receives ``(indata, frames, time, status)`` with ``indata`` shaped
+    ``(frames, 1)`` float32, and ``start()`` / ``stop()`` / ``close()`` control
+    it. ``record_frames(frames)`` lets the app hand its pitch results to a
+    recorder; plain sources ignore it.
+    """
+
+    def __init__(self, callback, samplerate, blocksize=0):
+        self.callback = callback
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def close(self):
+        self.stop()
+
+    def record_frames(self, frames):
+        pass
+
+
+class MicrophoneSource(AudioSource):
+    def __init__(self, callback, samplerate, blocksize=0):
+        super().__init__(callback, samplerate, blocksize)
+        import sounddevice as sd
+        self.stream = sd.InputStream(
+            samplerate=samplerate,
+            blocksize=blocksize,
+            channels=1,
+            dtype='float32',
+            callback=callback
+        )
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+
+    def close(self):
+        self.stream.close()
+
+
+def device_rate():
+    # 기본 입력 장치가 리샘플링 없이 지원하는 레이트
+    import sounddevice as sd
+    return int(sd.query_devices(kind='input')['default_samplerate'])
+
+
+def capture_rate(samplerate):
+    # settings.CAPTURE_RATE에 따른 마이크 캡처 레이트
+    if not settings.CAPTURE_RATE:
+        return samplerate
+    if settings.CAPTURE_RATE == 'native':
+        try:
+            return device_rate()
+        except Exception as e:
+            log.warning("장치 기본 레이트를 알 수 없어 %d Hz로 캡처: %s", samplerate, e)
+            return samplerate
+    return int(settings.CAPTURE_RATE)
+
+
+class ResamplingSource(AudioSource):
+    """Runs another source at ``capture_rate`` and delivers ``samplerate`` blocks.
+
+    Each captured block goes through one ``StreamingResampler`` (filter state
+    carried across blocks), so the app callback sees a continuous stream at
+    its analysis rate with the same ``(indata, frames, time, status)``
+    signature; ``frames`` is the resampled block length, which varies by a
+    sample from block to block for non-integer ratios. The filter adds
+    ``resampler.latency`` capture samples of delay.
+    """
+
+    def __init__(self, inner_factory, callback, samplerate, capture_rate):
+        super().__init__(callback, samplerate)
+        from resampler import StreamingResampler
+        self.capture_rate = capture_rate
+        self.resampler = StreamingResampler(capture_rate, samplerate)
+        self.inner = inner_factory(self._callback)
+
+    def _callback(self, indata, frames, time_info, status):
+        out = self.resampler.process(indata[:, 0])
+        if len(out):
+            self.callback(out[:, np.newaxis], len(out), time_info, status)
+
+    def start(self):
+        self.inner.start()
+
+    def stop(self):
+        self.inner.stop()
+
+    def close(self):
+        self.inner.close()
+
+
+def load_audio(path, samplerate):
+    # WAV/FLAC 등은 soundfile로, 녹음 세션 폴더는 memmap으로 읽어 samplerate에 맞춤
+    if os.path.isdir(path):
+        audio, sr, _ = load_session(path)
+    else:
+        import soundfile as sf
+        audio, sr = sf.read(path, dtype='float32', always_2d=True)
+        audio = audio.mean(axis=1)
+    if sr != samplerate:
+        import librosa
+        audio = librosa.resample(np.asarray(audio), orig_sr=sr, target_sr=samplerate)
+    return np.asarray(audio, dtype=np.float32)
+
+
+class FileSource(AudioSource):
+    """Replays a file through the callback in fixed blocks from its own thread.
+
+    ``speed=1`` paces blocks like a live device (each block is delivered once
+    its last sample would have been captured), ``speed=4`` runs four times
+    faster, and ``speed=0`` runs as fast as the app keeps up: the apps only
+    copy blocks into a ring in the callback and analyse them later, so
+    replay waits whenever it is more than ``MAX_AHEAD_SECONDS`` ahead of the
+    last frame handed to ``record_frames`` (and stops waiting, with a
+    warning, if no frames arrive for ``STALL_SECONDS``). The block sequence is
+    identical at every speed, so runs are reproducible; the last block is
+    zero-padded like a device would deliver it.
+    """
+
+    def __init__(self, path, callback, samplerate, blocksize=0, speed=1.0):
+        super().__init__(callback, samplerate, blocksize or DEFAULT_BLOCKSIZE)
+        self.path = path
+        self.speed = speed
+        self.audio = load_audio(path, samplerate)
+        self.position = 0
+        self.consumed = 0      # 앱이 분석을 마쳤다고 보고한 위치 (샘플)
+        self.backpressure = speed <= 0
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._progress = threading.Condition()
+        self._thread = None
+
+    def record_frames(self, frames):
+        if len(frames.frame) == 0:
+            return
+        with self._progress:
+            self.consumed = max(self.consumed, int(frames.time[-1] * self.samplerate))
+            self._progress.notify_all()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="file-source", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._progress:
+            self._progress.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        block = self.blocksize
+        started = time.perf_counter()
+        first = self.position
+        while self.position < len(self.audio) and not self._stop.is_set():
+            chunk = self.audio[self.position:self.position + block]
+            if len(chunk) < block:
+                chunk = np.concatenate((chunk, np.zeros(block - len(chunk), dtype=np.float32)))
+            if self.speed > 0:
+                due = started + (self.position + block - first) / (self.samplerate * self.speed)
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            elif self.backpressure:
+                self._wait_for_consumer(self.position + block - int(MAX_AHEAD_SECONDS * self.samplerate))
+            self.callback(chunk[:, np.newaxis], block, None, None)
+            self.position += block
+        if self.position >= len(self.audio):
+            log.info("⏹ 재생 완료: %s", self.path)
+            self.finished.set()
+
+    def _wait_for_consumer(self, position):
+        # 앱이 position까지 분석했다고 보고할 때까지 대기 (링을 앞질러 덮어쓰지 않도록)
+        with self._progress:
+            if not self._progress.wait_for(lambda: self.consumed >= position or self._stop.is_set(),
+                                           STALL_SECONDS):
+                log.warning("⚠️ %.0fs 동안 분석 보고가 없어 최대 속도로 재생: %s", STALL_SECONDS, self.path)
+                self.backpressure = False
+
+
+class RecordingSource(AudioSource):
+    """Wraps another source and records its raw input plus the app's pitch frames.
+
+    A session is a directory with ``audio.f32`` (mono float32 samples),
+    ``frames.f64`` (one row per pitch frame: frame, time, f0, voiced,
+    confidence) and ``meta.json``. Both data files are preallocated
+    ``np.memmap``s of ``max_seconds``, so the audio callback only copies into
+    mapped pages and never allocates, resizes or issues a write call. A
+    background thread extends the audio file by another ``max_seconds`` while
+    at least half of that is still free and swaps in the larger mapping; if it
+    ever falls behind, the callback drops the overflow (counted in
+    ``dropped``) instead of waiting. The frames file grows the same way in
+    ``record_frames``, off the audio thread. ``close()`` trims both to the
+    recorded length. Sessions replay with ``FileSource`` / ``--source DIR``.
+    """
+
+    def __init__(self, inner_factory, path, callback, samplerate, max_seconds=RECORD_SECONDS):
+        super().__init__(callback, samplerate)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.audio_step = int(max_seconds * samplerate)
+        self.frames_step = int(max_seconds * 200)
+        self.audio = np.memmap(os.path.join(path, 'audio.f32'), dtype=np.float32, mode='w+',
+                               shape=(self.audio_step,))
+        self.frames = np.memmap(os.path.join(path, 'frames.f64'), dtype=np.float64, mode='w+',
+                                shape=(self.frames_step, FRAME_FIELDS))
+        self.n_samples = 0
+        self.n_frames = 0
+        self.dropped = 0
+        self.growable = True
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stop_growing = threading.Event()
+        self.inner = inner_factory(self._callback)
+        self._grower = threading.Thread(target=self._grow_audio, name='recording-grow', daemon=True)
+        self._grower.start()
+
+    def _grow(self, attr, name, rows):
+        # 파일을 rows행만큼 늘린 새 매핑으로 바꿔 끼움 (memmap이 파일 끝을 늘림)
+        # 기존 매핑은 닫지 않으므로 그 사이 콜백이 쓰던 배열도 그대로 유효하고, 같은 파일이라 쓴 내용도 공유됨
+        # (매핑이 열린 파일을 자르는 것만 Windows에서 안 되므로 자르기는 모든 매핑을 놓은 close에서)
+        path = os.path.join(self.path, name)
+        array = getattr(self, attr)
+        shape = (len(array) + rows,) + array.shape[1:]
+        try:
+            setattr(self, attr, np.memmap(path, dtype=array.dtype, mode='r+', shape=shape))
+            log.info("💾 녹음 파일 확장: %s (%d행)", path, shape[0])
+        except OSError as e:
+            # 더 늘릴 수 없으면 지금 매핑을 그대로 쓰고 이후 입력은 버림 (dropped에 기록)
+            log.error("녹음 파일을 늘리지 못해 이후 입력은 저장하지 않음: %s", e)
+            self.growable = False
+
+    def _grow_audio(self):
+        # 오디오 콜백 밖에서: 남은 자리가 step의 절반(확인 주기 몇 번 분량 이상) 아래로 내려가면 미리 늘림
+        margin = max(self.audio_step // 2, int(4 * GROW_CHECK_SECONDS * self.samplerate))
+        while not self._stop_growing.wait(GROW_CHECK_SECONDS):
+            while self.growable and len(self.audio) - self.n_samples < margin:
+                self._grow('audio', 'audio.f32', max(self.audio_step, margin))
+
+    def _callback(self, indata, frames, time_info, status):
+        # 미리 늘려 둔 매핑에 복사만 함; 자리가 모자라면 기다리지 않고 버림 (늘리기는 _grow_audio 스레드)
+        audio = self.audio
+        n = min(len(indata), len(audio) - self.n_samples)
+        audio[self.n_samples:self.n_samples + n] = indata[:n, 0]
+        self.n_samples += n
+        self.dropped += len(indata) - n
+        self.callback(indata, frames, time_info, status)
+
+    def record_frames(self, frames):
+        with self._lock:
+            if self._closed:
+                return
+            if self.growable and self.n_frames + len(frames.frame) > len(self.frames):
+                self._grow('frames', 'frames.f64', max(self.frames_step, len(frames.frame)))
+            n = min(len(frames.frame), len(self.frames) - self.n_frames)
+            if n > 0:
+                self.frames[self.n_frames:self.n_frames + n] = frames_to_rows(frames)[:n]
+                self.n_frames += n
+        self.inner.record_frames(frames)
+
+    def start(self):
+        self.inner.start()
+
+    def stop(self):
+        self.inner.stop()
+
+    def close(self):
+        self.inner.close()
+        self._stop_growing.set()
+        self._grower.join()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.audio.flush()
+            self.frames.flush()
+            del self.audio, self.frames
+            os.truncate(os.path.join(self.path, 'audio.f32'), self.n_samples * 4)
+            os.truncate(os.path.join(self.path, 'frames.f64'), self.n_frames * FRAME_FIELDS * 8)
+            with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+                json.dump(dict(samplerate=self.samplerate, samples=self.n_samples, frames=self.n_frames,
+                               dropped=self.dropped), f)
+        log.info("💾 녹음 저장: %s (%.1fs, 프레임 %d개)", self.path, self.n_samples / self.samplerate, self.n_frames)
+
+
+def load_session(path):
+    # 녹음 세션 -> (오디오 memmap, samplerate, PitchFrames)
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    audio = np.memmap(os.path.join(path, 'audio.f32'), dtype=np.float32, mode='r', shape=(meta['samples'],))
+    frames = frames_from_rows(np.fromfile(os.path.join(path, 'frames.f64'), dtype=np.float64))
+    return audio, meta['samplerate'], frames
+
+
+def open_source(callback, samplerate, blocksize=0, source=None, speed=1.0, record=None):
+    # source: None이면 마이크, 파일/세션 경로면 재생; record: 세션을 저장할 폴더
+    def factory(cb):
+        if source:
+            return FileSource(source, cb, samplerate, blocksize, speed=speed)
+        rate = capture_rate(samplerate)
+        if rate != samplerate:
+            # 장치 레이트로 캡처하고 앱 레이트로 변환 (블록 길이도 같은 시간 길이로 맞춤)
+            log.info("🎚 %d Hz로 캡처 -> %d Hz로 리샘플링", rate, samplerate)
+            capture_block = round(blocksize * rate / samplerate)
+            return ResamplingSource(lambda inner_cb: MicrophoneSource(inner_cb, rate, capture_block),
+                                    cb, samplerate, rate)
+        return MicrophoneSource(cb, samplerate, blocksize)
+    if record:
+        return RecordingSource(factory, record, callback, samplerate)
+    return factory(callback)
+
+
+def source_options(argv=None):
+    # 모든 실행 파일 공통 옵션: --source 파일 --speed 배속 --record 폴더
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--source', default=None, help="마이크 대신 재생할 WAV/FLAC 파일 또는 녹음 세션 폴더")
+    parser.add_argument('--speed', type=float, default=1.0, help="재생 배속 (0이면 최대 속도)")
+    parser.add_argument('--record', default=None, help="입력과 피치 프레임을 저장할 세션 폴더")
+    args, _ = parser.parse_known_args(argv)
+    return dict(source=args.source, speed=args.speed, record=args.record)
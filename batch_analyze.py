@@ -0,0 +1,256 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import settings
+from note_table import DEFAULT_TABLE
+from pitch_estimators import create_estimator
+from pitch_frames import concat_frames
+from reference_alignment import analysis_params
+from resampler import StreamingResampler
+from ring_buffer import RingBuffer
+from voice_activity import frame_levels
+from voice_quality import StreamingJitterShimmer, analyze_voice
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.mp3', '.m4a', '.aiff', '.aif')
+BLOCK_SECONDS = 10.0
+PROGRESS_FILE = 'progress.jsonl'
+
+# 요약 표의 열 (파일당 한 행)
+SUMMARY_COLUMNS = ['path', 'duration', 'voiced_ratio', 'median_f0', 'f0_p5', 'f0_p95',
+                   'mean_abs_cents', 'jitter', 'shimmer', 'praat_jitter', 'praat_shimmer', 'seconds']
+
+_params = None
+
+
+def _init_worker(params, threads):
+    # 프로세스마다 한 번: 설정을 받아두고 CREPE 모델을 미리 올림
+    global _params
+    _params = params
+    if params['backend'] == 'crepe':
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+        from crepe_backend import get_backend
+        get_backend()
+
+
+def decode_blocks(path, sr, block):
+    """Mono float32 blocks of ``path`` at ``sr``, decoded incrementally.
+
+    ``soundfile`` reads ``block`` source samples at a time and a
+    ``StreamingResampler`` converts them when the file rate differs, so only
+    one block is in memory. Formats libsndfile cannot open (m4a, ...) fall
+    back to a whole-file ``librosa.load``.
+    """
+    import soundfile as sf
+    try:
+        file_sr = sf.info(path).samplerate
+    except RuntimeError:
+        import librosa
+        audio, _ = librosa.load(path, sr=sr, mono=True)
+        for start in range(0, len(audio), block):
+            yield audio[start:start + block].astype(np.float32)
+        return
+    resampler = StreamingResampler(file_sr, sr) if file_sr != sr else None
+    n_in = 0
+    for data in sf.blocks(path, blocksize=block, dtype='float32', always_2d=True):
+        data = data.mean(axis=1)
+        n_in += len(data)
+        yield resampler.process(data) if resampler else data
+    if resampler:
+        # 필터 지연만큼 0을 밀어 넣어 꼬리를 꺼내고, resample_poly와 같은 길이에서 자름
+        expected = -(-n_in * resampler.up // resampler.down)
+        tail = resampler.process(np.zeros(resampler.latency + 1, dtype=np.float32))
+        yield tail[:max(expected - (resampler.next_output - len(tail)), 0)]
+
+
+def _frame_levels(ring, frames, frame_length, hop):
+    # 추정기가 낸 프레임과 같은 중심 정렬 창의 레벨(dB); 링 밖(파일 앞/끝)은 0으로 채움
+    if len(frames.frame) == 0:
+        return np.zeros(0)
+    lo = int(frames.frame[0]) * hop - frame_length // 2
+    hi = int(frames.frame[-1]) * hop - frame_length // 2 + frame_length
+    segment = ring.read(max(lo, 0), min(hi, ring.total))
+    segment = np.pad(segment, (max(-lo, 0), max(hi - ring.total, 0)))
+    level_db, _ = frame_levels(segment, frame_length, hop)
+    return level_db
+
+
+def analyze_file(path, params, praat=True):
+    """Contours and summary metrics of one recording, streamed in blocks.
+
+    The file is decoded ``BLOCK_SECONDS`` at a time (``decode_blocks``) and
+    fed through the same ring buffer / streaming estimator / jitter-shimmer
+    path as the live apps, so memory stays at the ring's size; Praat's
+    ``analyze_voice`` gives the whole-file reference values and is the only
+    step that keeps the whole recording.
+    """
+    sr, hop, frame_length = params['sr'], params['hop_length'], params['frame_length']
+    estimator = create_estimator(params['backend'], sr=sr, fmin=params['fmin'], fmax=params['fmax'],
+                                 frame_length=frame_length, hop_length=hop)
+    quality = StreamingJitterShimmer(sr, window=np.inf)
+    block = int(BLOCK_SECONDS * sr)
+    ring = RingBuffer(2 * block + frame_length)
+    results, levels, kept = [], [], []
+    n_samples = 0
+
+    def feed(frames):
+        quality.update(ring, frames)
+        results.append(frames)
+        levels.append(_frame_levels(ring, frames, frame_length, hop))
+
+    for audio in decode_blocks(path, sr, block):
+        n_samples += len(audio)
+        if praat:
+            kept.append(audio)
+        ring.write(audio)
+        feed(estimator.process(ring))
+    # 끝 프레임도 중심 정렬되도록 뒤에 반 프레임만큼 0을 붙임
+    ring.write(np.zeros(frame_length // 2, dtype=np.float32))
+    feed(estimator.process(ring))
+    feed(estimator.flush())
+    frames = concat_frames(results)
+    level_db = np.concatenate(levels)
+
+    n = min(len(frames.frame), n_samples // hop + 1)
+    f0 = np.where(frames.voiced[:n], frames.f0[:n], np.nan)
+    contours = dict(time=frames.time[:n], f0=f0, confidence=frames.confidence[:n], energy_db=level_db[:n])
+
+    voiced_f0 = f0[~np.isnan(f0)]
+    has_pitch = len(voiced_f0) > 0
+    praat_jitter = praat_shimmer = np.nan
+    if praat and has_pitch:
+        praat_jitter, praat_shimmer = analyze_voice(np.concatenate(kept).astype(np.float64), sr)
+    summary = dict(
+        duration=n_samples / sr,
+        voiced_ratio=float(np.mean(~np.isnan(f0))) if n else 0.0,
+        median_f0=float(np.median(voiced_f0)) if has_pitch else np.nan,
+        f0_p5=float(np.percentile(voiced_f0, 5)) if has_pitch else np.nan,
+        f0_p95=float(np.percentile(voiced_f0, 95)) if has_pitch else np.nan,
+        mean_abs_cents=float(np.mean(np.abs(DEFAULT_TABLE.cents(voiced_f0)))) if has_pitch else np.nan,
+        jitter=float(quality.jitter()),
+        shimmer=float(quality.shimmer()),
+        praat_jitter=float(praat_jitter),
+        praat_shimmer=float(praat_shimmer),
+    )
+    return contours, summary
+
+
+def _run_job(path, relative, contour_path, praat):
+    started = time.perf_counter()
+    contours, summary = analyze_file(path, _params, praat=praat)
+    os.makedirs(os.path.dirname(contour_path), exist_ok=True)
+    tmp_path = contour_path + '.tmp.npz'
+    np.savez_compressed(tmp_path, **contours)
+    os.replace(tmp_path, contour_path)
+    summary.update(path=relative, seconds=time.perf_counter() - started)
+    return summary
+
+
+def find_audio_files(root, extensions=AUDIO_EXTENSIONS):
+    for folder, _, names in os.walk(root):
+        for name in sorted(names):
+            if name.lower().endswith(extensions):
+                yield os.path.join(folder, name)
+
+
+def _file_key(path, params_key):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}:{params_key}"
+
+
+def load_progress(output_dir):
+    # 완료된 파일: 상대 경로 -> 기록 (같은 파일/설정이면 다시 분석하지 않음)
+    done = {}
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 중단되며 잘린 마지막 줄
+                if 'error' not in record:
+                    done[record['path']] = record
+    return done
+
+
+def write_summary(output_dir, records, fmt='npz'):
+    records = sorted(records, key=lambda r: r['path'])
+    columns = {name: [r.get(name, np.nan) for r in records] for name in SUMMARY_COLUMNS}
+    if fmt == 'parquet':
+        import pandas as pd
+        path = os.path.join(output_dir, 'summary.parquet')
+        pd.DataFrame(columns).to_parquet(path, index=False)
+    else:
+        path = os.path.join(output_dir, 'summary.npz')
+        arrays = {name: np.array(values, dtype=str if name == 'path' else np.float64)
+                  for name, values in columns.items()}
+        np.savez(path, **arrays)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="녹음 폴더 일괄 분석 (피치 윤곽 + 발성 요약)")
+    parser.add_argument('input_dir')
+    parser.add_argument('output_dir')
+    parser.add_argument('--backend', default=settings.PITCH_BACKEND or 'crepe')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--format', choices=('npz', 'parquet'), default='npz')
+    parser.add_argument('--no-praat', action='store_true', help="Praat 기준 jitter/shimmer 생략")
+    args = parser.parse_args(argv)
+
+    params = analysis_params(backend=args.backend)
+    params_key = json.dumps(params, sort_keys=True)
+    os.makedirs(args.output_dir, exist_ok=True)
+    done = load_progress(args.output_dir)
+
+    jobs = []
+    for path in find_audio_files(args.input_dir):
+        relative = os.path.relpath(path, args.input_dir)
+        record = done.get(relative)
+        if record is not None and record.get('key') == _file_key(path, params_key):
+            continue
+        contour_path = os.path.join(args.output_dir, 'contours', relative + '.npz')
+        jobs.append((path, relative, contour_path))
+    print(f"📂 {len(jobs)}개 분석 예정 ({len(done)}개는 이미 완료), workers={args.workers}, backend={params['backend']}")
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    progress = open(os.path.join(args.output_dir, PROGRESS_FILE), 'a', encoding='utf-8')
+    # TensorFlow는 fork 이후 안전하지 않으므로 spawn으로 워커를 띄움
+    context = multiprocessing.get_context('spawn')
+    failed = 0
+    with ProcessPoolExecutor(args.workers, mp_context=context, initializer=_init_worker,
+                             initargs=(params, threads)) as pool:
+        futures = {pool.submit(_run_job, path, relative, contour_path, not args.no_praat): (path, relative)
+                   for path, relative, contour_path in jobs}
+        for count, future in enumerate(as_completed(futures), 1):
+            path, relative = futures[future]
+            try:
+                record = future.result()
+                record['key'] = _file_key(path, params_key)
+                done[relative] = record
+                print(f"[{count}/{len(jobs)}] ✅ {relative} ({record['seconds']:.1f}s)")
+            except Exception as e:
+                record = dict(path=relative, error=f"{type(e).__name__}: {e}")
+                failed += 1
+                print(f"[{count}/{len(jobs)}] ❌ {relative}: {record['error']}")
+            # 한 줄씩 바로 기록해 중간에 멈춰도 이어서 실행 가능
+            progress.write(json.dumps(record, ensure_ascii=False) + '\n')
+            progress.flush()
+    progress.close()
+
+    summary_path = write_summary(args.output_dir, done.values(), args.format)
+    print(f"📊 요약: {summary_path} ({len(done)}개 파일, 실패 {failed}개)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from instrumentation import table_cell
+from note_table import midi_to_freq, note_to_hz
+from pitch_estimators import create_estimator
+from pitch_frames import concat_frames
+from scale_scoring import generate_scaling_sequence
+
+FMIN = note_to_hz('C2')   # 65.4 Hz, 모든 경로에 같은 범위를 줌
+FMAX = note_to_hz('C6')   # 1046.5 Hz
+GROSS_CENTS = 50          # 이보다 크게 틀리면 다른 음으로 본 것 (gross error)
+TRANSITION = 0.03         # 음이 바뀌는 지점 앞뒤로 채점에서 빼는 구간 (초)
+WARMUP_SECONDS = 1.0      # 모델 로딩/JIT 컴파일은 측정에서 제외
+
+# 앱에서 쓰는 피치 경로: 백엔드 설정 + 한 번의 호출에 넘기는 샘플 수(block)
+PATHS = {
+    # pitch_analyzer / pitch_visualizer (50 ms 타이머마다 process)
+    'pyin-2048': dict(backend='pyin', sr=22050, block=1103, frame_length=2048, hop_length=512),
+    'pyin-1024': dict(backend='pyin', sr=22050, block=1103, frame_length=1024, hop_length=256),
+    # crepe_pitch / scailing (2048 샘플 블록마다 push)
+    'crepe-block': dict(backend='crepe', sr=16000, block=2048, viterbi=True, viterbi_lag=100),
+    # real_time_pitch_plot (100 ms 타이머, 1.5초 창 Viterbi)
+    'crepe-window': dict(backend='crepe', sr=16000, block=1600, hop_length=160, viterbi=True, decode_frames=150),
+    'yin': dict(backend='yin', sr=16000, block=512, frame_length=1024, hop_length=160),
+    'numba_yin': dict(backend='numba_yin', sr=16000, block=512, frame_length=1024, hop_length=160),
+}
+
+
+def _voice(f0, sr, seed=0, harmonics=30):
+    # 배음 합성 목소리: f0(샘플마다, 0/NaN이면 무음)를 따라가는 1/k 배음 + 약간의 jitter
+    rng = np.random.default_rng(seed)
+    voiced = np.nan_to_num(f0) > 0
+    f = np.where(voiced, np.nan_to_num(f0), 0.0)
+    f = f * (1 + 0.002 * np.convolve(rng.standard_normal(len(f)), np.ones(64) / 8, mode='same'))
+    phase = 2 * np.pi * np.cumsum(f) / sr
+    audio = np.zeros(len(f))
+    for k in range(1, harmonics + 1):
+        audio += (k * f < 0.45 * sr) * np.sin(k * phase) / k
+    # 음 시작/끝의 딸깍 소리를 막는 5 ms 페이드
+    envelope = np.convolve(voiced.astype(np.float64), np.ones(int(0.005 * sr)) / int(0.005 * sr), mode='same')
+    return 0.2 * audio * envelope
+
+
+def _breath(n, sr, seed=0):
+    # 숨소리: 고역을 강조한 잡음
+    noise = np.random.default_rng(seed).standard_normal(n)
+    return 0.02 * np.diff(noise, prepend=0.0)
+
+
+def _scale_f0(sr, note_seconds=0.4, scales=2):
+    notes = [midi for scale in generate_scaling_sequence()[:scales] for midi in scale]
+    f0 = np.repeat([midi_to_freq(m) for m in notes], int(note_seconds * sr))
+    # 음이 바뀌는 지점 근처는 정답이 모호하므로 NaN(채점 제외)
+    edges = np.arange(1, len(notes)) * int(note_seconds * sr)
+    width = int(TRANSITION * sr)
+    for edge in edges:
+        f0[edge - width:edge + width] = np.nan
+    return f0
+
+
+def signal_sweep(sr):
+    t = np.arange(int(4 * sr)) / sr
+    f0 = note_to_hz('C3') * 2 ** (2 * t / t[-1])  # C3 -> C5 지수 글라이드
+    return _voice(f0, sr), f0
+
+
+def signal_vibrato(sr):
+    t = np.arange(int(4 * sr)) / sr
+    f0 = 220.0 * 2 ** (0.5 * np.sin(2 * np.pi * 5.5 * t) / 12)  # ±50 cents, 5.5 Hz
+    return _voice(f0, sr, seed=1), f0
+
+
+def _scale_voice(f0, sr, seed):
+    # 전환 구간(NaN)도 소리는 이어지도록 앞 음의 f0로 채워 합성
+    filled = f0.copy()
+    valid = ~np.isnan(filled)
+    filled = filled[np.maximum.accumulate(np.where(valid, np.arange(len(f0)), 0))]
+    return _voice(filled, sr, seed=seed), f0
+
+
+def signal_scale(sr):
+    return _scale_voice(_scale_f0(sr), sr, 2)
+
+
+def signal_noisy_scale(sr, snr_db=10):
+    audio, f0 = _scale_voice(_scale_f0(sr), sr, 3)
+    noise = np.random.default_rng(3).standard_normal(len(audio))
+    noise *= np.sqrt(np.mean(audio ** 2) / 10 ** (snr_db / 10))
+    return audio + noise, f0
+
+
+def signal_breath(sr):
+    # 1초 발성 + 0.5초 숨쉬기 반복 (숨 구간의 정답은 무성음 0)
+    phrase, gap = int(1.0 * sr), int(0.5 * sr)
+    f0 = []
+    for note in ['A3', 'C4', 'E4']:
+        t = np.arange(phrase) / sr
+        f0.append(note_to_hz(note) * 2 ** (0.3 * np.sin(2 * np.pi * 5 * t) / 12))
+        f0.append(np.zeros(gap))
+    f0 = np.concatenate(f0)
+    audio = _voice(f0, sr, seed=4) + (f0 == 0) * _breath(len(f0), sr, seed=4)
+    return audio, f0
+
+
+SIGNALS = {
+    'sweep': signal_sweep,
+    'vibrato': signal_vibrato,
+    'scale': signal_scale,
+    'noisy_scale': signal_noisy_scale,
+    'breath': signal_breath,
+}
+
+
+def pitch_errors(frames, truth, sr):
+    """Accuracy of pitch frames against a per-sample f0 truth.
+
+    ``truth`` is Hz where voiced, 0 where unvoiced and NaN where the answer is
+    ambiguous (left out). Gross error rate is the share of voiced frames both
+    agree on that are more than ``GROSS_CENTS`` off; fine error is the mean
+    absolute cents of the rest.
+    """
+    index = np.clip(np.rint(frames.time * sr).astype(np.int64), 0, len(truth) - 1)
+    ref = truth[index]
+    care = ~np.isnan(ref)
+    ref_voiced = care & (np.nan_to_num(ref) > 0)
+    est_voiced = frames.voiced & (np.nan_to_num(frames.f0) > 0)
+    both = ref_voiced & est_voiced
+    cents = 1200 * np.log2(frames.f0[both] / ref[both])
+    gross = np.abs(cents) > GROSS_CENTS
+    unvoiced = care & ~ref_voiced
+    return dict(
+        gross=float(np.mean(gross)) if len(cents) else np.nan,
+        fine_cents=float(np.mean(np.abs(cents[~gross]))) if np.any(~gross) else np.nan,
+        recall=float(np.mean(est_voiced[ref_voiced])) if np.any(ref_voiced) else np.nan,
+        false_alarm=float(np.mean(est_voiced[unvoiced])) if np.any(unvoiced) else np.nan,
+    )
+
+
+def _run(estimator, audio, block):
+    results, times = [], []
+    for start in range(0, len(audio), block):
+        chunk = audio[start:start + block]
+        t0 = time.perf_counter()
+        results.append(estimator.push(chunk))
+        times.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    results.append(estimator.flush())
+    times.append(time.perf_counter() - t0)
+    return concat_frames(results), np.array(times)
+
+
+def _peak_rss_mb():
+    # 이 프로세스의 최대 RSS (ru_maxrss: 리눅스는 KiB, macOS는 바이트)
+    if resource is None:
+        return np.nan
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+def run_path(name, signals):
+    """Benchmark one pitch path on every signal; meant to run in a fresh process."""
+    config = dict(PATHS[name])
+    backend, sr, block = config.pop('backend'), config.pop('sr'), config.pop('block')
+
+    def make():
+        return create_estimator(backend, sr=sr, fmin=FMIN, fmax=FMAX, **config)
+
+    generated = {signal: SIGNALS[signal](sr) for signal in signals}
+    warmup = next(iter(generated.values()))[0][:int(WARMUP_SECONDS * sr)]
+    _run(make(), warmup.astype(np.float32), block)
+
+    rows, all_times, total_audio = [], [], 0.0
+    for signal, (audio, truth) in generated.items():
+        frames, times = _run(make(), audio.astype(np.float32), block)
+        duration = len(audio) / sr
+        total_audio += duration
+        all_times.append(times)
+        rows.append(dict(path=name, signal=signal, realtime=duration / times.sum(),
+                         p95_ms=float(np.percentile(times, 95) * 1000), **pitch_errors(frames, truth, sr)))
+
+    times = np.concatenate(all_times) * 1000
+    budget = block / sr * 1000  # 실시간이 되려면 블록 하나를 이 시간 안에 처리해야 함
+    summary = dict(
+        path=name,
+        realtime=total_audio / (times.sum() / 1000),
+        p50_ms=float(np.percentile(times, 50)),
+        p95_ms=float(np.percentile(times, 95)),
+        p99_ms=float(np.percentile(times, 99)),
+        max_ms=float(times.max()),
+        overruns=float(np.mean(times > budget)),
+        peak_rss_mb=_peak_rss_mb(),
+        gross=float(np.nanmean([r['gross'] for r in rows])),
+        fine_cents=float(np.nanmean([r['fine_cents'] for r in rows])),
+    )
+    return summary, rows
+
+
+def print_results(summaries, rows):
+    print(f"\n{'path':<13}{'signal':<13}{'x RT':>8}{'gross':>8}{'fine¢':>8}{'recall':>8}{'FA':>7}")
+    for r in rows:
+        print(f"{r['path']:<13}{r['signal']:<13}{r['realtime']:>8.1f}" + table_cell(r['gross'], '.1%', 8)
+              + table_cell(r['fine_cents'], '.1f', 8) + table_cell(r['recall'], '.1%', 8)
+              + table_cell(r['false_alarm'], '.1%', 7))
+    print(f"\n{'path':<13}{'x RT':>8}{'p50ms':>8}{'p95ms':>8}{'p99ms':>8}{'maxms':>8}{'over':>7}{'RSS MB':>8}"
+          f"{'gross':>8}{'fine¢':>8}")
+    for s in summaries:
+        if 'error' in s:
+            print(f"{s['path']:<13}⚠️ 건너뜀: {s['error']}")
+            continue
+        print(f"{s['path']:<13}{s['realtime']:>8.1f}{s['p50_ms']:>8.2f}{s['p95_ms']:>8.2f}{s['p99_ms']:>8.2f}"
+              f"{s['max_ms']:>8.1f}{s['overruns']:>7.1%}" + table_cell(s['peak_rss_mb'], '.0f', 8)
+              + table_cell(s['gross'], '.1%', 8) + table_cell(s['fine_cents'], '.1f', 8))
+
+
+def compare(rows, baseline, tolerance):
+    # 같은 경로/신호의 이전 결과보다 느려지거나(배속/p95) 부정확해진 항목 목록
+    previous = {(r['path'], r['signal']): r for r in baseline}
+    problems = []
+    for r in rows:
+        old = previous.get((r['path'], r['signal']))
+        if old is None:
+            continue
+        name = f"{r['path']}/{r['signal']}"
+        if r['realtime'] < old['realtime'] * (1 - tolerance):
+            problems.append(f"{name}: 배속 {old['realtime']:.1f} -> {r['realtime']:.1f}")
+        # 1 ms 미만의 차이는 타이머/스케줄링 잡음으로 봄
+        if r['p95_ms'] > old['p95_ms'] * (1 + tolerance) and r['p95_ms'] - old['p95_ms'] > 1.0:
+            problems.append(f"{name}: p95 {old['p95_ms']:.2f} -> {r['p95_ms']:.2f} ms")
+        if r['gross'] > old['gross'] + 0.01:
+            problems.append(f"{name}: gross {old['gross']:.1%} -> {r['gross']:.1%}")
+        if r['fine_cents'] > old['fine_cents'] + 1.0:
+            problems.append(f"{name}: fine {old['fine_cents']:.1f} -> {r['fine_cents']:.1f} cents")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="피치 경로 속도/정확도 벤치마크 (합성 신호, GUI 없음)")
+    parser.add_argument('--paths', nargs='+', choices=sorted(PATHS), default=list(PATHS))
+    parser.add_argument('--signals', nargs='+', choices=list(SIGNALS), default=list(SIGNALS))
+    parser.add_argument('--output', help="결과를 저장할 JSON 파일")
+    parser.add_argument('--baseline', help="비교할 이전 결과 JSON (느려지거나 부정확해지면 종료 코드 1)")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="허용하는 속도 저하 비율")
+    args = parser.parse_args(argv)
+
+    # 경로마다 새 프로세스에서 돌려 모델/JIT/메모리 사용량이 서로 섞이지 않게 함
+    context = multiprocessing.get_context('spawn')
+    summaries, rows = [], []
+    for name in args.paths:
+        print(f"⏱ {name} ...", flush=True)
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            try:
+                summary, path_rows = pool.submit(run_path, name, args.signals).result()
+            except Exception as e:
+                summary, path_rows = dict(path=name, error=f"{type(e).__name__}: {e}"), []
+        summaries.append(summary)
+        rows.extend(path_rows)
+    print_results(summaries, rows)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dict(summary=summaries, signals=rows), f, indent=1, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            problems = compare(rows, json.load(f)['signals'], args.tolerance)
+        for problem in problems:
+            print("❌", problem)
+        if problems:
+            return 1
+        print("✅ 기준 대비 성능 저하 없음")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+from crepe.core import build_and_load_model, model_srate
+
+import settings
+from online_viterbi import FixedLagViterbi, local_average_cents
+
+CAPACITIES = ('tiny', 'small', 'medium', 'large', 'full')
+RUNTIMES = ('keras', 'tflite')
+QUANTIZATIONS = ('none', 'float16', 'int8')
+CREPE_FRAME = 1024
+
+_backends = {}
+
+
+def get_backend(capacity=None, runtime=None, quantization=None):
+    # 설정 조합마다 모델은 프로세스당 한 번만 로드
+    key = (
+        capacity or settings.CREPE_CAPACITY,
+        runtime or settings.CREPE_RUNTIME,
+        quantization or settings.CREPE_QUANTIZATION,
+    )
+    if key not in _backends:
+        _backends[key] = CrepeBackend(*key)
+    return _backends[key]
+
+
+def _tflite_interpreter(path):
+    # tflite_runtime이 있으면 TensorFlow 전체를 올리지 않고 실행
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=path)
+
+
+class CrepeBackend:
+    """CREPE model of a selectable capacity, run through Keras or a converted TFLite graph.
+
+    ``predict`` returns ``(time, frequency, confidence, activation)`` exactly like
+    ``crepe.predict``. For the TFLite runtime the converted (optionally float16 or
+    dynamic-range int8 quantized) graph is cached under ``settings.CACHE_DIR`` so
+    conversion happens once per machine.
+    """
+
+    def __init__(self, capacity='full', runtime='keras', quantization='none'):
+        if capacity not in CAPACITIES:
+            raise ValueError(f"unknown CREPE capacity: {capacity}")
+        if runtime not in RUNTIMES:
+            raise ValueError(f"unknown CREPE runtime: {runtime}")
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"unknown CREPE quantization: {quantization}")
+        if runtime == 'keras' and quantization != 'none':
+            raise ValueError("quantization requires the tflite runtime")
+        self.capacity = capacity
+        self.runtime = runtime
+        self.quantization = quantization
+
+        self.model = None
+        self.interpreter = None
+        self._batch = None
+        if runtime == 'tflite':
+            self.interpreter = _tflite_interpreter(self._tflite_path())
+            self._input = self.interpreter.get_input_details()[0]['index']
+            self._output = self.interpreter.get_output_details()[0]['index']
+        else:
+            self.model = build_and_load_model(capacity)
+
+    def _tflite_path(self):
+        path = os.path.join(
+            settings.CACHE_DIR, f"crepe-{self.capacity}-{self.quantization}.tflite"
+        )
+        if not os.path.exists(path):
+            import tensorflow as tf
+            converter = tf.lite.TFLiteConverter.from_keras_model(build_and_load_model(self.capacity))
+            if self.quantization != 'none':
+                converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            if self.quantization == 'float16':
+                converter.target_spec.supported_types = [tf.float16]
+            os.makedirs(settings.CACHE_DIR, exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(converter.convert())
+            os.replace(tmp_path, path)
+        return path
+
+    def activation(self, frames):
+        # frames: (n, 1024), crepe.get_activation과 같은 프레임 정규화
+        frames = np.array(frames, dtype=np.float32)
+        frames -= np.mean(frames, axis=1)[:, np.newaxis]
+        frames /= np.clip(np.std(frames, axis=1)[:, np.newaxis], 1e-8, None)
+        if self.interpreter is None:
+            return self.model.predict(frames, verbose=0)
+
+        if self._batch != len(frames):
+            self.interpreter.resize_tensor_input(self._input, list(frames.shape))
+            self.interpreter.allocate_tensors()
+            self._batch = len(frames)
+        self.interpreter.set_tensor(self._input, frames)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output).copy()
+
+    def predict(self, audio, sr, viterbi=False, center=True, step_size=10):
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.ndim == 2:
+            audio = audio.mean(1)
+        if sr != model_srate:
+            from resampy import resample
+            audio = resample(audio, sr, model_srate)
+        if center:
+            audio = np.pad(audio, CREPE_FRAME // 2, mode='constant', constant_values=0)
+        hop = int(model_srate * step_size / 1000)
+        frames = np.lib.stride_tricks.sliding_window_view(audio, CREPE_FRAME)[::hop]
+
+        activation = self.activation(frames)
+        confidence = activation.max(axis=1)
+        states = None
+        if viterbi:
+            decoder = FixedLagViterbi(lag=len(activation))
+            decoder.push(np.argmax(activation, axis=1))
+            _, states = decoder.flush()
+        cents = local_average_cents(activation, states)
+        frequency = 10 * 2 ** (cents / 1200)
+        frequency[np.isnan(frequency)] = 0
+        time = np.arange(confidence.shape[0]) * step_size / 1000.0
+        return time, frequency, confidence, activation
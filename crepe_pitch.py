@@ -1,44 +1,42 @@
 import sys
+from startup import Startup, prewarm  # 가장 먼저: 시작 시각 기록, numba JIT 캐시 위치 설정
 import numpy as np
-import sounddevice as sd
 import pyqtgraph as pg
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5.QtCore import QTimer
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QGraphicsTextItem
-import librosa
-import crepe
-
-def get_equal_indexed_notes():
-    NOTE_NAMES_FULL = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-    indexed_notes = []
-    index = 0
-    for n in range(60, 89):  # MIDI 60 = C4, 88 = E6
-        name = NOTE_NAMES_FULL[n % 12]
-        full_name = name + str(n // 12 - 1)
-        freq = 440.0 * (2 ** ((n - 69) / 12))
-        indexed_notes.append((full_name, freq, index))
-        index += 1
-    return indexed_notes
-
-def snap_to_note_index(freq, indexed_notes):
-    return min(indexed_notes, key=lambda x: abs(freq - x[1]))
+from inference_worker import InferenceWorker, COALESCE
+from ring_buffer import RingBuffer
+from audio_source import open_source, source_options
+from note_table import NoteTable
+from time_series import TimeSeries
+from pitch_estimators import create_estimator
+from voice_activity import GatedEstimator
+from dsp_process import DSPProcess
+from instrumentation import METRICS_INTERVAL, LatencyMonitor, get_logger
+import settings
+
+log = get_logger('crepe_pitch')
+
+HISTORY_SIZE = 60 * 100  # 최근 60초 (10 ms 프레임 기준)
+STARTUP_POLL_MS = 20  # 모델 준비 확인 주기
 
 class RealTimePitchPlot(QMainWindow):
-    def __init__(self):
+    def __init__(self, source=None, speed=1.0, record=None):
         super().__init__()
         self.setWindowTitle("🎤 실시간 음정 시각화 (자동 스크롤)")
         self.setGeometry(100, 100, 800, 400)
 
-        self.indexed_notes = get_equal_indexed_notes()
-        ticks = [(note[2], note[0]) for note in self.indexed_notes]
+        self.notes = NoteTable(60, 88)  # MIDI 60 = C4, 88 = E6
+        ticks = [(index, str(name)) for index, name in enumerate(self.notes.names)]
 
         self.y_axis = pg.AxisItem(orientation='left')
         self.y_axis.setTicks([ticks])
         self.plot_widget = pg.PlotWidget(axisItems={'left': self.y_axis})
         self.setCentralWidget(self.plot_widget)
 
-        self.plot_widget.setYRange(0, len(self.indexed_notes) - 1)
+        self.plot_widget.setYRange(0, len(self.notes) - 1)
         self.plot_widget.setLabel('bottom', 'Time', units='s')
 
         self.plot_data = self.plot_widget.plot(pen=pg.mkPen('m', width=2))
@@ -47,10 +45,10 @@ class RealTimePitchPlot(QMainWindow):
         self.note_label.setDefaultTextColor(pg.mkColor('w'))
         self.note_label.setFont(QFont("Arial", 16, QFont.Bold))
         self.plot_widget.addItem(self.note_label)
-        self.note_label.setPos(5, len(self.indexed_notes) - 1)
+        self.note_label.setPos(5, len(self.notes) - 1)
 
-        self.data = []
-        self.elapsed_time = 0.0
+        # 프레임별 (시각, 피치, 신뢰도, 음 인덱스), 최근 60초만 보관
+        self.history = TimeSeries(HISTORY_SIZE, fields=('pitch', 'confidence', 'note'))
         self.update_interval = 0.05
         self.x_range = 5.0
         self.current_note_name = ""
@@ -58,62 +56,142 @@ class RealTimePitchPlot(QMainWindow):
         self.sample_rate = 16000
         self.block_size = 2048
 
-        self.stream = sd.InputStream(
-            callback=self.audio_callback,
-            samplerate=self.sample_rate,
-            channels=1,
-            dtype='float32',
-            blocksize=self.block_size
-        )
-        self.stream.start()
+        # 피치 백엔드 (기본: CREPE + 블록 사이에서도 trellis를 유지하는 fixed-lag Viterbi)
+        self.viterbi_lag = 100
+        backend = settings.PITCH_BACKEND or 'crepe'
+        options = dict(fmin=self.notes.freqs[0], fmax=self.notes.freqs[-1],
+                       viterbi=True, viterbi_lag=self.viterbi_lag, confidence_threshold=0.4)
+        self.analyzed = 0  # 마지막으로 결과를 반영한 절대 샘플 위치
+
+        if settings.DSP_PROCESS:
+            # 캡처와 CREPE 추론은 자식 프로세스에서, 여기서는 공유 메모리의 프레임을 update_plot에서 꺼냄
+            self.dsp = DSPProcess(self.sample_rate, backend, options, blocksize=self.block_size,
+                                  interval=self.block_size / self.sample_rate, audio_seconds=2,
+                                  source=source, speed=speed, record=record)
+            self.audio, self.monitor, self.stream = self.dsp.audio, self.dsp.monitor, self.dsp
+            self.startup = Startup('crepe_pitch')
+        else:
+            self.dsp = None
+            self.audio = RingBuffer(2 * self.sample_rate)
+            # 캡처부터 화면까지의 단계별 지연
+            self.monitor = LatencyMonitor(self.sample_rate)
+            self.stream = None
+            # 모델 로딩/예열은 백그라운드 스레드에서: 창은 바로 뜨고 스트림은 준비된 뒤 시작
+            self.startup = Startup('crepe_pitch', lambda: self.load_tracker(backend, options))
+        self.source_options = dict(source=source, speed=speed, record=record)
+        self.worker = None
+        # VOCALFRY_METRICS_OVERLAY=1이면 지연을 그래프에 표시
+        if settings.METRICS_OVERLAY:
+            self.monitor.attach_overlay(self.plot_widget)
+        self.current_note_name = "⏳ 피치 모델 준비 중..."
+        self.startup.start()
+        self.startup_timer = QTimer()
+        self.startup_timer.timeout.connect(self.check_startup)
+        self.startup_timer.start(STARTUP_POLL_MS)
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_plot)
         self.timer.start(int(self.update_interval * 1000))
 
+        self.metrics_timer = QTimer()
+        self.metrics_timer.timeout.connect(self.monitor.report)
+        self.metrics_timer.start(int(METRICS_INTERVAL * 1000))
+
+    def load_tracker(self, backend, options):
+        # 백그라운드 스레드: 같은 설정의 추정기에 오디오 블록 크기로 흘려 예열한 뒤 실제 추정기를 만듦
+        prewarm(backend, self.sample_rate, options, block=self.block_size)
+        return GatedEstimator(create_estimator(backend, sr=self.sample_rate, **options))
+
+    def check_startup(self):
+        if not self.startup.ready():
+            return
+        self.startup_timer.stop()
+        self.current_note_name = ""
+        if self.startup.error is not None:
+            self.current_note_name = f"❌ 피치 모델을 불러오지 못했습니다: {self.startup.error}"
+            return
+        if self.dsp is None:
+            self.tracker = self.startup.result
+            # CREPE 추론은 별도 스레드에서 실행
+            self.worker = InferenceWorker(self.predict_block, self.audio, max_queue=4, policy=COALESCE,
+                                          monitor=self.monitor, read=False)
+            self.worker.result_ready.connect(self.on_pitch_result)
+            self.worker.error.connect(self.on_pitch_error)
+            self.worker.start()
+            self.stream = open_source(self.audio_callback, self.sample_rate, blocksize=self.block_size,
+                                      **self.source_options)
+        self.stream.start()
+        self.startup.mark('stream')
+
     def audio_callback(self, indata, frames, time, status):
+        # 블록 길이는 그대로 받음 (ResamplingSource는 블록마다 한두 샘플씩 길이가 다름)
         audio = indata[:, 0]
-        if len(audio) < 1024:
+        start = self.audio.total
+        stop = self.audio.write(audio)
+        self.monitor.captured(stop, status, time)
+        self.worker.submit(start, stop)
+
+    def predict_block(self, start, stop):
+        # 공유 링을 절대 위치로 분석: 버려지거나 합쳐진 블록이 있어도 프레임 번호/시각이 캡처 시계와 맞음
+        # (링에서 이미 덮어써진 구간은 추정기가 무성 프레임으로 건너뜀)
+        stop_frame = (stop - self.tracker.frame_length // 2) // self.tracker.hop_length + 1
+        return self.tracker.process(self.audio, stop_frame=stop_frame)
+
+    def on_pitch_result(self, stop, frames):
+        self.analyzed = stop
+        self.startup.frames(frames)
+        if len(frames.frame) == 0:
             return
-
-        try:
-            _, freq, confidence, _ = crepe.predict(audio, self.sample_rate, viterbi=True)
-            print(f"Freq: {freq[0]:.2f} Hz, Confidence: {confidence[0]:.2f}")
-            if confidence[0] > 0.4:
-                note_name, note_freq, note_idx = snap_to_note_index(freq[0], self.indexed_notes)
-                self.data.append(note_idx)
-                self.current_note_name = f"\U0001F3B5 {note_name}"
-            else:
-                self.data.append(np.nan)
-                self.current_note_name = ""
-        except Exception as e:
-            print("CREPE error:", e)
-            self.data.append(np.nan)
+        self.stream.record_frames(frames)
+        # 프레임마다 가장 가까운 음 인덱스 (무성음은 NaN)
+        index = self.notes.index(frames.f0)
+        note = index.astype(np.float64)
+        note[~frames.voiced | (index < 0)] = np.nan
+        self.history.extend(frames.time, pitch=frames.f0, confidence=frames.confidence, note=note)
+
+        freq, confidence = frames.f0[-1], frames.confidence[-1]
+        log.debug("Freq: %.2f Hz, Confidence: %.2f", freq, confidence)
+        if frames.voiced[-1]:
+            self.current_note_name = f"\U0001F3B5 {self.notes.names[index[-1]]}"
+        else:
             self.current_note_name = ""
+        self.monitor.mark('analysis', stop)
 
-    def update_plot(self):
-        self.elapsed_time += self.update_interval
-
-        x_full = [i * self.update_interval for i in range(len(self.data))]
-        start_time = max(0, self.elapsed_time - self.x_range)
-        keep_start_idx = next((i for i, v in enumerate(x_full) if v >= start_time), 0)
+    def on_pitch_error(self, message):
+        log.error("CREPE error: %s", message)
+        # 선을 끊는 NaN은 마지막 프레임 시각에 (캡처 시각은 Viterbi 지연만큼 앞서 있어 시간 순서가 깨짐)
+        if len(self.history):
+            self.history.append(self.history.last_time)
+        self.current_note_name = ""
 
-        x = x_full[keep_start_idx:]
-        y = self.data[keep_start_idx:]
+    def update_plot(self):
+        if self.dsp is not None:
+            self.on_pitch_result(self.dsp.analyzed, self.dsp.poll())
+        # 최근 x_range초 구간만 복사 없이 꺼내서 그림 (세션 길이와 무관)
+        now = self.audio.total / self.sample_rate
+        window = self.history.window(now - self.x_range)
+        x, y = window['time'], window['note']
 
         self.plot_data.setData(x, y)
-
-        if x:
-            self.plot_widget.setXRange(x[0], x[-1])
-        else:
-            self.plot_widget.setXRange(0, self.x_range)
+        self.plot_widget.setXRange(max(0, now - self.x_range), max(now, self.x_range))
 
         self.note_label.setPlainText(self.current_note_name)
-        if x:
-            print(f"🟢 x[-1]: {x[-1]:.2f}, xRange: ({x[0]:.2f} ~ {x[-1]:.2f}), y[-1]: {y[-1]}")
+        if len(x):
+            log.debug("🟢 x[-1]: %.2f, xRange: (%.2f ~ %.2f), y[-1]: %s", x[-1], x[0], x[-1], y[-1])
+        self.monitor.mark('render', self.analyzed)
+
+    def closeEvent(self, event):
+        self.startup_timer.stop()
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+        if self.worker is not None:
+            self.worker.stop()
+        self.monitor.report()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = RealTimePitchPlot()
+    window = RealTimePitchPlot(**source_options())
     window.show()
     sys.exit(app.exec_())
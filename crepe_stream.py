@@ -0,0 +1,89 @@
+import numpy as np
+from crepe.core import model_srate
+
+from crepe_backend import CREPE_FRAME, get_backend
+from online_viterbi import N_BINS, FixedLagViterbi, local_average_cents
+from pitch_estimators import PitchEstimator
+from pitch_frames import concat_frames, empty_frames
+from ring_buffer import RingBuffer
+
+
+class StreamingCREPE(PitchEstimator):
+    """CREPE front end that never infers the same frame twice.
+
+    Frames are numbered like ``crepe.predict(center=True)``: frame ``k`` is centred
+    on absolute sample ``k * hop``. Each call infers only the frames that became
+    complete since the previous call (in one batch) and appends their activations
+    to a cache keyed by frame index (``activations.total == next_frame``); the
+    decoder then runs over the cached activation matrix.
+
+    With ``viterbi=True`` frames are smoothed by a fixed-lag online Viterbi
+    decoder and come out ``viterbi_lag`` ms after they are inferred.
+    """
+
+    def __init__(self, sr=model_srate, step_size=10, backend=None,
+                 viterbi=False, viterbi_lag=100, decode_frames=None, confidence_threshold=0.5):
+        if sr != model_srate:
+            raise ValueError(f"StreamingCREPE expects {model_srate} Hz input, got {sr}")
+        super().__init__(sr, CREPE_FRAME, int(model_srate * step_size / 1000))
+        self.step_size = step_size
+        # 모델 용량/런타임은 settings에서 선택 (crepe_backend.get_backend)
+        self.backend = backend or get_backend()
+        self.decoder = FixedLagViterbi(round(viterbi_lag / step_size)) if viterbi else None
+        lag = self.decoder.lag if viterbi else 0
+        # activation 캐시 크기 (기본 1.5초), Viterbi 지연보다 커야 함
+        self.decode_frames = max(decode_frames or int(1500 / step_size), 2 * lag + 1)
+        self.confidence_threshold = confidence_threshold
+        self.activations = RingBuffer(self.decode_frames, shape=(N_BINS,))
+        self.inferred = 0
+
+    def latency(self):
+        lag = self.decoder.lag if self.decoder is not None else 0
+        return CREPE_FRAME // 2 + lag * self.hop_length
+
+    def _skip(self, first, stop):
+        # 대기 중인 Viterbi 프레임을 확정하고, 건너뛴 구간은 빈 activation으로 채워 캐시 번호를 유지
+        results = [self.flush()]
+        self.activations.write(np.zeros((stop - first, N_BINS), dtype=np.float32))
+        if self.decoder is not None:
+            self.decoder.reset(stop)
+        results.append(super()._skip(first, stop))
+        return concat_frames(results)
+
+    def _analyze(self, first, frames):
+        activation = self.infer(frames)
+        self.inferred += len(frames)
+        return self._append(activation)
+
+    def flush(self):
+        # 스트림 종료 시 Viterbi 지연 구간을 모두 확정
+        if self.decoder is None:
+            return empty_frames()
+        return self._decoded(*self.decoder.flush())
+
+    def infer(self, frames):
+        return self.backend.activation(frames)
+
+    def _append(self, activation):
+        # 캐시에 쓰고 디코딩; 디코더 지연만큼 뒤의 프레임이 캐시에서 밀려나지 않도록 나눠서 처리
+        results = []
+        chunk = self.activations.capacity - (self.decoder.lag if self.decoder is not None else 0)
+        for i in range(0, len(activation), chunk):
+            part = activation[i:i + chunk]
+            first = self.activations.total
+            self.activations.write(part)
+            if self.decoder is not None:
+                results.append(self._decoded(*self.decoder.push(np.argmax(part, axis=1))))
+            else:
+                results.append(self._decoded(np.arange(first, first + len(part)), None))
+        return concat_frames(results)
+
+    def _decoded(self, index, states):
+        if len(index) == 0:
+            return empty_frames()
+        activation = self.activations.read(index[0], index[-1] + 1)
+        confidence = activation.max(axis=1)
+        cents = local_average_cents(activation, states)
+        f0 = 10 * 2 ** (cents / 1200)
+        voiced = (confidence >= self.confidence_threshold) & ~np.isnan(f0)
+        return self._frames(index, f0, voiced, confidence)
@@ -0,0 +1,256 @@
+import multiprocessing
+import time
+
+import numpy as np
+
+from audio_source import open_source
+from instrumentation import LatencyMonitor, get_logger
+from pitch_frames import PitchFrames, empty_frames, frames_from_rows, frames_to_rows
+from ring_buffer import SharedRingBuffer
+
+log = get_logger('dsp_process')
+
+FRAME_CAPACITY = 60 * 100    # 공유 피치 프레임 링: 최근 60초 (10 ms 프레임 기준)
+CAPTURE_BLOCKS = 1024        # 캡처 시각 링 (지연 측정용)
+
+# 공유 상태 배열의 칸
+(STATE, ANALYZED, GATE_OPEN, JITTER, SHIMMER, PRAAT_JITTER, PRAAT_SHIMMER,
+ BLOCKS, OVERFLOW, UNDERFLOW, ERRORS) = range(11)
+N_STATS = 11
+# STATE 값
+STARTING, RUNNING, STOPPED, FAILED = 0, 1, 2, -1
+
+
+def _shared_array(n, name=None):
+    from multiprocessing import shared_memory
+    if name is None:
+        shm = shared_memory.SharedMemory(create=True, size=n * 8)
+    else:
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray((n,), dtype=np.float64, buffer=shm.buf)
+
+
+def _dsp_main(specs, config, stop_event):
+    # 자식 프로세스: 캡처 -> 피치 추정 -> (발성 분석) -> 공유 메모리
+    from pitch_estimators import create_estimator
+    from startup import prewarm
+    from voice_activity import GatedEstimator
+    from voice_quality import StreamingJitterShimmer, analyze_voice
+
+    rings = {key: SharedRingBuffer.attach(spec) for key, spec in specs['rings'].items()}
+    stats_shm, stats = _shared_array(N_STATS, specs['stats'])
+    audio, out = rings['audio'], rings['frames']
+    sr = config['sr']
+    source = None
+    try:
+        # 캡처를 열기 전에 모델 로딩/JIT 예열 (첫 블록들이 밀리지 않게)
+        prewarm(config['backend'], sr, config['options'], config['blocksize'] or None,
+                praat=bool(config['praat_seconds']))
+        tracker = GatedEstimator(create_estimator(config['backend'], sr=sr, **config['options']))
+        quality = None
+        if config['voice_quality']:
+            quality = StreamingJitterShimmer(sr, window=config['voice_quality'])
+        monitor = LatencyMonitor(sr, rings=(rings['block_end'], rings['block_time']))
+
+        def callback(indata, frames, time_info, status):
+            monitor.captured(audio.write(indata[:, 0]), status, time_info)
+
+        source = open_source(callback, sr, config['blocksize'], **config['source'])
+        stats[STATE] = RUNNING
+        source.start()
+        next_praat = time.perf_counter() + config['praat_period']
+        while not stop_event.wait(config['interval']):
+            total = audio.total
+            try:
+                frames = tracker.process(audio)
+            except Exception as e:
+                stats[ERRORS] += 1
+                log.error("pitch error: %s", e)
+                continue
+            if len(frames.frame):
+                out.write(frames_to_rows(frames))
+                source.record_frames(frames)
+                if quality is not None:
+                    try:
+                        quality.update(audio, frames)
+                    except Exception as e:
+                        log.warning("voice quality error: %s", e)
+                        quality.reset()
+                    stats[JITTER], stats[SHIMMER] = quality.jitter(), quality.shimmer()
+            stats[ANALYZED] = total
+            stats[GATE_OPEN] = tracker.gate.is_open
+            counters = monitor.counters
+            stats[BLOCKS], stats[OVERFLOW], stats[UNDERFLOW] = (counters['blocks'], counters['overflow'],
+                                                                counters['underflow'])
+
+            # Praat 기준값도 이 프로세스에서 (GUI의 GIL을 잡지 않음)
+            if config['praat_seconds'] and time.perf_counter() >= next_praat:
+                next_praat = time.perf_counter() + config['praat_period']
+                if tracker.gate.is_open:
+                    window = np.array(audio.latest(int(config['praat_seconds'] * sr)), dtype=np.float64)
+                    try:
+                        stats[PRAAT_JITTER], stats[PRAAT_SHIMMER] = analyze_voice(window, sr)
+                    except Exception as e:
+                        log.warning("praat error: %s", e)
+        stats[STATE] = STOPPED
+    except Exception:
+        stats[STATE] = FAILED
+        log.exception("DSP process failed")
+    finally:
+        if source is not None:
+            source.stop()
+            source.close()
+        for ring in rings.values():
+            ring.close()
+        del stats
+        stats_shm.close()
+
+
+class _RemoteGate:
+    def __init__(self, stats):
+        self._stats = stats
+
+    @property
+    def is_open(self):
+        return bool(self._stats[GATE_OPEN])
+
+
+class RemoteTracker:
+    # GUI 쪽 tracker 자리: 분석은 자식 프로세스가 하고 여기서는 새 프레임만 꺼냄
+    def __init__(self, dsp):
+        self.dsp = dsp
+        self.gate = _RemoteGate(dsp.stats)
+
+    def process(self, ring, stop_frame=None):
+        return self.dsp.poll()
+
+    def push(self, samples):
+        return self.dsp.poll()
+
+    def process_frames(self, block):
+        return self.dsp.poll()
+
+
+class RemoteVoiceQuality:
+    # StreamingJitterShimmer 자리: 값은 자식 프로세스가 공유 상태에 씀
+    def __init__(self, dsp):
+        self._stats = dsp.stats
+
+    def update(self, ring, frames):
+        pass
+
+    def reset(self):
+        pass
+
+    def jitter(self):
+        return float(self._stats[JITTER])
+
+    def shimmer(self):
+        return float(self._stats[SHIMMER])
+
+
+class DSPProcess:
+    """Audio capture and pitch analysis in a child process, shared with the GUI.
+
+    The child (``spawn``) opens the audio source, runs the gated pitch
+    estimator every ``interval`` seconds and optionally streaming
+    jitter/shimmer and a periodic Praat check; it writes the audio ring, the
+    pitch frames (one row per frame) and capture timestamps into
+    ``SharedRingBuffer``s, plus a small state array. Those buffers' ``total``
+    counters are the sequence numbers the GUI reads against. The GUI process
+    maps everything read-only: ``audio`` stands in for its ring buffer,
+    ``tracker`` / ``voice_quality`` for the local analysers, ``monitor`` for
+    its ``LatencyMonitor``, and the object itself for the audio stream
+    (``start`` / ``stop`` / ``close`` / ``record_frames``).
+    """
+
+    def __init__(self, sr, backend, options, blocksize=0, interval=0.05, audio_seconds=3.0,
+                 voice_quality=None, praat_seconds=None, praat_period=2.0,
+                 source=None, speed=1.0, record=None):
+        self.sr = sr
+        self.rings = dict(
+            audio=SharedRingBuffer(int(audio_seconds * sr), readonly=True),
+            frames=SharedRingBuffer(FRAME_CAPACITY, np.float64, shape=(len(PitchFrames._fields),), readonly=True),
+            block_end=SharedRingBuffer(CAPTURE_BLOCKS, np.int64, readonly=True),
+            block_time=SharedRingBuffer(CAPTURE_BLOCKS, np.float64, readonly=True),
+        )
+        self._stats_shm, self.stats = _shared_array(N_STATS)
+        self.stats[:] = 0
+        self.stats[[JITTER, SHIMMER, PRAAT_JITTER, PRAAT_SHIMMER]] = np.nan
+        self.stats.flags.writeable = False
+
+        self.audio = self.rings['audio']
+        self.tracker = RemoteTracker(self)
+        self.voice_quality = RemoteVoiceQuality(self)
+        self.monitor = LatencyMonitor(sr, rings=(self.rings['block_end'], self.rings['block_time']))
+        self._read = 0
+        self._reported_exit = False
+
+        specs = dict(rings={key: ring.spec() for key, ring in self.rings.items()}, stats=self._stats_shm.name)
+        config = dict(sr=sr, backend=backend, options=options, blocksize=blocksize, interval=interval,
+                      voice_quality=voice_quality, praat_seconds=praat_seconds, praat_period=praat_period,
+                      source=dict(source=source, speed=speed, record=record))
+        context = multiprocessing.get_context('spawn')
+        self._stop = context.Event()
+        self.process = context.Process(target=_dsp_main, args=(specs, config, self._stop),
+                                       name='vocalfry-dsp', daemon=True)
+
+    @property
+    def state(self):
+        return int(self.stats[STATE])
+
+    @property
+    def analyzed(self):
+        # 자식 프로세스가 마지막으로 분석을 시작할 때의 절대 샘플 위치
+        return int(self.stats[ANALYZED])
+
+    def start(self):
+        self.process.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self.process.is_alive():
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+
+    def close(self):
+        self.stop()
+        self.tracker = self.voice_quality = self.audio = self.stats = None
+        for ring in self.rings.values():
+            ring.close()
+        self._stats_shm.close()
+        self._stats_shm.unlink()
+
+    def record_frames(self, frames):
+        pass  # 녹음은 자식 프로세스의 오디오 소스가 함
+
+    def praat_result(self):
+        # AnalysisScheduler 작업으로 쓰기 위한 (jitter, shimmer) 또는 None
+        jitter, shimmer = self.stats[PRAAT_JITTER], self.stats[PRAAT_SHIMMER]
+        if np.isnan(jitter):
+            return None
+        return float(jitter), float(shimmer)
+
+    def poll(self):
+        # 지난 호출 이후 자식 프로세스가 쓴 피치 프레임 (너무 밀렸으면 최근 것만)
+        ring = self.rings['frames']
+        total = ring.total
+        counters = self.monitor.counters
+        blocks, overflow, underflow = (int(v) for v in self.stats[BLOCKS:UNDERFLOW + 1])
+        counters['blocks'], counters['overflow'], counters['underflow'] = blocks, overflow, underflow
+        exited = self.process.pid is not None and not self.process.is_alive() and self.state != STOPPED
+        if self.state == FAILED or exited:
+            if not self._reported_exit:
+                self._reported_exit = True
+                log.error("DSP process stopped (exit code %s)", self.process.exitcode)
+        start = max(self._read, total - ring.capacity // 2)
+        if start > self._read:
+            counters['dropped'] += start - self._read
+        self._read = total
+        if total <= start:
+            return empty_frames()
+        try:
+            return frames_from_rows(ring.snapshot(start, total))
+        except IndexError:
+            return empty_frames()
@@ -0,0 +1,339 @@
+from collections import deque, namedtuple
+
+import numpy as np
+
+from note_table import DEFAULT_TABLE, midi_to_note_name
+
+# 프레임별 표현 특징 (모두 입력 피치 프레임과 같은 길이)
+#   level_db: 프레임 중심 RMS (dBFS), loudness_db: attack/release로 다듬은 음량 포락선
+#   vibrato_rate (Hz) / vibrato_extent (±cents): 비브라토가 없으면 NaN
+#   bend_cents: 자리 잡은 음 기준 편차 (음이 아직 없으면 NaN)
+ExpressionFrames = namedtuple('ExpressionFrames', ['time', 'level_db', 'loudness_db', 'vibrato_rate',
+                                                   'vibrato_extent', 'bend_cents'])
+# 음 주변의 피치 움직임: kind = scoop(아래에서 올라와 음에 안착) / drop(위에서)
+#   / bend(음 중간에 벗어났다 복귀) / glide(다음 음으로 미끄러짐) / fall(음 끝에서 떨어지며 끝남)
+Bend = namedtuple('Bend', ['kind', 'start', 'end', 'midi', 'cents'])
+# 무성 구간(숨)으로 나뉜 한 프레이즈: 음량 평균/최대(dB)와 기울기(dB/초, +면 크레셴도)
+Phrase = namedtuple('Phrase', ['start', 'end', 'mean_db', 'peak_db', 'slope_db'])
+
+SILENCE_DB = -80.0
+
+
+class VibratoTracker:
+    """Vibrato rate and extent from turning points of the cents contour.
+
+    Peaks and troughs are found with ``hysteresis`` cents of hysteresis, so
+    tracker noise does not count as oscillation. Turning points within the
+    last ``window`` seconds are kept with their swing to the previous one;
+    half-periods outside the ``min_rate``..``max_rate`` band or swings wider
+    than ``2 * max_extent`` (a note change) restart the chain. With at least
+    ``min_points`` turning points, rate = half-cycles / 2 / span and extent =
+    half the mean swing. Each frame is O(1) (amortized over the window).
+    """
+
+    def __init__(self, window=1.0, hysteresis=8.0, min_rate=3.0, max_rate=9.0, max_extent=150.0, min_points=4):
+        self.window = window
+        self.hysteresis = hysteresis
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_extent = max_extent
+        self.min_points = min_points
+        self.reset()
+
+    def reset(self):
+        self._points = deque()   # [시각, cents, 직전 점과의 폭]
+        self._swing_sum = 0.0
+        self._direction = 0      # +1 오르는 중 / -1 내리는 중 / 0 아직 모름
+        self._extreme = None     # 진행 방향의 극값 후보 (시각, cents)
+        self._origin = None
+
+    def push(self, t, cents):
+        if cents != cents:
+            self.reset()
+            return np.nan, np.nan
+        if self._extreme is None:
+            self._extreme = self._origin = (t, cents)
+        elif self._direction == 0:
+            # 처음으로 hysteresis 이상 움직인 방향을 정함
+            if abs(cents - self._origin[1]) >= self.hysteresis:
+                self._direction = 1 if cents > self._origin[1] else -1
+                self._extreme = (t, cents)
+        elif (cents - self._extreme[1]) * self._direction > 0:
+            self._extreme = (t, cents)
+        elif (self._extreme[1] - cents) * self._direction >= self.hysteresis:
+            self._turn(*self._extreme)
+            self._direction = -self._direction
+            self._extreme = (t, cents)
+
+        while self._points and self._points[0][0] < t - self.window:
+            self._points.popleft()
+            if self._points:
+                self._swing_sum -= self._points[0][2]
+                self._points[0][2] = 0.0
+        n = len(self._points)
+        if n < self.min_points:
+            return np.nan, np.nan
+        span = self._points[-1][0] - self._points[0][0]
+        return (n - 1) / (2 * span), self._swing_sum / (n - 1) / 2
+
+    def _turn(self, t, cents):
+        if self._points:
+            half_period = t - self._points[-1][0]
+            swing = abs(cents - self._points[-1][1])
+            if not (0.5 / self.max_rate <= half_period <= 0.5 / self.min_rate) or swing > 2 * self.max_extent:
+                self._points.clear()
+                self._swing_sum = 0.0
+            else:
+                self._points.append([t, cents, swing])
+                self._swing_sum += swing
+                return
+        self._points.append([t, cents, 0.0])
+
+
+class BendTracker:
+    """Scoops, bends, glides and falls relative to the nearest settled note.
+
+    A note counts as settled once the pitch, smoothed over ``smooth`` seconds
+    so vibrato averages out, stays within ``stable_cents`` of one semitone
+    and within a ``stable_cents`` range for ``stable_time`` seconds (a slow
+    slide through a semitone does not settle). How the voice got there decides
+    the event: from a voiced onset more than ``bend_cents`` below/above it is
+    a ``scoop``/``drop``, from a previous note over at least ``glide_time`` a
+    ``glide``. Leaving a settled note by more than ``bend_cents`` for at least
+    ``bend_time`` and coming back is a ``bend``; voicing ending during a
+    downward departure is a ``fall``. Unvoiced gaps shorter than ``max_gap``
+    are bridged. O(1) per frame.
+    """
+
+    def __init__(self, stable_cents=35.0, stable_time=0.08, smooth=0.08, bend_cents=60.0, bend_time=0.12,
+                 glide_time=0.06, max_gap=0.05):
+        self.stable = stable_cents / 100
+        self.smooth = smooth
+        self.stable_time = stable_time
+        self.bend = bend_cents / 100
+        self.bend_time = bend_time
+        self.glide_time = glide_time
+        self.max_gap = max_gap
+        self.reset()
+
+    def reset(self):
+        self.note = None          # 자리 잡은 음 (정수 MIDI)
+        self._onset = None        # 음을 찾기 시작한 지점 (시각, midi)
+        self._smoothed = None     # 평활한 피치 (시각, midi)
+        self._candidate = None    # 자리 잡는 중인 음 [정수 MIDI, 시작 시각, 평활 피치 최소, 최대]
+        self._departure = None    # 자리 잡은 음에서 벗어난 구간 [시작, 가장 먼 편차]
+        self._last_voiced = None
+
+    def push(self, t, midi):
+        if midi != midi:
+            if self._last_voiced is not None and t - self._last_voiced > self.max_gap:
+                return self.flush()
+            return None
+        self._last_voiced = t
+        if self._onset is None:
+            self._onset = self._smoothed = (t, midi)
+        else:
+            last_t, last = self._smoothed
+            coef = np.exp(-(t - last_t) / self.smooth)
+            self._smoothed = (t, coef * last + (1 - coef) * midi)
+        smoothed = self._smoothed[1]
+        candidate = self._candidate
+        if candidate is not None:
+            candidate[2], candidate[3] = min(candidate[2], smoothed), max(candidate[3], smoothed)
+        if candidate is None or abs(smoothed - candidate[0]) > self.stable or candidate[3] - candidate[2] > self.stable:
+            candidate = self._candidate = [int(round(smoothed)), t, smoothed, smoothed]
+        if candidate[0] != self.note and t - candidate[1] >= self.stable_time:
+            return self._settle(candidate[0], candidate[1])
+        if self.note is None:
+            return None
+        deviation = midi - self.note
+        if abs(deviation) >= self.bend:
+            if self._departure is None:
+                self._departure = [t, deviation]
+            elif abs(deviation) > abs(self._departure[1]):
+                self._departure[1] = deviation
+        elif self._departure is not None:
+            start, extreme = self._departure
+            self._departure = None
+            if t - start >= self.bend_time:
+                return Bend('bend', start, t, self.note, 100 * extreme)
+        return None
+
+    def _settle(self, note, settled):
+        # 새 음에 안착: 어디서 어떻게 왔는지로 이벤트를 정함
+        event = None
+        if self.note is None:
+            start, midi = self._onset
+            cents = 100 * (midi - note)
+            if abs(cents) >= 100 * self.bend:
+                event = Bend('scoop' if cents < 0 else 'drop', start, settled, note, cents)
+        else:
+            start = self._departure[0] if self._departure is not None else settled
+            if settled - start >= self.glide_time:
+                event = Bend('glide', start, settled, note, 100 * (self.note - note))
+        self.note = note
+        self._departure = None
+        return event
+
+    def flush(self):
+        # 발성이 끝남: 아래로 벗어나던 중이면 fall
+        event = None
+        if self.note is not None and self._departure is not None and self._departure[1] <= -self.bend:
+            event = Bend('fall', self._departure[0], self._last_voiced, self.note, 100 * self._departure[1])
+        self.reset()
+        return event
+
+
+class PhraseTracker:
+    """Phrases as voiced stretches separated by gaps of at least ``min_gap`` seconds.
+
+    Keeps running sums of the voiced frames' loudness (count, sum, peak and
+    the least-squares sums for a dB/s slope), so a phrase is summarized in
+    O(1) per frame when it ends. Phrases shorter than ``min_duration`` are
+    dropped.
+    """
+
+    def __init__(self, min_gap=0.3, min_duration=0.2):
+        self.min_gap = min_gap
+        self.min_duration = min_duration
+        self.reset()
+
+    def reset(self):
+        self._phrase = None   # [시작, 마지막 유성 시각, n, Σdb, 최대 db, Σt, Σt², Σt·db]
+
+    def push(self, t, voiced, loudness_db):
+        phrase = self._phrase
+        if not voiced:
+            if phrase is not None and t - phrase[1] >= self.min_gap:
+                return self.flush()
+            return None
+        if phrase is None:
+            phrase = self._phrase = [t, t, 0, 0.0, -np.inf, 0.0, 0.0, 0.0]
+        x = t - phrase[0]
+        phrase[1] = t
+        phrase[2] += 1
+        phrase[3] += loudness_db
+        phrase[4] = max(phrase[4], loudness_db)
+        phrase[5] += x
+        phrase[6] += x * x
+        phrase[7] += x * loudness_db
+        return None
+
+    def flush(self):
+        phrase, self._phrase = self._phrase, None
+        if phrase is None or phrase[1] - phrase[0] < self.min_duration:
+            return None
+        start, end, n, sum_db, peak_db, sum_x, sum_xx, sum_xy = phrase
+        denom = n * sum_xx - sum_x * sum_x
+        slope = (n * sum_xy - sum_x * sum_db) / denom if denom > 0 else 0.0
+        return Phrase(start, end, sum_db / n, peak_db, float(slope))
+
+
+BEND_NAMES = dict(scoop="스쿱", drop="위에서 진입", bend="벤딩", glide="글라이드", fall="폴")
+
+
+def event_text(event):
+    # 화면/로그용 한 줄 설명
+    if isinstance(event, Phrase):
+        trend = "크레셴도" if event.slope_db > 1 else "디크레셴도" if event.slope_db < -1 else "고른 음량"
+        return (f"🎼 프레이즈 {event.end - event.start:.1f}s, 평균 {event.mean_db:.0f} dB "
+                f"(최대 {event.peak_db:.0f} dB, {trend})")
+    return f"〽️ {BEND_NAMES[event.kind]} {event.cents:+.0f}¢ ({midi_to_note_name(event.midi)})"
+
+
+class StreamingExpression:
+    """Expressive features for the emotion-delivery feedback, in one streaming pass.
+
+    ``update(ring, frames)`` takes the audio ring and the pitch frames the
+    tracker just produced (the same pair ``StreamingJitterShimmer`` gets) and
+    returns an ``ExpressionFrames`` row per pitch frame: RMS level over
+    ``window`` seconds around the frame centre (one cumulative sum over the
+    new samples, or the shared ``FrameStage`` levels when given), a loudness envelope with ``attack`` / ``release`` time
+    constants, vibrato rate/extent and the deviation from the settled note.
+    Scoops, bends, glides, falls and finished phrases are queued as
+    ``Bend`` / ``Phrase`` events for ``take_events()``. Every per-frame state
+    is O(1), so this fits next to the pitch tracker in the real-time loop.
+    """
+
+    def __init__(self, sr, hop_length, window=0.03, attack=0.01, release=0.15, table=None,
+                 vibrato=None, bends=None, phrases=None):
+        self.sr = sr
+        self.hop_length = hop_length
+        self.half = max(1, int(window * sr) // 2)
+        hop_seconds = hop_length / sr
+        self._attack = np.exp(-hop_seconds / attack)
+        self._release = np.exp(-hop_seconds / release)
+        self.table = table or DEFAULT_TABLE
+        self.vibrato = vibrato or VibratoTracker()
+        self.bends = bends or BendTracker()
+        self.phrases = phrases or PhraseTracker()
+        self.reset()
+
+    def reset(self):
+        self.loudness_db = SILENCE_DB
+        self.vibrato.reset()
+        self.bends.reset()
+        self.phrases.reset()
+        self.events = []
+
+    def take_events(self):
+        events, self.events = self.events, []
+        return events
+
+    def flush(self):
+        # 스트림 종료: 진행 중인 음과 프레이즈를 마감
+        for event in (self.bends.flush(), self.phrases.flush()):
+            if event is not None:
+                self.events.append(event)
+        return self.take_events()
+
+    def levels(self, ring, centers):
+        # 프레임 중심 ±half 구간의 RMS (dB); 링에서 이미 사라진 구간은 NaN
+        n = len(centers)
+        level = np.full(n, np.nan)
+        if n == 0:
+            return level
+        oldest = max(ring.total - ring.capacity, 0)
+        start = max(int(centers[0]) - self.half, oldest)
+        stop = min(int(centers[-1]) + self.half, ring.total)
+        if stop <= start:
+            return level
+        audio = np.asarray(ring.read(start, stop), dtype=np.float64)
+        energy = np.concatenate(([0.0], np.cumsum(audio * audio)))
+        lo = np.clip(centers - self.half, start, stop) - start
+        hi = np.clip(centers + self.half, start, stop) - start
+        valid = hi > lo
+        mean_sq = (energy[hi[valid]] - energy[lo[valid]]) / (hi[valid] - lo[valid])
+        level[valid] = 10 * np.log10(mean_sq + 1e-12)
+        return level
+
+    def update(self, ring, frames, levels=None):
+        # levels: 프레임별 RMS(dB)가 이미 있으면 (FrameStage.lookup) 오디오를 다시 읽지 않음
+        n = len(frames.frame)
+        if levels is None:
+            levels = self.levels(ring, np.rint(frames.time * self.sr).astype(np.int64))
+        level = np.asarray(levels, dtype=np.float64)
+        midi = self.table.hz_to_midi(np.where(frames.voiced, frames.f0, np.nan))
+        loudness = np.empty(n)
+        rate = np.empty(n)
+        extent = np.empty(n)
+        bend = np.empty(n)
+
+        env = self.loudness_db
+        for i, (t, db, m) in enumerate(zip(frames.time.tolist(), level.tolist(), midi.tolist())):
+            if db == db:
+                db = max(db, SILENCE_DB)
+                coef = self._attack if db > env else self._release
+                env = coef * env + (1 - coef) * db
+            loudness[i] = env
+            rate[i], extent[i] = self.vibrato.push(t, 100 * m)
+            event = self.bends.push(t, m)
+            if event is not None:
+                self.events.append(event)
+            note = self.bends.note
+            bend[i] = 100 * (m - note) if note is not None else np.nan
+            phrase = self.phrases.push(t, m == m, float(env))
+            if phrase is not None:
+                self.events.append(phrase)
+        self.loudness_db = env
+        return ExpressionFrames(frames.time, level, loudness, rate, extent, bend)
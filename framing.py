@@ -0,0 +1,118 @@
+from collections import namedtuple
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+from voice_activity import frame_levels
+
+# FrameStage가 내주는 프레임 묶음 (first부터 연속된 절대 프레임, 배열은 모두 링 버퍼의 view)
+#   frames: 원본 프레임 (n, frame_length), windowed: 창 함수를 곱한 프레임
+#   spectrum: |rfft| (n, frame_length//2 + 1), level_db / zcr: 프레임 RMS(dB)와 zero-crossing 비율
+FrameBlock = namedtuple('FrameBlock', ['first', 'frames', 'windowed', 'spectrum', 'level_db', 'zcr'])
+
+DEFAULT_SECONDS = 2.0  # 프레임 링에 남겨두는 길이
+
+
+class FrameStage:
+    """Frames and spectra computed once per absolute frame index, shared by all analyzers.
+
+    Frames are numbered like ``PitchEstimator``: frame ``k`` is centred on
+    absolute sample ``k * hop_length`` of the audio ring. ``update(ring)``
+    frames only the hops completed since the last call, and stores each raw
+    frame, its windowed copy, magnitude spectrum, level and zero-crossing rate
+    in ``RingBuffer``s whose ``total`` equals ``next_frame``. Consumers get a
+    ``FrameCursor`` from ``subscribe()`` and read the frames they have not
+    seen yet as zero-copy views, so the cost grows with the number of hops,
+    not with the number of analyzers. Frames lost when the audio ring was
+    overrun are stored as silence.
+    """
+
+    def __init__(self, sr, frame_length, hop_length, capacity=None, window='hann'):
+        self.sr = sr
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.capacity = int(capacity or DEFAULT_SECONDS * sr / hop_length)
+        n_bins = frame_length // 2 + 1
+        self.frames = RingBuffer(self.capacity, shape=(frame_length,))
+        self.windowed = RingBuffer(self.capacity, shape=(frame_length,))
+        self.spectrum = RingBuffer(self.capacity, shape=(n_bins,))
+        self.level_db = RingBuffer(self.capacity, dtype=np.float64, fill=np.nan)
+        self.zcr = RingBuffer(self.capacity, dtype=np.float64, fill=np.nan)
+        from scipy.signal import get_window
+        self.window = get_window(window, frame_length).astype(np.float32)  # periodic (librosa와 같음)
+        self.freqs = np.fft.rfftfreq(frame_length, 1.0 / sr)
+        self.next_frame = 0
+
+    def subscribe(self):
+        return FrameCursor(self)
+
+    def update(self, ring):
+        half = self.frame_length // 2
+        hop = self.hop_length
+        total = ring.total
+        first = self.next_frame
+        oldest = total - ring.capacity
+        if first * hop - half < oldest:
+            skip_to = -(-(oldest + half) // hop)
+            self._silence(skip_to - first)
+            first = skip_to
+        last = (total - half) // hop
+        if last >= first:
+            start = first * hop - half
+            audio = ring.read(max(start, 0), last * hop + half)
+            if start < 0:
+                audio = np.concatenate((np.zeros(-start, dtype=audio.dtype), audio))
+            frames = np.lib.stride_tricks.sliding_window_view(audio, self.frame_length)[::hop]
+            level_db, zcr = frame_levels(audio, self.frame_length, hop)
+            windowed = frames * self.window
+            self.frames.write(frames)
+            self.windowed.write(windowed)
+            self.spectrum.write(np.abs(np.fft.rfft(windowed, axis=1)))
+            self.zcr.write(zcr)
+            self.level_db.write(level_db)  # 마지막에 씀: 이 링의 total이 완성된 프레임 수
+            first = last + 1
+        self.next_frame = first
+        return first
+
+    def _silence(self, n):
+        # 건너뛴 프레임은 0으로 채워 프레임 번호와 링 위치를 맞춤
+        rows = min(n, self.capacity)
+        for ring in (self.frames, self.windowed, self.spectrum):
+            ring.write(np.zeros((rows,) + ring.shape, dtype=np.float32))
+        self.zcr.write(np.zeros(rows))
+        self.level_db.write(np.full(rows, -120.0))
+        if n > rows:
+            # 링 전체가 0으로 덮였으므로 위치만 넘김
+            for ring in (self.frames, self.windowed, self.spectrum, self.zcr, self.level_db):
+                ring.total += n - rows
+
+    def block(self, start, stop):
+        # 절대 프레임 [start, stop)의 view (링에 남아 있어야 함)
+        return FrameBlock(start, self.frames.read(start, stop), self.windowed.read(start, stop),
+                          self.spectrum.read(start, stop), self.level_db.read(start, stop), self.zcr.read(start, stop))
+
+    def lookup(self, name, index):
+        # 절대 프레임 번호들의 값 (아직 없거나 링에서 사라졌으면 NaN), 예: lookup('level_db', frames.frame)
+        ring = getattr(self, name)
+        index = np.asarray(index, dtype=np.int64)
+        total = ring.total
+        oldest = max(total - ring.capacity, 0)
+        result = np.full(index.shape, np.nan)
+        valid = (index >= oldest) & (index < total)
+        if np.any(valid):
+            result[valid] = ring.read(oldest, total)[index[valid] - oldest]
+        return result
+
+
+class FrameCursor:
+    # 구독자 한 명의 읽기 위치: read()는 지난 호출 이후 새 프레임 (밀렸으면 링에 남은 것부터)
+    def __init__(self, stage):
+        self.stage = stage
+        self.next_frame = stage.next_frame
+
+    def read(self):
+        stage = self.stage
+        total = stage.level_db.total
+        start = min(max(self.next_frame, total - stage.capacity), total)
+        self.next_frame = total
+        return stage.block(start, total)
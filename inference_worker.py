@@ -0,0 +1,105 @@
+import threading
+from collections import deque
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# 큐가 가득 찼을 때의 처리 방식
+DROP_OLDEST = 'drop_oldest'    # 가장 오래된 블록을 버림
+DROP_NEWEST = 'drop_newest'    # 새로 들어온 블록을 버림
+COALESCE = 'coalesce'          # 대기 중인 블록을 모두 합쳐 한 번에 추론
+POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE)
+
+
+class InferenceWorker(QObject):
+    # (블록 끝 절대 샘플 위치, predict_fn 결과)
+    result_ready = pyqtSignal(int, object)
+    error = pyqtSignal(str)
+
+    def __init__(self, predict_fn, ring, max_queue=4, policy=DROP_OLDEST, max_coalesce=None, monitor=None,
+                 read=True):
+        super().__init__()
+        if policy not in POLICIES:
+            raise ValueError(f"unknown queue policy: {policy}")
+        self.predict_fn = predict_fn
+        self.ring = ring
+        self.max_queue = max_queue
+        self.policy = policy
+        self.max_coalesce = max_coalesce or max_queue
+        self.dropped = 0
+        self.monitor = monitor  # 선택: instrumentation.LatencyMonitor
+        # read=False면 링을 복사하지 않고 predict_fn(start, stop)에 절대 구간만 넘김 (링을 직접 읽는 추정기용)
+        self.read = read
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="inference-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # 오디오 콜백에서 호출: 링 버퍼의 절대 구간 [start, stop)만 넘기고 바로 반환
+    def submit(self, start, stop):
+        block = (start, stop)
+        with self._cond:
+            if len(self._pending) >= self.max_queue:
+                self._drop(1)
+                if self.policy == DROP_NEWEST:
+                    return False
+                self._pending.popleft()
+            self._pending.append(block)
+            self._cond.notify()
+        return True
+
+    def _next_job(self):
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait()
+            if not self._running:
+                return None
+            if self.policy == COALESCE and len(self._pending) > 1:
+                blocks = list(self._pending)[-self.max_coalesce:]
+                self._drop(len(self._pending) - len(blocks))
+                self._pending.clear()
+                return blocks[0][0], blocks[-1][1]
+            return self._pending.popleft()
+
+    def _drop(self, n):
+        self.dropped += n
+        if self.monitor is not None:
+            self.monitor.count('dropped', n)
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            args = job
+            if self.read:
+                try:
+                    args = (np.array(self.ring.read(*job), dtype=np.float32),)
+                except IndexError:
+                    # 추론이 너무 밀려 링 버퍼에서 이미 덮어써진 구간
+                    self._drop(1)
+                    continue
+            if self.monitor is not None:
+                self.monitor.mark('infer_start', job[1])
+            try:
+                result = self.predict_fn(*args)
+            except Exception as e:
+                self.error.emit(str(e))
+                continue
+            if self.monitor is not None:
+                self.monitor.mark('infer_end', job[1])
+            self.result_ready.emit(job[1], result)
@@ -0,0 +1,170 @@
+import json
+import logging
+import time
+
+import numpy as np
+
+import settings
+from ring_buffer import RingBuffer
+
+# 블록이 캡처된 뒤 각 단계에 도달하기까지의 지연 (캡처 기준)
+STAGES = ('infer_start', 'infer_end', 'analysis', 'render')
+# 지연 히스토그램 구간: 0.1 ms ~ 10 s, 로그 간격
+LATENCY_BINS = np.logspace(-4, 1, 51)
+METRICS_INTERVAL = 1.0  # 오버레이/덤프 주기 (초)
+
+_configured = False
+
+
+def get_logger(name):
+    # 'vocalfry.<name>' 로거; 레벨은 settings.LOG_LEVEL (프레임마다 찍는 로그는 DEBUG)
+    global _configured
+    root = logging.getLogger('vocalfry')
+    if not _configured:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s', '%H:%M:%S'))
+        root.addHandler(handler)
+        root.setLevel(settings.LOG_LEVEL.upper())
+        root.propagate = False
+        _configured = True
+    return root.getChild(name)
+
+
+def table_cell(value, fmt, width):
+    # 벤치마크 표의 오른쪽 정렬 칸 (NaN = 측정 안 됨은 '-')
+    return f"{'-':>{width}}" if value != value else f"{value:>{width}{fmt}}"
+
+
+log = get_logger('metrics')
+
+
+class LatencyMonitor:
+    """Per-block timestamps from capture to render, with rolling latency windows.
+
+    The audio callback calls ``captured(total, ...)`` with the ring buffer's
+    sample count after writing a block; later stages call ``mark(stage,
+    total)`` with the end sample of the audio they just handled, and the
+    latency since that sample was captured goes into the stage's window. The
+    last ``history`` values per stage are kept in ``RingBuffer``s, each
+    written from one thread only (audio callback, inference worker or GUI),
+    so nothing is locked. With ``rings`` the capture side can live in
+    another process (``time.perf_counter`` is system-wide). Marking ``infer_start`` and ``infer_end`` for the
+    same block also records the inference time itself. Counters track xruns
+    and dropped blocks; the audio callback only counts them and ``report()``
+    logs new xruns from the GUI timer (logging takes locks and does I/O).
+    """
+
+    def __init__(self, sr, history=512, blocks=1024, rings=None):
+        self.sr = sr
+        self.history = history
+        # rings: 다른 프로세스와 공유하는 (블록 끝 위치, 캡처 시각) 링 버퍼 (dsp_process)
+        if rings is None:
+            rings = RingBuffer(blocks, dtype=np.int64), RingBuffer(blocks, dtype=np.float64)
+        self._block_end, self._block_time = rings
+        self.latency = {}
+        self._last = {}
+        self.counters = dict(blocks=0, overflow=0, underflow=0, dropped=0)
+        for stage in STAGES + ('inference',):
+            self.latency[stage] = RingBuffer(history, dtype=np.float64, fill=np.nan)
+            self._last[stage] = 0
+        self._infer_started = 0.0
+        self._status = None        # 마지막 xrun 상태 (콜백은 참조만 저장, 로그는 report에서)
+        self._reported_xruns = 0
+        self._overlay = None
+        self._started = time.time()
+
+    def captured(self, total, status=None, time_info=None):
+        # 오디오 콜백에서 호출; time_info가 있으면 ADC 시각으로 보정
+        now = time.perf_counter()
+        if time_info is not None:
+            delay = time_info.currentTime - time_info.inputBufferAdcTime
+            if 0 <= delay < 1:
+                now -= delay
+        self.counters['blocks'] += 1
+        if status:
+            if getattr(status, 'input_underflow', False):
+                self.counters['underflow'] += 1
+            else:
+                self.counters['overflow'] += 1
+            self._status = status
+        # 시각을 먼저 쓰고 위치를 씀 (읽는 쪽은 위치 개수까지만 봄)
+        self._block_time.append(now)
+        self._block_end.append(total)
+
+    def mark(self, stage, total):
+        # 절대 샘플 total까지를 처리한 시점; 같은 블록을 두 번 재지 않음
+        if total <= self._last[stage]:
+            return
+        now = time.perf_counter()
+        self._last[stage] = total
+        if stage == 'infer_start':
+            self._infer_started = now
+        elif stage == 'infer_end' and self._last['infer_start'] == total:
+            # 같은 블록의 추론 시작~끝 = 추론 한 번에 걸린 시간
+            self.latency['inference'].append(now - self._infer_started)
+        # 오디오 스레드가 계속 쓰므로 개수를 한 번만 읽고 같은 절대 구간을 봄 (덮어쓰기 여유 16개)
+        count = self._block_end.total
+        start = max(0, count - self._block_end.capacity + 16)
+        ends = self._block_end.read(start, count)
+        i = np.searchsorted(ends, total)
+        if i == len(ends):
+            return
+        self.latency[stage].append(now - self._block_time.read(start, count)[i])
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def _window(self, stage):
+        values = self.latency[stage]
+        return values.latest(min(values.total, self.history))
+
+    def stats(self):
+        # 단계별 최근 지연 백분위 (ms)
+        result = {}
+        for stage in self.latency:
+            values = self._window(stage)
+            if len(values) == 0:
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+            result[stage] = dict(n=len(values), p50=p50, p95=p95, p99=p99, max=values.max() * 1000)
+        return result
+
+    def histograms(self):
+        return {stage: np.histogram(self._window(stage), LATENCY_BINS)[0].tolist() for stage in self.latency}
+
+    def overlay_text(self):
+        lines = [f"{stage:<11} {s['p50']:6.1f} / {s['p95']:6.1f} ms" for stage, s in self.stats().items()]
+        c = self.counters
+        lines.append(f"xrun {c['overflow'] + c['underflow']} | drop {c['dropped']} | blocks {c['blocks']}")
+        return "\n".join(lines)
+
+    def attach_overlay(self, plot_widget):
+        # 그래프 왼쪽 위에 고정된 (데이터 좌표와 무관한) 지연 표시
+        from PyQt5.QtGui import QFont
+        from PyQt5.QtWidgets import QGraphicsTextItem
+        import pyqtgraph as pg
+        self._overlay = QGraphicsTextItem()
+        self._overlay.setDefaultTextColor(pg.mkColor('c'))
+        self._overlay.setFont(QFont("Courier", 9))
+        self._overlay.setParentItem(plot_widget.getPlotItem().getViewBox())
+        self._overlay.setZValue(100)
+
+    def dump(self, path):
+        # JSON lines 한 줄: 시각, 백분위, 카운터, 히스토그램
+        record = dict(time=time.time(), uptime=time.time() - self._started, stats=self.stats(),
+                      counters=self.counters, bins=LATENCY_BINS.tolist(), histograms=self.histograms())
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def report(self):
+        # QTimer로 METRICS_INTERVAL마다 호출
+        if self._overlay is not None:
+            self._overlay.setPlainText(self.overlay_text())
+        if settings.METRICS_FILE:
+            self.dump(settings.METRICS_FILE)
+        xruns = self.counters['overflow'] + self.counters['underflow']
+        if xruns > self._reported_xruns:
+            log.warning("⚠️ audio xrun %d회 (누적 %d, 마지막 상태: %s)", xruns - self._reported_xruns, xruns,
+                        self._status)
+            self._reported_xruns = xruns
+        log.debug("latency %s counters %s", self.stats(), self.counters)
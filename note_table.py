@@ -0,0 +1,111 @@
+import re
+
+import numpy as np
+
+import settings
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+A4_MIDI = 69
+NO_NOTE = "-"  # 무성음/범위 밖 표시
+
+_STEPS = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+_ACCIDENTALS = {'': 0, '#': 1, '♯': 1, 'b': -1, '♭': -1}
+_NOTE_RE = re.compile(r'^([A-Ga-g])([#♯b♭]?)(-?\d+)$')
+
+
+def note_to_midi(name):
+    # 'C4', 'F#5', 'Bb3', 'G♯4' -> MIDI 번호
+    match = _NOTE_RE.match(name.strip())
+    if match is None:
+        raise ValueError(f"invalid note name: {name!r}")
+    step, accidental, octave = match.groups()
+    return 12 * (int(octave) + 1) + _STEPS[step.upper()] + _ACCIDENTALS[accidental]
+
+
+class NoteTable:
+    """Equal-tempered note table for a MIDI range and tuning reference.
+
+    Note frequencies and labels are computed once; every conversion works on
+    whole f0 arrays (scalars are fine too) in a single NumPy pass. NaN, zero
+    and negative f0 mean "no pitch": they map to NaN MIDI/cents, index -1 and
+    the ``NO_NOTE`` label. ``index`` clips to the table range by default, like
+    snapping to the nearest note the plot can show.
+    """
+
+    def __init__(self, midi_min=0, midi_max=127, tuning=None):
+        self.midi_min = int(midi_min)
+        self.midi_max = int(midi_max)
+        self.tuning = float(tuning or settings.TUNING)
+        self.midi = np.arange(self.midi_min, self.midi_max + 1)
+        self.freqs = self.midi_to_hz(self.midi)
+        self.names = np.array([midi_to_note_name(m) for m in self.midi])
+        # index -1 (무성음)이 NO_NOTE를 가리키도록 끝에 붙여 둠
+        self._labels = np.append(self.names, NO_NOTE)
+
+    def __len__(self):
+        return len(self.midi)
+
+    def midi_to_hz(self, midi):
+        return self.tuning * 2.0 ** ((np.asarray(midi, dtype=np.float64) - A4_MIDI) / 12)
+
+    def hz_to_midi(self, f0):
+        # 소수 MIDI (무성음은 NaN)
+        f0 = np.asarray(f0, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(f0 > 0, A4_MIDI + 12 * np.log2(f0 / self.tuning), np.nan)
+
+    def nearest_midi(self, f0):
+        return np.rint(self.hz_to_midi(f0))
+
+    def index(self, f0, clip=True):
+        # 가장 가까운 음의 테이블 인덱스 (무성음, clip=False일 때 범위 밖은 -1)
+        midi = self.nearest_midi(f0)
+        valid = ~np.isnan(midi)
+        index = np.where(valid, np.nan_to_num(midi) - self.midi_min, -1).astype(np.int64)
+        if clip:
+            return np.where(valid, np.clip(index, 0, len(self) - 1), -1)
+        return np.where((index >= 0) & (index < len(self)), index, -1)
+
+    def cents(self, f0, ref=None):
+        # ref가 없으면 가장 가까운 음 기준 편차 (-50 ~ +50), 있으면 ref(Hz) 기준
+        if ref is None:
+            midi = self.hz_to_midi(f0)
+            return 100 * (midi - np.rint(midi))
+        ref = np.asarray(ref, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(ref > 0, 100 * (self.hz_to_midi(f0) - self.hz_to_midi(ref)), np.nan)
+
+    def labels(self, f0, clip=False):
+        return self._labels[self.index(f0, clip=clip)]
+
+    def note_to_hz(self, name):
+        return float(self.midi_to_hz(note_to_midi(name)))
+
+
+def midi_to_note_name(midi):
+    midi = int(midi)
+    return NOTE_NAMES[midi % 12] + str(midi // 12 - 1)
+
+
+# 설정의 기준 음(settings.TUNING)을 쓰는 기본 테이블과 스칼라용 함수
+DEFAULT_TABLE = NoteTable()
+
+
+def midi_to_freq(midi):
+    return float(DEFAULT_TABLE.midi_to_hz(midi))
+
+
+def note_to_hz(name):
+    return DEFAULT_TABLE.note_to_hz(name)
+
+
+def snap_to_midi(freq):
+    return int(DEFAULT_TABLE.nearest_midi(freq))
+
+
+def hz_to_note_name(hz):
+    return str(DEFAULT_TABLE.labels(hz))
+
+
+def cents_error(f0, f_ref):
+    return float(DEFAULT_TABLE.cents(f0, f_ref))
@@ -0,0 +1,119 @@
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+N_BINS = 360
+# crepe.core.to_local_average_cents와 같은 bin -> cents 매핑
+CENTS_MAPPING = np.linspace(0, 7180, N_BINS) + 1997.3794084376191
+
+
+def local_average_cents(salience, center=None):
+    # salience: (n_frames, 360), center: 프레임별 기준 bin (없으면 argmax)
+    salience = np.asarray(salience)
+    if center is None:
+        center = np.argmax(salience, axis=1)
+    offsets = np.arange(-4, 5)
+    idx = np.asarray(center)[:, None] + offsets
+    valid = (idx >= 0) & (idx < N_BINS)
+    idx = np.clip(idx, 0, N_BINS - 1)
+    weights = np.take_along_axis(salience, idx, axis=1) * valid
+    weight_sum = weights.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (weights * CENTS_MAPPING[idx]).sum(axis=1) / weight_sum
+
+
+class FixedLagViterbi:
+    """Online fixed-lag Viterbi over the 360-bin CREPE pitch space.
+
+    Uses the same HMM as ``crepe.core.to_viterbi_cents`` (triangular transitions
+    within +/-11 bins, observations = activation argmax with 0.1 self-emission),
+    but keeps the trellis across calls: after each frame ``t`` the state for
+    frame ``t - lag`` is read off by backtracking ``lag`` steps from the current
+    best state, so the output is smoothed with a fixed, bounded delay.
+    """
+
+    def __init__(self, lag=10, n_states=N_BINS, transition_width=12, self_emission=0.1):
+        self.lag = int(lag)
+        self.n_states = n_states
+        self.width = transition_width
+
+        xx, yy = np.meshgrid(range(n_states), range(n_states))
+        transition = np.maximum(transition_width - abs(xx - yy), 0).astype(np.float64)
+        transition /= np.sum(transition, axis=1)[:, None]
+
+        # band[k, j] = log P(j+d -> j), d = k - (width - 1)
+        offsets = np.arange(-(transition_width - 1), transition_width)
+        src = np.arange(n_states)[None, :] + offsets[:, None]
+        inside = (src >= 0) & (src < n_states)
+        self.band = np.full(src.shape, -np.inf)
+        with np.errstate(divide='ignore'):
+            self.band[inside] = np.log(transition[src[inside], np.nonzero(inside)[1]])
+
+        self.log_hit = np.log(self_emission + (1 - self_emission) / n_states)
+        self.log_miss = np.log((1 - self_emission) / n_states)
+        self._padded = np.full(n_states + 2 * (transition_width - 1), -np.inf)
+        self.reset()
+
+    def reset(self, start_frame=0):
+        # start_frame: 다음에 넣을 프레임의 절대 번호 (출력 프레임 번호에만 더해짐)
+        self.offset = start_frame
+        self.log_delta = None
+        self.frames = 0    # 지금까지 넣은 프레임 수
+        self.emitted = 0   # 지금까지 확정한 프레임 수
+        self.backpointers = RingBuffer(self.lag + 1, dtype=np.int16, shape=(self.n_states,))
+
+    def push(self, observations):
+        # observations: 프레임별 관측 bin (보통 activation의 argmax)
+        frames, states = [], []
+        for obs in np.asarray(observations, dtype=np.int64):
+            self._step(obs)
+            if self.frames - self.emitted > self.lag:
+                frames.append(self.offset + self.emitted)
+                states.append(self._backtrack(self.lag))
+                self.emitted += 1
+        return np.array(frames, dtype=np.int64), np.array(states, dtype=np.int64)
+
+    def flush(self):
+        # 남은 프레임을 현재 최적 경로로 모두 확정
+        n = self.frames - self.emitted
+        if n <= 0 or self.log_delta is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        states = np.empty(n, dtype=np.int64)
+        state = int(np.argmax(self.log_delta))
+        states[-1] = state
+        pointers = self.backpointers.read(self.frames - n + 1, self.frames) if n > 1 else None
+        for i in range(n - 2, -1, -1):
+            state = int(pointers[i][state])
+            states[i] = state
+        frames = np.arange(self.emitted, self.frames) + self.offset
+        self.emitted = self.frames
+        return frames, states
+
+    def _step(self, obs):
+        n = self.n_states
+        log_obs = np.full(n, self.log_miss)
+        log_obs[obs] = self.log_hit
+        if self.log_delta is None:
+            delta = log_obs - np.log(n)
+            pointers = np.arange(n)
+        else:
+            w = self.width - 1
+            self._padded[w:w + n] = self.log_delta
+            windows = np.lib.stride_tricks.sliding_window_view(self._padded, n)
+            scores = windows + self.band
+            best = np.argmax(scores, axis=0)
+            delta = scores[best, np.arange(n)] + log_obs
+            pointers = np.arange(n) + best - w
+        self.log_delta = delta - delta.max()
+        self.backpointers.append(pointers)
+        self.frames += 1
+
+    def _backtrack(self, steps):
+        # 현재 프레임에서 steps 프레임 전의 상태
+        state = int(np.argmax(self.log_delta))
+        if steps == 0:
+            return state
+        pointers = self.backpointers.read(self.frames - steps, self.frames)
+        for i in range(steps - 1, -1, -1):
+            state = int(pointers[i][state])
+        return state
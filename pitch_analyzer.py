@@ -1,55 +1,49 @@
 import sys
+from startup import Startup, prewarm  # 가장 먼저: 시작 시각 기록, numba JIT 캐시 위치 설정
 import numpy as np
-import sounddevice as sd
-import librosa
 import pyqtgraph as pg
-import parselmouth
-from parselmouth.praat import call
 from PyQt5.QtWidgets import QMainWindow, QApplication, QLabel, QVBoxLayout, QWidget
 from PyQt5.QtCore import QTimer
+from ring_buffer import RingBuffer
+from audio_source import open_source, source_options
+from note_table import cents_error, hz_to_note_name, note_to_hz
+from pitch_frames import last_voiced_f0
+from pitch_estimators import create_estimator
+from voice_activity import GatedEstimator
+from instrumentation import METRICS_INTERVAL, LatencyMonitor, get_logger
+from voice_quality import StreamingJitterShimmer, analyze_voice
+from expression import StreamingExpression, event_text
+from framing import FrameStage
+from spectral_features import SpectralBalance
+from analysis_scheduler import AnalysisScheduler
+from dsp_process import DSPProcess
+import settings
+
+log = get_logger('pitch_analyzer')
 
 # 설정값
 SAMPLE_RATE = 22050
 FRAME_SIZE = 2048
 HOP_LENGTH = 512
-BUFFER_SIZE = 100
+BUFFER_SIZE = int(5 * SAMPLE_RATE / HOP_LENGTH)  # 최근 5초 (hop 단위)
 TARGET_NOTE = 'G4'
-TARGET_FREQ = librosa.note_to_hz(TARGET_NOTE)
-
-# 센트 오차 계산
-def cents_error(f0, f_ref):
-    if f0 <= 0 or np.isnan(f0):
-        return np.nan
-    return 1200 * np.log2(f0 / f_ref)
-
-# 음계 이름 변환
-def hz_to_note_name(hz):
-    if hz <= 0 or np.isnan(hz):
-        return "-"
-    return librosa.hz_to_note(hz, octave=True)
-
-# Jitter / Shimmer 분석 함수
-def analyze_voice(buffer, sr):
-    snd = parselmouth.Sound(buffer, sampling_frequency=sr)
-    point_process = call(snd, "To PointProcess (periodic, cc)", 75, 500)
-    jitter = call(point_process, "Get jitter (local)", 0, 0, 0.0001, 0.02, 1.3)
-    shimmer = call([snd, point_process], "Get shimmer (local)", 0, 0, 0.0001, 0.02, 1.3, 1.6)
-    return jitter * 100, shimmer * 100  # 백분율로 반환
+TARGET_FREQ = note_to_hz(TARGET_NOTE)
+STARTUP_POLL_MS = 20  # 모델 준비 확인 주기
 
 class RealTimeAnalyzer(QMainWindow):
-    def __init__(self):
+    def __init__(self, source=None, speed=1.0, record=None):
         super().__init__()
         self.setWindowTitle("🎤 실시간 발성 분석기")
         self.setGeometry(100, 100, 800, 600)
 
         # 그래프
         self.plot_widget = pg.PlotWidget(title="Pitch (Hz)")
-        self.plot_widget.setYRange(librosa.note_to_hz('C4'), librosa.note_to_hz('B4'))
+        self.plot_widget.setYRange(note_to_hz('C4'), note_to_hz('B4'))
         self.curve = self.plot_widget.plot(np.zeros(BUFFER_SIZE), pen='y')
 
         # y축 눈금 (도~시)
         note_labels = ['C4', 'D4', 'E4', 'F4', 'G4', 'A4', 'B4']
-        note_ticks = [librosa.note_to_hz(n) for n in note_labels]
+        note_ticks = [note_to_hz(n) for n in note_labels]
         ticks = [(f, n) for f, n in zip(note_ticks, note_labels)]
         self.plot_widget.getAxis('left').setTicks([ticks])
 
@@ -65,67 +59,204 @@ class RealTimeAnalyzer(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-        self.data = np.zeros(BUFFER_SIZE)
-        self.audio_buffer = np.zeros(3 * SAMPLE_RATE, dtype=np.float32)  # 3초간 누적 분석용
+        self.data = RingBuffer(BUFFER_SIZE, dtype=np.float64)
+        backend = settings.PITCH_BACKEND or 'pyin'
+        options = dict(fmin=note_to_hz('C4'), fmax=note_to_hz('B4'), frame_length=FRAME_SIZE, hop_length=HOP_LENGTH)
+        self.source_options = dict(source=source, speed=speed, record=record)
+        if settings.DSP_PROCESS:
+            # 캡처/추론/발성 분석은 자식 프로세스에서, 여기서는 공유 메모리를 읽어 그리기만 함
+            self.dsp = DSPProcess(SAMPLE_RATE, backend, options, blocksize=HOP_LENGTH, interval=0.05,
+                                  audio_seconds=3, voice_quality=3.0, praat_seconds=3, **self.source_options)
+            self.audio_buffer, self.tracker = self.dsp.audio, self.dsp.tracker
+            self.voice_quality, self.monitor = self.dsp.voice_quality, self.dsp.monitor
+            self.startup = Startup('pitch_analyzer')
+        else:
+            self.dsp = None
+            self.audio_buffer = RingBuffer(3 * SAMPLE_RATE)  # 3초간 누적 분석용
+            self.voice_quality = StreamingJitterShimmer(SAMPLE_RATE)
+            # 캡처부터 화면까지의 단계별 지연
+            self.monitor = LatencyMonitor(SAMPLE_RATE)
+            # 모델 로딩/JIT 예열은 백그라운드 스레드에서: 창은 바로 뜨고 스트림은 준비된 뒤 시작
+            self.startup = Startup('pitch_analyzer', lambda: self.load_tracker(backend, options))
+        self.stream = self.dsp  # 로컬 캡처는 모델이 준비된 뒤 check_startup에서 염
+        self.scheduler = None
+        self.pitch = 0.0
+        self.expression_text = ""
+        self.event_text = ""
+        self.praat_quality = None
+
+        # VOCALFRY_METRICS_OVERLAY=1이면 지연을 그래프에 표시
+        if settings.METRICS_OVERLAY:
+            self.monitor.attach_overlay(self.plot_widget)
+
+        self.label.setText("⏳ 피치 모델 준비 중...")
+        self.startup.start()
+        self.startup_timer = QTimer()
+        self.startup_timer.timeout.connect(self.check_startup)
+        self.startup_timer.start(STARTUP_POLL_MS)
+
+    def load_tracker(self, backend, options):
+        # 백그라운드 스레드: 같은 설정의 추정기로 예열(모델/JIT/Praat)한 뒤 실제 추정기를 만듦
+        prewarm(backend, SAMPLE_RATE, options, praat=True)
+        return GatedEstimator(create_estimator(backend, sr=SAMPLE_RATE, **options))
+
+    def check_startup(self):
+        if not self.startup.ready():
+            return
+        self.startup_timer.stop()
+        if self.startup.error is not None:
+            self.label.setText(f"❌ 피치 모델을 불러오지 못했습니다: {self.startup.error}")
+            return
+        if self.dsp is None:
+            self.tracker = self.startup.result
+
+        # 공통 프레이밍/STFT: hop마다 한 번만 자르고 변환해 피치, 스펙트럼 특징, 음량이 함께 씀
+        # (DSP_PROCESS 모드에서는 피치를 자식 프로세스가 계산하므로 GUI는 프레이밍/STFT를 하지 않음)
+        frame_length = getattr(self.tracker, 'frame_length', FRAME_SIZE)
+        hop_length = getattr(self.tracker, 'hop_length', HOP_LENGTH)
+        self.framing = self.spectral = None
+        if self.dsp is None:
+            self.framing = FrameStage(SAMPLE_RATE, frame_length, hop_length)
+            self.pitch_frames = self.framing.subscribe()
+            self.spectral_frames = self.framing.subscribe()
+            self.spectral = SpectralBalance(self.framing.freqs, hop_length / SAMPLE_RATE)
+        # 감정선 피드백용 표현 특징
+        self.expression = StreamingExpression(SAMPLE_RATE, hop_length)
+
+        # 무거운 분석(Praat 기준값)은 GUI 스레드 밖에서 주기적으로 실행
+        self.scheduler = AnalysisScheduler()
+        praat = self.dsp.praat_result if self.dsp is not None else self.praat_analysis
+        self.scheduler.add_job('praat', praat, period=2.0, budget=0.2)
+        self.scheduler.result_ready.connect(self.on_analysis_result)
+        self.scheduler.error.connect(self.on_analysis_error)
+        self.scheduler.start()
 
         # 타이머
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_plot)
         self.timer.start(50)
 
+        self.metrics_timer = QTimer()
+        self.metrics_timer.timeout.connect(self.monitor.report)
+        self.metrics_timer.start(int(METRICS_INTERVAL * 1000))
+
         # 마이크 입력
-        self.stream = sd.InputStream(
-            samplerate=SAMPLE_RATE,
-            blocksize=HOP_LENGTH,
-            channels=1,
-            dtype='float32',
-            callback=self.audio_callback
-        )
+        if self.stream is None:
+            self.stream = open_source(self.audio_callback, SAMPLE_RATE, blocksize=HOP_LENGTH, **self.source_options)
         self.stream.start()
+        self.startup.mark('stream')
 
     def audio_callback(self, indata, frames, time, status):
-        if status:
-            print(status)
-        self.audio_buffer = np.roll(self.audio_buffer, -len(indata))
-        self.audio_buffer[-len(indata):] = indata[:, 0]
+        self.monitor.captured(self.audio_buffer.write(indata[:, 0]), status, time)
+
+    def praat_analysis(self):
+        # 스케줄러 스레드에서 실행 (무음 구간은 생략)
+        if not self.tracker.gate.is_open:
+            return None
+        return analyze_voice(np.array(self.audio_buffer.latest(3 * SAMPLE_RATE), dtype=np.float64), SAMPLE_RATE)
+
+    def on_analysis_result(self, name, result):
+        if name == 'praat':
+            self.praat_quality = result
+
+    def on_analysis_error(self, name, message):
+        log.error("[%s error] %s", name, message)
 
     def update_plot(self):
+        total = self.audio_buffer.total
+        self.monitor.mark('infer_start', total)
+        # 지난 호출 이후 새로 들어온 hop만 한 번 자르고, 피치는 그 프레임으로 분석
         try:
-            f0, voiced_flag, _ = librosa.pyin(
-                self.audio_buffer[-FRAME_SIZE*4:],  # 최근 0.4초
-                fmin=librosa.note_to_hz('C4'),
-                fmax=librosa.note_to_hz('B4'),
-                sr=SAMPLE_RATE,
-                frame_length=FRAME_SIZE,
-                hop_length=HOP_LENGTH
-            )
-            valid = (~np.isnan(f0)) & voiced_flag
-            pitch = f0[valid][-1] if np.any(valid) else 0.0
-        except:
-            pitch = 0.0
+            if self.framing is None:
+                frames = self.tracker.process(self.audio_buffer)   # 자식 프로세스가 쓴 프레임만 꺼냄
+            else:
+                self.framing.update(self.audio_buffer)
+                frames = self.tracker.process_frames(self.pitch_frames.read())
+        except Exception as e:
+            log.error("pitch error: %s", e)
+            frames = None
+        self.monitor.mark('infer_end', total)
+        self.startup.frames(frames)
+        if frames is not None and len(frames.frame):
+            self.stream.record_frames(frames)
+            self.pitch = last_voiced_f0(frames)
+        pitch = self.pitch
 
         note_name = hz_to_note_name(pitch)
         cent = cents_error(pitch, TARGET_FREQ)
         cent_text = f"{cent:+.1f} cents" if not np.isnan(cent) else "-"
 
-        # 2초 주기로 발성 분석
-        if self.timer.remainingTime() % 2000 < 60:
+        # 발성 분석: 새로 들어온 주기만 반영 (최근 3초 창)
+        if frames is not None:
             try:
-                jitter, shimmer = analyze_voice(self.audio_buffer, SAMPLE_RATE)
-                self.label.setText(
-                    f"🎵 현재 음정: {note_name} ({pitch:.1f} Hz), 센트 오차: {cent_text}\n"
-                    f"📊 Jitter: {jitter:.2f}%, Shimmer: {shimmer:.2f}%"
-                )
+                self.voice_quality.update(self.audio_buffer, frames)
             except Exception as e:
-                self.label.setText("분석 오류: " + str(e))
+                log.warning("voice quality error: %s", e)
+                self.voice_quality.reset()
+        if frames is not None:
+            self.update_expression(frames)
+        if self.spectral is not None:
+            self.spectral.update(self.spectral_frames.read())
+        if not self.tracker.gate.is_open:
+            self.label.setText(f"🎵 현재 음정: {note_name}\n🔇 무음 구간 - 발성 분석 생략\n{self.event_text}")
+        else:
+            jitter, shimmer = self.voice_quality.jitter(), self.voice_quality.shimmer()
+            jitter_text = f"{jitter:.2f}%" if not np.isnan(jitter) else "-"
+            shimmer_text = f"{shimmer:.2f}%" if not np.isnan(shimmer) else "-"
+            praat_text = ""
+            if self.praat_quality is not None:
+                praat_text = " (Praat {:.2f}% / {:.2f}%)".format(*self.praat_quality)
+            self.label.setText(
+                f"🎵 현재 음정: {note_name} ({pitch:.1f} Hz), 센트 오차: {cent_text}\n"
+                f"📊 Jitter: {jitter_text}, Shimmer: {shimmer_text}{praat_text}\n"
+                f"{self.expression_text} {self.event_text}\n{self.spectral_text()}"
+            )
+
+        self.monitor.mark('analysis', total)
 
         # 그래프 업데이트
-        self.data = np.roll(self.data, -1)
-        self.data[-1] = pitch if pitch > 0 else np.nan
-        self.curve.setData(self.data)
+        if frames is not None:
+            self.data.write(frames.f0)
+        self.curve.setData(self.data.latest(BUFFER_SIZE))
+        self.monitor.mark('render', total)
+
+    def update_expression(self, frames):
+        try:
+            levels = self.framing.lookup('level_db', frames.frame) if self.framing is not None else None
+            expression = self.expression.update(self.audio_buffer, frames, levels)
+        except Exception as e:
+            log.warning("expression error: %s", e)
+            self.expression.reset()
+            return
+        if len(expression.time):
+            rate, extent = expression.vibrato_rate[-1], expression.vibrato_extent[-1]
+            vibrato = f"〰️ 비브라토 {rate:.1f} Hz ±{extent:.0f}¢" if not np.isnan(rate) else "〰️ 비브라토 -"
+            self.expression_text = f"🔊 {expression.loudness_db[-1]:.0f} dB | {vibrato} |"
+        for event in self.expression.take_events():
+            self.event_text = event_text(event)
+            log.info(self.event_text)
+
+    def spectral_text(self):
+        if self.spectral is None:
+            return ""
+        current = self.spectral.current
+        if np.isnan(current['alpha_db']):
+            return ""
+        return (f"🎛 알파비 {current['alpha_db']:+.1f} dB, Hammarberg {current['hammarberg_db']:.1f} dB, "
+                f"비성 지표 {current['nasal_db']:+.1f} dB")
+
+    def closeEvent(self, event):
+        self.startup_timer.stop()
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        self.monitor.report()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    window = RealTimeAnalyzer()
+    window = RealTimeAnalyzer(**source_options())
     window.show()
     sys.exit(app.exec_())
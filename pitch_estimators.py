@@ -0,0 +1,183 @@
+import numpy as np
+
+from pitch_frames import PitchFrames, concat_frames, empty_frames
+from ring_buffer import RingBuffer
+
+_REGISTRY = {}
+
+
+def register_estimator(name):
+    # 백엔드 생성 함수 등록; 무거운 모듈은 생성 함수 안에서 import
+    def decorator(factory):
+        _REGISTRY[name] = factory
+        return factory
+    return decorator
+
+
+def available_estimators():
+    return sorted(_REGISTRY)
+
+
+def create_estimator(name, sr, fmin, fmax, **options):
+    if name not in _REGISTRY:
+        raise ValueError(f"unknown pitch backend: {name} (available: {', '.join(available_estimators())})")
+    return _REGISTRY[name](sr=sr, fmin=fmin, fmax=fmax, **options)
+
+
+class PitchEstimator:
+    """Streaming pitch estimator: feed audio, get back the frames completed so far.
+
+    Frames are centred like ``center=True`` in librosa/crepe: frame ``k`` covers
+    absolute samples ``[k*hop - frame_length//2, k*hop + frame_length//2)``.
+    ``process(ring)`` analyses only frames that became complete in ``ring``
+    since the previous call; ``push(samples)`` does the same with a private ring.
+    ``skip(stop_frame)`` advances without analysing and yields unvoiced frames.
+    ``process_frames(block)`` takes frames already cut by a shared
+    ``framing.FrameStage`` instead of a ring. Subclasses implement
+    ``_analyze(first, frames)``.
+    """
+
+    def __init__(self, sr, frame_length, hop_length):
+        self.sr = sr
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self._ring = None
+        self.next_frame = 0
+
+    def reset(self):
+        self.next_frame = 0
+
+    def latency(self):
+        # 프레임 k는 k*hop + frame_length/2 샘플이 들어와야 계산 가능
+        return self.frame_length // 2
+
+    def push(self, samples):
+        if self._ring is None:
+            self._ring = RingBuffer(max(4 * self.frame_length, self.sr))
+        self._ring.write(samples)
+        return self.process(self._ring)
+
+    def process(self, ring, stop_frame=None):
+        half = self.frame_length // 2
+        hop = self.hop_length
+        total = ring.total
+        results = []
+
+        # 분석이 밀려 링 버퍼에서 사라진 프레임은 건너뜀
+        first = self.next_frame
+        oldest = total - ring.capacity
+        if first * hop - half < oldest:
+            skip_to = -(-(oldest + half) // hop)
+            results.append(self._skip(first, skip_to))
+            first = skip_to
+
+        last = (total - half) // hop  # 마지막으로 계산 가능한 프레임 (포함)
+        if stop_frame is not None:
+            last = min(last, stop_frame - 1)
+        if last >= first:
+            start = first * hop - half
+            audio = ring.read(max(start, 0), last * hop + half)
+            if start < 0:
+                audio = np.concatenate((np.zeros(-start, dtype=audio.dtype), audio))
+            frames = np.lib.stride_tricks.sliding_window_view(audio, self.frame_length)[::hop]
+            results.append(self._analyze(first, frames))
+            first = last + 1
+        self.next_frame = first
+        return concat_frames(results)
+
+    def process_frames(self, block, stop_frame=None):
+        # FrameStage의 프레임 묶음으로 진행 (프레임 길이/hop이 같아야 함); 이미 본 프레임은 무시
+        if block.frames.shape[1] != self.frame_length:
+            raise ValueError(f"frame length {block.frames.shape[1]} != {self.frame_length}")
+        results = []
+        first = self.next_frame
+        if block.first > first:
+            results.append(self._skip(first, block.first))
+            first = block.first
+        stop = block.first + len(block.frames)
+        if stop_frame is not None:
+            stop = min(stop, stop_frame)
+        if stop > first:
+            results.append(self._analyze(first, block.frames[first - block.first:stop - block.first]))
+            first = stop
+        self.next_frame = first
+        return concat_frames(results)
+
+    def skip(self, stop_frame):
+        # 분석 없이 stop_frame 직전까지 진행 (무음 구간 등)
+        if stop_frame <= self.next_frame:
+            return empty_frames()
+        result = self._skip(self.next_frame, stop_frame)
+        self.next_frame = stop_frame
+        return result
+
+    def flush(self):
+        return empty_frames()
+
+    def _skip(self, first, stop):
+        # 건너뛴 프레임은 무성음(NaN)으로 채움
+        index = np.arange(first, stop)
+        return self._frames(index, np.full(len(index), np.nan), np.zeros(len(index), dtype=bool),
+                            np.zeros(len(index)))
+
+    def _analyze(self, first, frames):
+        raise NotImplementedError
+
+    def _frames(self, index, f0, voiced, confidence):
+        f0 = np.asarray(f0, dtype=np.float64)
+        f0[~voiced] = np.nan
+        return PitchFrames(
+            frame=index,
+            time=index * self.hop_length / self.sr,
+            f0=f0,
+            voiced=voiced,
+            confidence=confidence,
+        )
+
+
+class LibrosaYIN(PitchEstimator):
+    # librosa.yin은 유성/무성 판단이 없어 범위 끝에 붙은 값은 무성음으로 처리
+    def __init__(self, sr, fmin, fmax, frame_length=2048, hop_length=512, trough_threshold=0.1):
+        super().__init__(sr, frame_length, hop_length)
+        self.fmin = fmin
+        self.fmax = fmax
+        self.trough_threshold = trough_threshold
+
+    def _analyze(self, first, frames):
+        import librosa
+        hop = self.hop_length
+        audio = np.concatenate((frames[0], frames[1:, -hop:].reshape(-1)))
+        f0 = librosa.yin(
+            audio.astype(np.float64), fmin=self.fmin, fmax=self.fmax, sr=self.sr,
+            frame_length=self.frame_length, hop_length=hop, center=False,
+            trough_threshold=self.trough_threshold
+        )
+        voiced = (f0 > self.fmin * 1.001) & (f0 < self.fmax * 0.999)
+        return self._frames(np.arange(first, first + len(f0)), f0, voiced, voiced.astype(np.float64))
+
+
+@register_estimator('pyin')
+def _pyin(sr, fmin, fmax, frame_length=2048, hop_length=512, **unused):
+    from streaming_pyin import StreamingPYIN
+    return StreamingPYIN(fmin, fmax, sr=sr, frame_length=frame_length, hop_length=hop_length)
+
+
+@register_estimator('crepe')
+def _crepe(sr, fmin, fmax, hop_length=None, viterbi=True, viterbi_lag=100,
+           decode_frames=None, confidence_threshold=0.5, backend=None, **unused):
+    # backend: activation(frames)를 가진 객체 (여러 세션이 모델 하나를 나눠 쓸 때, analysis_server)
+    from crepe_stream import StreamingCREPE
+    step_size = 10 if hop_length is None else hop_length * 1000 / sr
+    return StreamingCREPE(sr=sr, step_size=step_size, backend=backend, viterbi=viterbi, viterbi_lag=viterbi_lag,
+                          decode_frames=decode_frames, confidence_threshold=confidence_threshold)
+
+
+@register_estimator('yin')
+def _yin(sr, fmin, fmax, frame_length=2048, hop_length=512, **unused):
+    return LibrosaYIN(sr, fmin, fmax, frame_length=frame_length, hop_length=hop_length)
+
+
+@register_estimator('numba_yin')
+def _numba_yin(sr, fmin, fmax, frame_length=2048, hop_length=512, threshold=0.15, **unused):
+    from yin_numba import NumbaYIN
+    return NumbaYIN(sr, fmin, fmax, frame_length=frame_length, hop_length=hop_length, threshold=threshold)
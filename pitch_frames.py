@@ -0,0 +1,42 @@
+from collections import namedtuple
+
+import numpy as np
+
+# 한 번의 호출에서 새로 확정된 hop 단위 피치 결과 (모두 같은 길이의 배열)
+#   frame: 절대 프레임 번호, time: 프레임 중심 시각(초)
+#   f0: Hz (무성음이면 NaN), voiced: bool, confidence: 0~1
+PitchFrames = namedtuple('PitchFrames', ['frame', 'time', 'f0', 'voiced', 'confidence'])
+
+
+def empty_frames():
+    return PitchFrames(
+        frame=np.zeros(0, dtype=np.int64),
+        time=np.zeros(0),
+        f0=np.zeros(0),
+        voiced=np.zeros(0, dtype=bool),
+        confidence=np.zeros(0),
+    )
+
+
+def concat_frames(results):
+    results = [r for r in results if len(r.frame)]
+    if not results:
+        return empty_frames()
+    if len(results) == 1:
+        return results[0]
+    return PitchFrames(*[np.concatenate(field) for field in zip(*results)])
+
+
+def last_voiced_f0(frames, default=0.0):
+    valid = frames.voiced & ~np.isnan(frames.f0)
+    return frames.f0[valid][-1] if np.any(valid) else default
+
+
+def frames_to_rows(frames):
+    # (n, 5) float64 행렬: frame, time, f0, voiced, confidence (파일/공유 메모리 저장용)
+    return np.column_stack([np.asarray(field, dtype=np.float64) for field in frames])
+
+
+def frames_from_rows(rows):
+    rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(PitchFrames._fields))
+    return PitchFrames(rows[:, 0].astype(np.int64), rows[:, 1], rows[:, 2], rows[:, 3].astype(bool), rows[:, 4])
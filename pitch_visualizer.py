@@ -1,24 +1,29 @@
 import sys
+from startup import Startup, prewarm  # 가장 먼저: 시작 시각 기록, numba JIT 캐시 위치 설정
 import numpy as np
-import sounddevice as sd
-import librosa
 import pyqtgraph as pg
 from PyQt5.QtWidgets import QMainWindow, QApplication
 from PyQt5.QtCore import QTimer
+from ring_buffer import RingBuffer
+from audio_source import open_source, source_options
+from note_table import hz_to_note_name, note_to_hz
+from pitch_frames import last_voiced_f0
+from pitch_estimators import create_estimator
+from voice_activity import GatedEstimator
+from instrumentation import METRICS_INTERVAL, LatencyMonitor, get_logger
+import settings
+
+log = get_logger('pitch_visualizer')
 
 # 설정
 SAMPLE_RATE = 22050
 FRAME_SIZE = 2048
 HOP_LENGTH = 512
-BUFFER_SIZE = 100
-
-def hz_to_note_name(hz):
-    if hz <= 0 or np.isnan(hz):
-        return "-"
-    return librosa.hz_to_note(hz, octave=True)
+BUFFER_SIZE = int(5 * SAMPLE_RATE / HOP_LENGTH)  # 최근 5초 (hop 단위)
+STARTUP_POLL_MS = 20  # 모델 준비 확인 주기
 
 class RealTimePitchPlot(QMainWindow):
-    def __init__(self):
+    def __init__(self, source=None, speed=1.0, record=None):
         super().__init__()
         self.setWindowTitle("🎤 실시간 음정 시각화")
         self.setGeometry(100, 100, 800, 400)
@@ -28,57 +33,85 @@ class RealTimePitchPlot(QMainWindow):
         self.setCentralWidget(self.plot_widget)
 
         # 🎯 y축 범위: C4~B4에 해당하는 주파수
-        self.plot_widget.setYRange(librosa.note_to_hz('C4'), librosa.note_to_hz('B4'))
+        self.plot_widget.setYRange(note_to_hz('C4'), note_to_hz('B4'))
 
         # 🎯 y축에 도~시 표시
         note_labels = ['C4', 'D4', 'E4', 'F4', 'G4', 'A4', 'B4']
-        note_ticks = [librosa.note_to_hz(n) for n in note_labels]
+        note_ticks = [note_to_hz(n) for n in note_labels]
         ticks = [(freq, note) for freq, note in zip(note_ticks, note_labels)]
         self.plot_widget.getAxis('left').setTicks([ticks])
 
         # 초기 그래프 데이터
-        self.data = np.zeros(BUFFER_SIZE)
-        self.curve = self.plot_widget.plot(self.data, pen='y')
+        self.data = RingBuffer(BUFFER_SIZE, dtype=np.float64)
+        self.curve = self.plot_widget.plot(self.data.latest(BUFFER_SIZE), pen='y')
 
         # 오디오 버퍼
-        self.audio_buffer = np.zeros(FRAME_SIZE, dtype=np.float32)
+        self.audio_buffer = RingBuffer(SAMPLE_RATE)
+        options = dict(fmin=note_to_hz('C4'), fmax=note_to_hz('B4'), frame_length=FRAME_SIZE, hop_length=HOP_LENGTH)
+        self.source_options = dict(source=source, speed=speed, record=record)
+        self.stream = None
+        self.pitch = 0.0
+
+        # 캡처부터 화면까지의 단계별 지연 (VOCALFRY_METRICS_OVERLAY=1이면 그래프에 표시)
+        self.monitor = LatencyMonitor(SAMPLE_RATE)
+        if settings.METRICS_OVERLAY:
+            self.monitor.attach_overlay(self.plot_widget)
+
+        # 모델 로딩/JIT 예열은 백그라운드 스레드에서: 창은 바로 뜨고 스트림은 준비된 뒤 시작
+        self.startup = Startup('pitch_visualizer', lambda: self.load_tracker(settings.PITCH_BACKEND or 'pyin', options))
+        self.plot_widget.setTitle("⏳ 피치 모델 준비 중...")
+        self.startup.start()
+        self.startup_timer = QTimer()
+        self.startup_timer.timeout.connect(self.check_startup)
+        self.startup_timer.start(STARTUP_POLL_MS)
+
+    def load_tracker(self, backend, options):
+        # 백그라운드 스레드: 같은 설정의 추정기로 예열한 뒤 실제 추정기를 만듦
+        prewarm(backend, SAMPLE_RATE, options)
+        return GatedEstimator(create_estimator(backend, sr=SAMPLE_RATE, **options))
+
+    def check_startup(self):
+        if not self.startup.ready():
+            return
+        self.startup_timer.stop()
+        if self.startup.error is not None:
+            self.plot_widget.setTitle(f"❌ 피치 모델을 불러오지 못했습니다: {self.startup.error}")
+            return
+        self.tracker = self.startup.result
+        self.plot_widget.setTitle("Pitch: -")
 
         # 타이머 설정
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_plot)
         self.timer.start(50)  # 20 fps
 
+        self.metrics_timer = QTimer()
+        self.metrics_timer.timeout.connect(self.monitor.report)
+        self.metrics_timer.start(int(METRICS_INTERVAL * 1000))
+
         # 🎤 마이크 입력 스트림
-        self.stream = sd.InputStream(
-            samplerate=SAMPLE_RATE,
-            blocksize=HOP_LENGTH,
-            channels=1,
-            dtype='float32',
-            callback=self.audio_callback
-        )
+        self.stream = open_source(self.audio_callback, SAMPLE_RATE, blocksize=HOP_LENGTH, **self.source_options)
         self.stream.start()
+        self.startup.mark('stream')
 
     def audio_callback(self, indata, frames, time, status):
-        if status:
-            print(status)
-        self.audio_buffer = np.concatenate((self.audio_buffer[len(indata):], indata[:, 0]))
+        self.monitor.captured(self.audio_buffer.write(indata[:, 0]), status, time)
 
     def update_plot(self):
+        total = self.audio_buffer.total
+        self.monitor.mark('infer_start', total)
+        # 지난 호출 이후 새로 들어온 hop만 분석
         try:
-            f0, voiced_flag, _ = librosa.pyin(
-                self.audio_buffer,
-                fmin=librosa.note_to_hz('C4'),
-                fmax=librosa.note_to_hz('B4'),
-                sr=SAMPLE_RATE,
-                frame_length=FRAME_SIZE,
-                hop_length=HOP_LENGTH
-            )
-            valid_indices = (~np.isnan(f0)) & (voiced_flag)
-            valid_pitch = f0[valid_indices]
-            pitch = valid_pitch[-1] if valid_pitch.size > 0 else 0.0
+            frames = self.tracker.process(self.audio_buffer)
         except Exception as e:
-            print("[Error]", e)
-            pitch = 0.0
+            log.error("pitch error: %s", e)
+            frames = None
+        self.monitor.mark('infer_end', total)
+        self.startup.frames(frames)
+        if frames is not None and len(frames.frame):
+            self.stream.record_frames(frames)
+            self.pitch = last_voiced_f0(frames)
+        pitch = self.pitch
 
         # 계이름 표시
         note_name = hz_to_note_name(pitch)
@@ -87,13 +120,24 @@ class RealTimePitchPlot(QMainWindow):
         else:
             self.plot_widget.setTitle("Pitch: -")
 
+        self.monitor.mark('analysis', total)
+
         # 그래프 데이터 업데이트
-        self.data = np.roll(self.data, -1)
-        self.data[-1] = pitch if pitch > 0 else np.nan
-        self.curve.setData(self.data)
+        if frames is not None:
+            self.data.write(frames.f0)
+        self.curve.setData(self.data.latest(BUFFER_SIZE))
+        self.monitor.mark('render', total)
+
+    def closeEvent(self, event):
+        self.startup_timer.stop()
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+        self.monitor.report()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    window = RealTimePitchPlot()
+    window = RealTimePitchPlot(**source_options())
     window.show()
     sys.exit(app.exec_())
@@ -1,41 +1,35 @@
 import sys
+from startup import Startup, prewarm  # 가장 먼저: 시작 시각 기록, numba JIT 캐시 위치 설정
 import numpy as np
-import sounddevice as sd
-import crepe
 import pyqtgraph as pg
-import parselmouth
-from parselmouth.praat import call
 from PyQt5.QtWidgets import QMainWindow, QApplication, QLabel, QVBoxLayout, QWidget
 from PyQt5.QtCore import QTimer
-import librosa
+from ring_buffer import RingBuffer
+from audio_source import open_source, source_options
+from note_table import DEFAULT_TABLE, hz_to_note_name, note_to_hz
+from pitch_estimators import create_estimator
+from voice_activity import GatedEstimator
+from instrumentation import METRICS_INTERVAL, LatencyMonitor, get_logger
+from voice_quality import StreamingJitterShimmer, analyze_voice
+from analysis_scheduler import AnalysisScheduler
+from dsp_process import DSPProcess
+import settings
+
+log = get_logger('real_time_pitch_plot')
 
 SAMPLE_RATE = 16000
 BUFFER_DURATION = 1.5
 BUFFER_SIZE = int(SAMPLE_RATE * BUFFER_DURATION)
-VISUAL_WINDOW = 100
+STEP_SIZE = 10  # ms
+VISUAL_WINDOW = int(10000 / STEP_SIZE)  # 최근 10초 (프레임 단위)
+UPDATE_MS = 100
+STARTUP_POLL_MS = 20  # 모델 준비 확인 주기
 
-PITCH_MIN = librosa.note_to_hz('C3')  # 130.81 Hz
-PITCH_MAX = librosa.note_to_hz('F5')  # 698.46 Hz
-
-def cents_error(f0, f_ref):
-    if f0 <= 0 or f_ref <= 0 or np.isnan(f0) or np.isnan(f_ref):
-        return np.nan
-    return 1200 * np.log2(f0 / f_ref)
-
-def hz_to_note_name(hz):
-    if hz <= 0 or np.isnan(hz):
-        return "-"
-    return librosa.hz_to_note(hz, octave=True)
-
-def analyze_voice(buffer, sr):
-    snd = parselmouth.Sound(buffer, sampling_frequency=sr)
-    point_process = call(snd, "To PointProcess (periodic, cc)", 75, 500)
-    jitter = call(point_process, "Get jitter (local)", 0, 0, 0.0001, 0.02, 1.3)
-    shimmer = call([snd, point_process], "Get shimmer (local)", 0, 0, 0.0001, 0.02, 1.3, 1.6)
-    return jitter * 100, shimmer * 100
+PITCH_MIN = note_to_hz('C3')  # 130.81 Hz
+PITCH_MAX = note_to_hz('F5')  # 698.46 Hz
 
 class CREPEAnalyzer(QMainWindow):
-    def __init__(self):
+    def __init__(self, source=None, speed=1.0, record=None):
         super().__init__()
         self.setWindowTitle("🎤 CREPE + 발성 분석기 (C3 ~ F5)")
         self.setGeometry(100, 100, 800, 600)
@@ -45,8 +39,8 @@ class CREPEAnalyzer(QMainWindow):
         self.curve = self.plot_widget.plot(np.zeros(VISUAL_WINDOW), pen='y')
 
         note_labels = [f'{n}{o}' for o in range(3, 6) for n in ['C', 'D', 'E', 'F', 'G', 'A', 'B']]
-        note_labels = [n for n in note_labels if PITCH_MIN <= librosa.note_to_hz(n) <= PITCH_MAX]
-        note_ticks = [librosa.note_to_hz(n) for n in note_labels]
+        note_labels = [n for n in note_labels if PITCH_MIN <= note_to_hz(n) <= PITCH_MAX]
+        note_ticks = [note_to_hz(n) for n in note_labels]
         ticks = [(f, n) for f, n in zip(note_ticks, note_labels)]
         self.plot_widget.getAxis('left').setTicks([ticks])
 
@@ -60,58 +54,154 @@ class CREPEAnalyzer(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-        self.audio_buffer = np.zeros(BUFFER_SIZE, dtype=np.float32)
-        self.pitch_history = np.zeros(VISUAL_WINDOW)
+        self.pitch_history = RingBuffer(VISUAL_WINDOW, dtype=np.float64)
+        # 새로 들어온 프레임만 추론하고 activation은 프레임 번호로 캐시
+        backend = settings.PITCH_BACKEND or 'crepe'
+        options = dict(fmin=PITCH_MIN, fmax=PITCH_MAX, hop_length=int(SAMPLE_RATE * STEP_SIZE / 1000), viterbi=True,
+                       decode_frames=int(BUFFER_DURATION * 1000 / STEP_SIZE), confidence_threshold=0.5)
+        if settings.DSP_PROCESS:
+            # 캡처/추론/발성 분석은 자식 프로세스에서, 여기서는 공유 메모리를 읽어 그리기만 함
+            self.dsp = DSPProcess(SAMPLE_RATE, backend, options, interval=UPDATE_MS / 1000,
+                                  audio_seconds=BUFFER_DURATION, voice_quality=BUFFER_DURATION,
+                                  praat_seconds=BUFFER_DURATION, source=source, speed=speed, record=record)
+            self.audio_buffer, self.tracker = self.dsp.audio, self.dsp.tracker
+            self.voice_quality, self.monitor = self.dsp.voice_quality, self.dsp.monitor
+            self.startup = Startup('real_time_pitch_plot')
+        else:
+            self.dsp = None
+            self.audio_buffer = RingBuffer(BUFFER_SIZE)
+            # 기존 Praat 분석과 같은 길이(버퍼 1.5초)의 창
+            self.voice_quality = StreamingJitterShimmer(SAMPLE_RATE, window=BUFFER_DURATION)
+            # 캡처부터 화면까지의 단계별 지연
+            self.monitor = LatencyMonitor(SAMPLE_RATE)
+            # 모델 로딩/JIT 예열은 백그라운드 스레드에서: 창은 바로 뜨고 스트림은 준비된 뒤 시작
+            self.startup = Startup('real_time_pitch_plot', lambda: self.load_tracker(backend, options))
+        self.source_options = dict(source=source, speed=speed, record=record)
+        self.stream = self.dsp  # 로컬 캡처는 모델이 준비된 뒤 check_startup에서 염
+        self.scheduler = None
+        self.pitch = 0.0
+        self.praat_quality = None
+
+        # VOCALFRY_METRICS_OVERLAY=1이면 지연을 그래프에 표시
+        if settings.METRICS_OVERLAY:
+            self.monitor.attach_overlay(self.plot_widget)
+
+        self.startup.start()
+        self.startup_timer = QTimer()
+        self.startup_timer.timeout.connect(self.check_startup)
+        self.startup_timer.start(STARTUP_POLL_MS)
+
+    def load_tracker(self, backend, options):
+        # 백그라운드 스레드: 타이머 한 번 분량씩 흘려 예열(모델/Praat)한 뒤 실제 추정기를 만듦
+        prewarm(backend, SAMPLE_RATE, options, block=SAMPLE_RATE * UPDATE_MS // 1000, praat=True)
+        return GatedEstimator(create_estimator(backend, sr=SAMPLE_RATE, **options))
+
+    def check_startup(self):
+        if not self.startup.ready():
+            return
+        self.startup_timer.stop()
+        if self.startup.error is not None:
+            self.label.setText(f"❌ 피치 모델을 불러오지 못했습니다: {self.startup.error}")
+            return
+        if self.dsp is None:
+            self.tracker = self.startup.result
+
+        # 무거운 분석(Praat 기준값)은 GUI 스레드 밖에서 주기적으로 실행
+        self.scheduler = AnalysisScheduler()
+        praat = self.dsp.praat_result if self.dsp is not None else self.praat_analysis
+        self.scheduler.add_job('praat', praat, period=2.0, budget=0.2)
+        self.scheduler.result_ready.connect(self.on_analysis_result)
+        self.scheduler.error.connect(self.on_analysis_error)
+        self.scheduler.start()
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_plot)
-        self.timer.start(100)
-
-        self.stream = sd.InputStream(
-            samplerate=SAMPLE_RATE,
-            channels=1,
-            dtype='float32',
-            callback=self.audio_callback
-        )
+        self.timer.start(UPDATE_MS)
+
+        self.metrics_timer = QTimer()
+        self.metrics_timer.timeout.connect(self.monitor.report)
+        self.metrics_timer.start(int(METRICS_INTERVAL * 1000))
+
+        if self.stream is None:
+            self.stream = open_source(self.audio_callback, SAMPLE_RATE, **self.source_options)
         self.stream.start()
+        self.startup.mark('stream')
 
     def audio_callback(self, indata, frames, time, status):
-        if status:
-            print(status)
-        self.audio_buffer = np.roll(self.audio_buffer, -len(indata))
-        self.audio_buffer[-len(indata):] = indata[:, 0]
+        self.monitor.captured(self.audio_buffer.write(indata[:, 0]), status, time)
+
+    def praat_analysis(self):
+        # 스케줄러 스레드에서 실행 (무음 구간은 생략)
+        if not self.tracker.gate.is_open:
+            return None
+        return analyze_voice(np.array(self.audio_buffer.latest(BUFFER_SIZE), dtype=np.float64), SAMPLE_RATE)
+
+    def on_analysis_result(self, name, result):
+        if name == 'praat':
+            self.praat_quality = result
+
+    def on_analysis_error(self, name, message):
+        log.error("[%s error] %s", name, message)
 
     def update_plot(self):
+        total = self.audio_buffer.total
+        self.monitor.mark('infer_start', total)
         try:
-            audio = self.audio_buffer.astype(np.float32)
-            _, freq_array, confidence, _ = crepe.predict(
-                audio, SAMPLE_RATE, viterbi=True, step_size=100
-            )
-            pitch = freq_array[-1] if confidence[-1] > 0.5 and PITCH_MIN <= freq_array[-1] <= PITCH_MAX else 0.0
-        except:
-            pitch = 0.0
+            frames = self.tracker.process(self.audio_buffer)
+        except Exception as e:
+            log.error("CREPE error: %s", e)
+            frames = None
+        self.monitor.mark('infer_end', total)
+        self.startup.frames(frames)
+        if frames is not None and len(frames.frame):
+            self.stream.record_frames(frames)
+            f0 = frames.f0
+            f0[(f0 < PITCH_MIN) | (f0 > PITCH_MAX)] = np.nan
+            self.pitch_history.write(f0)
+            self.pitch = f0[-1] if not np.isnan(f0[-1]) else 0.0
+        pitch = self.pitch
 
         note_name = hz_to_note_name(pitch)
-        target_freq = librosa.note_to_hz(note_name) if note_name != "-" else 0
-        cent = cents_error(pitch, target_freq)
+        cent = float(DEFAULT_TABLE.cents(pitch))  # 가장 가까운 음 기준
         cent_text = f"{cent:+.1f} cents" if not np.isnan(cent) else "-"
 
-        if self.timer.remainingTime() % 2000 < 150:
+        if frames is not None:
             try:
-                jitter, shimmer = analyze_voice(self.audio_buffer, SAMPLE_RATE)
-                self.label.setText(
-                    f"🎵 음정: {note_name} ({pitch:.1f} Hz), 센트 오차: {cent_text}\n"
-                    f"📊 Jitter: {jitter:.2f}%, Shimmer: {shimmer:.2f}%"
-                )
+                self.voice_quality.update(self.audio_buffer, frames)
             except Exception as e:
-                self.label.setText("분석 오류: " + str(e))
+                log.warning("voice quality error: %s", e)
+                self.voice_quality.reset()
+        if not self.tracker.gate.is_open:
+            self.label.setText(f"🎵 음정: {note_name}\n🔇 무음 구간 - 발성 분석 생략")
+        else:
+            jitter, shimmer = self.voice_quality.jitter(), self.voice_quality.shimmer()
+            jitter_text = f"{jitter:.2f}%" if not np.isnan(jitter) else "-"
+            shimmer_text = f"{shimmer:.2f}%" if not np.isnan(shimmer) else "-"
+            praat_text = ""
+            if self.praat_quality is not None:
+                praat_text = " (Praat {:.2f}% / {:.2f}%)".format(*self.praat_quality)
+            self.label.setText(
+                f"🎵 음정: {note_name} ({pitch:.1f} Hz), 센트 오차: {cent_text}\n"
+                f"📊 Jitter: {jitter_text}, Shimmer: {shimmer_text}{praat_text}"
+            )
+
+        self.monitor.mark('analysis', total)
+
+        self.curve.setData(self.pitch_history.latest(VISUAL_WINDOW))
+        self.monitor.mark('render', total)
 
-        self.pitch_history = np.roll(self.pitch_history, -1)
-        self.pitch_history[-1] = pitch if pitch > 0 else np.nan
-        self.curve.setData(self.pitch_history)
+    def closeEvent(self, event):
+        self.startup_timer.stop()
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        self.monitor.report()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    window = CREPEAnalyzer()
+    window = CREPEAnalyzer(**source_options())
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+import settings
+from note_table import DEFAULT_TABLE
+from pitch_estimators import create_estimator
+from pitch_frames import concat_frames
+from voice_activity import frame_levels
+
+# 분석 기본값: 16 kHz, 10 ms hop (CREPE와 같은 프레임 간격)
+ANALYSIS_SR = 16000
+ANALYSIS_HOP = 160
+ANALYSIS_FRAME = 1024
+ANALYSIS_FMIN = 65.0     # C2
+ANALYSIS_FMAX = 1047.0   # C6
+COST_BLOCK = 256         # DTW 비용을 한 번에 계산하는 행 수
+
+# 한 녹음의 프레임별 윤곽 (f0는 무성음이면 NaN)
+Contours = namedtuple('Contours', ['time', 'f0', 'energy_db'])
+# 시범 프레이즈 하나에 대한 사용자 편차
+#   cents: 정렬된 유성 프레임의 음정 차이 중앙값, onset_error: 시작 시각 차이(초)
+#   duration_ratio: 사용자 길이 / 시범 길이, coverage: 시범 유성 프레임 중 사용자도 유성인 비율
+PhraseDeviation = namedtuple('PhraseDeviation', ['start', 'end', 'cents', 'cents_spread', 'onset_error',
+                                                 'duration_ratio', 'coverage'])
+
+
+def analysis_params(backend=None, sr=ANALYSIS_SR, hop_length=ANALYSIS_HOP, frame_length=ANALYSIS_FRAME,
+                    fmin=ANALYSIS_FMIN, fmax=ANALYSIS_FMAX):
+    params = dict(backend=backend or settings.PITCH_BACKEND or 'pyin', sr=sr, hop_length=hop_length,
+                  frame_length=frame_length, fmin=fmin, fmax=fmax)
+    if params['backend'] == 'crepe':
+        # 모델이 바뀌면 결과도 바뀌므로 캐시 키에 포함
+        params.update(capacity=settings.CREPE_CAPACITY, runtime=settings.CREPE_RUNTIME,
+                      quantization=settings.CREPE_QUANTIZATION)
+    return params
+
+
+def analyze_audio(audio, params):
+    """Pitch and energy contours of a whole recording, one frame per hop.
+
+    Frames are centred (frame ``k`` on sample ``k * hop``) and the audio is fed
+    to the streaming estimator in blocks, so any registered backend works.
+    """
+    sr, hop, frame_length = params['sr'], params['hop_length'], params['frame_length']
+    audio = np.asarray(audio, dtype=np.float32)
+    estimator = create_estimator(params['backend'], sr=sr, fmin=params['fmin'], fmax=params['fmax'],
+                                 frame_length=frame_length, hop_length=hop)
+    # 끝 프레임도 중심 정렬되도록 뒤에 반 프레임만큼 0을 붙임
+    padded = np.concatenate((audio, np.zeros(frame_length // 2, dtype=np.float32)))
+    block = max(sr // 2, frame_length)
+    results = [estimator.push(padded[i:i + block]) for i in range(0, len(padded), block)]
+    results.append(estimator.flush())
+    frames = concat_frames(results)
+
+    n = min(len(frames.frame), len(audio) // hop + 1)
+    centred = np.pad(audio, frame_length // 2)
+    level_db, _ = frame_levels(centred, frame_length, hop)
+    f0 = np.where(frames.voiced[:n], frames.f0[:n], np.nan)
+    return Contours(frames.time[:n], f0, level_db[:n])
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ReferenceCache:
+    """Disk cache of reference (teacher) contours.
+
+    Entries are keyed by the file's content hash and the analysis parameters,
+    so a reference is analysed once per backend/settings and reused for every
+    student attempt, even if the file is renamed or moved.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(settings.CACHE_DIR, 'references')
+
+    def key(self, path, params):
+        blob = json.dumps(params, sort_keys=True).encode()
+        return hashlib.sha1(_file_hash(path).encode() + blob).hexdigest()
+
+    def load(self, path, params=None):
+        import librosa
+        params = params or analysis_params()
+        cache_path = os.path.join(self.cache_dir, self.key(path, params) + '.npz')
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                return Contours(data['time'], data['f0'], data['energy_db'])
+
+        audio, _ = librosa.load(path, sr=params['sr'], mono=True)
+        contours = analyze_audio(audio, params)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = cache_path + '.tmp.npz'
+        np.savez(tmp_path, params=json.dumps(params), **contours._asdict())
+        os.replace(tmp_path, cache_path)
+        return contours
+
+
+def _frame_costs(user_midi, ref_midi, unvoiced_cost, max_cost):
+    # 둘 다 유성: 반음 차이 (상한 max_cost), 한쪽만 유성: unvoiced_cost, 둘 다 무성: 0
+    user_voiced = ~np.isnan(user_midi)
+    ref_voiced = ~np.isnan(ref_midi)
+    cost = np.minimum(np.abs(np.nan_to_num(user_midi) - np.nan_to_num(ref_midi)), max_cost)
+    cost = np.where(user_voiced & ref_voiced, cost, np.where(user_voiced | ref_voiced, unvoiced_cost, 0.0))
+    return cost
+
+
+def banded_dtw(user_midi, ref_midi, band=100, unvoiced_cost=1.0, max_cost=3.0):
+    """DTW path between two MIDI contours within a diagonal band.
+
+    Row ``i`` (user frame) only considers reference frames within ``band`` of
+    the diagonal ``i * (m - 1) / (n - 1)``. Costs are computed in vectorized
+    blocks of ``COST_BLOCK`` rows and the horizontal steps of each row are
+    resolved with a min-plus scan (cumulative sum + ``minimum.accumulate``),
+    so the only per-row Python work is a handful of NumPy calls. Memory is one block of cost rows plus one
+    int8 step per band cell: linear in the length for a fixed band.
+    Returns ``(user_index, ref_index, total_cost)``.
+    """
+    user_midi = np.asarray(user_midi, dtype=np.float64)
+    ref_midi = np.asarray(ref_midi, dtype=np.float64)
+    n, m = len(user_midi), len(ref_midi)
+    if n == 0 or m == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.inf
+    width = 2 * band + 1
+    slope = (m - 1) / max(n - 1, 1)
+    starts = np.clip(np.round(np.arange(n) * slope).astype(np.int64) - band, 0, max(m - width, 0))
+    offsets = np.arange(width)
+    steps = np.zeros((n, width), dtype=np.int8)   # 0: 대각, 1: 세로(사용자만 진행), 2: 가로(시범만 진행)
+
+    prev = None
+    for i in range(n):
+        if i % COST_BLOCK == 0:
+            # band 안의 비용 행렬을 COST_BLOCK 행씩 한 번에 계산
+            cols = starts[i:i + COST_BLOCK, None] + offsets
+            block_valid = cols < m
+            block_cost = _frame_costs(user_midi[i:i + COST_BLOCK, None], ref_midi[np.minimum(cols, m - 1)],
+                                      unvoiced_cost, max_cost)
+            block_cost[~block_valid] = np.inf
+        valid = block_valid[i % COST_BLOCK]
+        cost = block_cost[i % COST_BLOCK]
+        if prev is None:
+            best = np.full(width, np.inf)
+            best[0] = 0.0 if starts[0] == 0 else np.inf
+            step = np.zeros(width, dtype=np.int8)
+        else:
+            shift = starts[i] - starts[i - 1]
+            padded = np.concatenate(([np.inf], prev, np.full(shift + 1, np.inf)))
+            diag = padded[shift:shift + width]
+            vert = padded[shift + 1:shift + 1 + width]
+            best = np.minimum(diag, vert)
+            step = np.where(vert < diag, 1, 0).astype(np.int8)
+        # 가로 이동: D[j] = min(best[j] + c[j], D[j-1] + c[j]) -> 누적합 + 누적 최솟값
+        with np.errstate(invalid='ignore'):
+            total = np.cumsum(np.where(valid, cost, 0.0))
+            candidate = best + cost - total
+            scan = np.minimum.accumulate(np.where(np.isnan(candidate), np.inf, candidate))
+            row = scan + total
+        row[~valid] = np.inf
+        horizontal = row < best + cost - 1e-9
+        step[horizontal] = 2
+        steps[i] = step
+        prev = row
+
+    # 역추적 (j는 각 행의 band 안 위치)
+    j = m - 1 - starts[n - 1]
+    if j >= width or not np.isfinite(prev[j]):
+        raise ValueError("reference end is outside the DTW band; increase band")
+    total_cost = prev[j]
+    i = n - 1
+    user_index, ref_index = [], []
+    while True:
+        col = starts[i] + j
+        user_index.append(i)
+        ref_index.append(col)
+        if i == 0 and col == 0:
+            break
+        step = steps[i, j]
+        if step == 2:
+            j -= 1
+        else:
+            i -= 1
+            j = col - (step == 0) - starts[i]
+    return np.array(user_index[::-1]), np.array(ref_index[::-1]), total_cost
+
+
+def reference_phrases(contours, min_gap=0.25, min_length=0.2):
+    # 시범 녹음을 무성 구간(min_gap 이상) 기준으로 프레이즈 [start, end) 프레임으로 나눔
+    voiced = ~np.isnan(contours.f0)
+    if not np.any(voiced):
+        return []
+    hop = contours.time[1] - contours.time[0] if len(contours.time) > 1 else 1.0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    runs = list(zip(edges[::2], edges[1::2]))
+    phrases = [list(runs[0])]
+    for start, end in runs[1:]:
+        if (start - phrases[-1][1]) * hop < min_gap:
+            phrases[-1][1] = end
+        else:
+            phrases.append([start, end])
+    return [(start, end) for start, end in phrases if (end - start) * hop >= min_length]
+
+
+def phrase_deviations(user, reference, user_index, ref_index, phrases):
+    user_midi = DEFAULT_TABLE.hz_to_midi(user.f0)
+    ref_midi = DEFAULT_TABLE.hz_to_midi(reference.f0)
+    deviations = []
+    for start, end in phrases:
+        inside = (ref_index >= start) & (ref_index < end)
+        if not np.any(inside):
+            continue
+        u, r = user_index[inside], ref_index[inside]
+        diff = 100 * (user_midi[u] - ref_midi[r])
+        ref_voiced = ~np.isnan(ref_midi[r])
+        diff = diff[~np.isnan(diff)]
+        cents = float(np.median(diff)) if len(diff) else np.nan
+        spread = float(np.median(np.abs(diff - cents))) if len(diff) else np.nan
+        user_span = user.time[u[-1]] - user.time[u[0]]
+        ref_span = reference.time[end - 1] - reference.time[start]
+        deviations.append(PhraseDeviation(
+            start=float(reference.time[start]),
+            end=float(reference.time[end - 1]),
+            cents=cents,
+            cents_spread=spread,
+            onset_error=float(user.time[u[0]] - reference.time[start]),
+            duration_ratio=float(user_span / ref_span) if ref_span > 0 else np.nan,
+            coverage=float(np.mean(~np.isnan(user_midi[u][ref_voiced]))) if np.any(ref_voiced) else np.nan,
+        ))
+    return deviations
+
+
+class ReferenceAligner:
+    """Compares student takes against one instructor recording.
+
+    The reference contours come from ``ReferenceCache`` (analysed once, then
+    read from disk); each call to ``compare`` analyses only the student audio,
+    aligns the two MIDI contours with ``banded_dtw`` and returns the path and
+    per-phrase pitch/timing deviations.
+    """
+
+    def __init__(self, reference_path, params=None, cache=None, band_seconds=2.0):
+        self.params = params or analysis_params()
+        self.cache = cache or ReferenceCache()
+        self.reference = self.cache.load(reference_path, self.params)
+        self.phrases = reference_phrases(self.reference)
+        self.band = int(band_seconds * self.params['sr'] / self.params['hop_length'])
+
+    def compare(self, audio):
+        user = analyze_audio(audio, self.params)
+        user_index, ref_index, cost = banded_dtw(
+            DEFAULT_TABLE.hz_to_midi(user.f0), DEFAULT_TABLE.hz_to_midi(self.reference.f0), band=self.band
+        )
+        return user, (user_index, ref_index), phrase_deviations(user, self.reference, user_index, ref_index,
+                                                                self.phrases)
+
+
+if __name__ == '__main__':
+    # 사용법: python reference_alignment.py 시범.wav 사용자.wav
+    import sys
+    import librosa
+    if len(sys.argv) != 3:
+        sys.exit("usage: python reference_alignment.py reference.wav take.wav")
+    aligner = ReferenceAligner(sys.argv[1])
+    take, _ = librosa.load(sys.argv[2], sr=aligner.params['sr'], mono=True)
+    _, _, deviations = aligner.compare(take)
+    for n, d in enumerate(deviations, 1):
+        print(f"🎼 프레이즈 {n} ({d.start:.2f}~{d.end:.2f}s): 음정 {d.cents:+.0f} cents (±{d.cents_spread:.0f}), "
+              f"시작 {d.onset_error:+.2f}s, 길이 x{d.duration_ratio:.2f}, 유성 일치 {d.coverage:.0%}")
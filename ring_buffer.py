@@ -0,0 +1,132 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Single-producer / single-consumer ring buffer over a preallocated array.
+
+    Every sample is written twice (at ``i % capacity`` and ``i % capacity + capacity``)
+    so any range of up to ``capacity`` samples is one contiguous slice and can be
+    handed out as a view without copying. ``total`` counts every sample ever
+    written; it is only advanced after the data is in place, so a reader that
+    snapshots ``total`` never sees a half-written block. A view stays valid until
+    the producer writes over it, i.e. roughly ``capacity - len(view)`` samples later.
+
+    ``shape`` makes each slot a fixed-size row (e.g. one 360-bin CREPE activation).
+    """
+
+    def __init__(self, capacity, dtype=np.float32, fill=0.0, shape=()):
+        self.capacity = int(capacity)
+        self.shape = tuple(shape)
+        self._buf = np.full((2 * self.capacity,) + self.shape, fill, dtype=dtype)
+        self.total = 0  # 누적 샘플 수 (단조 증가)
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def write(self, samples):
+        samples = np.asarray(samples).reshape((-1,) + self.shape)
+        n = len(samples)
+        if n == 0:
+            return self.total
+        cap = self.capacity
+        skip = max(0, n - cap)
+        if skip:
+            samples = samples[skip:]
+        start = (self.total + skip) % cap
+        first = min(len(samples), cap - start)
+        rest = len(samples) - first
+        buf = self._buf
+        buf[start:start + first] = samples[:first]
+        buf[start + cap:start + cap + first] = samples[:first]
+        if rest:
+            buf[:rest] = samples[first:]
+            buf[cap:cap + rest] = samples[first:]
+        self.total += n
+        return self.total
+
+    def append(self, value):
+        cap = self.capacity
+        pos = self.total % cap
+        self._buf[pos] = value
+        self._buf[pos + cap] = value
+        self.total += 1
+
+    def read(self, start, stop):
+        # 절대 샘플 위치 [start, stop) 구간의 view
+        if stop > self.total or stop < start:
+            raise ValueError(f"invalid range [{start}, {stop}) with total={self.total}")
+        if start < self.total - self.capacity:
+            raise IndexError(f"samples before {self.total - self.capacity} were overwritten")
+        begin = start % self.capacity
+        return self._buf[begin:begin + (stop - start)]
+
+    def latest(self, n):
+        # 가장 최근 n개 샘플 (아직 채워지지 않은 부분은 fill 값)
+        n = min(int(n), self.capacity)
+        total = self.total
+        begin = (total - n) % self.capacity
+        return self._buf[begin:begin + n]
+
+
+class SharedRingBuffer(RingBuffer):
+    """``RingBuffer`` whose samples and ``total`` live in ``multiprocessing.shared_memory``.
+
+    The creating process owns the block and unlinks it on ``close()``; another
+    process attaches with ``SharedRingBuffer.attach(spec)``. ``total`` is an
+    int64 counter at the start of the block, stored only after the data, so it
+    works as a sequence number across processes. A reader can be lapped while
+    it copies, so cross-process reads go through ``snapshot()``, which copies
+    and then checks the range was not overwritten meanwhile.
+    """
+
+    HEADER = 64  # total(int64) + 정렬 여유
+
+    def __init__(self, capacity, dtype=np.float32, shape=(), name=None, readonly=False):
+        from multiprocessing import shared_memory
+        self.capacity = int(capacity)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        size = self.HEADER + 2 * self.capacity * int(np.prod(self.shape, dtype=np.int64)) * self.dtype.itemsize
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._counter = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        self._buf = np.ndarray((2 * self.capacity,) + self.shape, dtype=self.dtype, buffer=self.shm.buf,
+                               offset=self.HEADER)
+        if self.owner:
+            self._counter[0] = 0
+            self._buf[:] = 0
+        if readonly:
+            self._buf.flags.writeable = False
+            self._counter.flags.writeable = False
+
+    @property
+    def total(self):
+        return int(self._counter[0])
+
+    @total.setter
+    def total(self, value):
+        self._counter[0] = value
+
+    def spec(self):
+        # 다른 프로세스에 넘길 정보 (pickle 가능)
+        return dict(name=self.shm.name, capacity=self.capacity, dtype=self.dtype.str, shape=self.shape)
+
+    @classmethod
+    def attach(cls, spec, readonly=False):
+        return cls(spec['capacity'], dtype=spec['dtype'], shape=spec['shape'], name=spec['name'], readonly=readonly)
+
+    def snapshot(self, start, stop):
+        data = np.array(self.read(start, stop))
+        if start < self.total - self.capacity:
+            raise IndexError(f"samples before {self.total - self.capacity} were overwritten while copying")
+        return data
+
+    def close(self):
+        # numpy view를 먼저 놓아야 공유 메모리를 닫을 수 있음
+        self._counter = self._buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
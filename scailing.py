@@ -1,36 +1,31 @@
 import sys
+from startup import Startup, prewarm  # 가장 먼저: 시작 시각 기록, numba JIT 캐시 위치 설정
 import numpy as np
-import sounddevice as sd
 import pyqtgraph as pg
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QGraphicsTextItem
-import crepe
+from inference_worker import InferenceWorker, COALESCE
+from ring_buffer import RingBuffer
+from audio_source import open_source, source_options
+from note_table import DEFAULT_TABLE, midi_to_freq, midi_to_note_name, snap_to_midi
+from time_series import TimeSeries
+from scale_scoring import ScaleScorer, generate_scaling_sequence
+from pitch_estimators import create_estimator
+from voice_activity import GatedEstimator
+from dsp_process import DSPProcess
+from instrumentation import METRICS_INTERVAL, LatencyMonitor, get_logger
+import settings
 
-NOTE_NAMES_FULL = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+log = get_logger('scailing')
 
-def generate_scaling_sequence():
-    sequence = []
-    for base_midi in range(60, 80):
-        ascending = [base_midi + i for i in range(5)]
-        descending = ascending[-2::-1]
-        full_scale = ascending + descending
-        sequence.append(full_scale)
-    return sequence
-
-def midi_to_note_name(midi):
-    return NOTE_NAMES_FULL[midi % 12] + str(midi // 12 - 1)
-
-def midi_to_freq(midi):
-    return 440.0 * (2 ** ((midi - 69) / 12))
-
-def snap_to_midi(freq):
-    midi = 69 + 12 * np.log2(freq / 440.0)
-    return int(round(midi))
+HISTORY_SIZE = 60 * 100  # 최근 60초 (10 ms 프레임 기준)
+STARTUP_POLL_MS = 20  # 모델 준비 확인 주기
+NOTE_SECONDS = 1.0  # 목표음 하나의 길이
 
 class ScailingTrainer(QMainWindow):
-    def __init__(self):
+    def __init__(self, source=None, speed=1.0, record=None):
         super().__init__()
         self.setWindowTitle("🎵 스케일링 발성 연습기")
         self.setGeometry(100, 100, 800, 400)
@@ -38,7 +33,9 @@ class ScailingTrainer(QMainWindow):
         self.expected_sequence = generate_scaling_sequence()
         self.current_index = 0
         self.current_scale = self.expected_sequence[self.current_index]
-        self.user_sequence = []
+        # 부른 음을 나눠 목표 스케일에 정렬하고 음마다 채점
+        self.scorer = ScaleScorer()
+        self.score_text = ""
 
         self.y_axis = pg.AxisItem(orientation='left')
         self.plot_widget = pg.PlotWidget(axisItems={'left': self.y_axis})
@@ -46,39 +43,103 @@ class ScailingTrainer(QMainWindow):
         self.plot_widget.setLabel('bottom', 'Time (s)')
 
         self.plot_data = self.plot_widget.plot(pen=pg.mkPen('c', width=2))
-        self.guide_bars = []  # stores (bar, x_start, x_end, midi)
+        # 목표음 막대: 한 스케일의 막대를 모두 하나의 선분 묶음(connect='pairs')으로 그림
+        # 좌표는 스트림 시각 기준이고, 스크롤은 아이템 위치만 옮김
+        # 일부러 현재 스케일만 보관: 사용자 곡선도 scale_start부터만 그리므로 막대도 스케일마다 비움
+        # (버퍼는 가장 긴 스케일 크기로 한 번만 잡고, 막대는 제시 시각에 하나씩 채움)
+        self.guide_x = np.zeros(2 * max(len(scale) for scale in self.expected_sequence))
+        self.guide_y = np.zeros_like(self.guide_x)
+        self.guide_count = 0
+        self.guide_item = pg.PlotDataItem(pen=pg.mkPen('g', width=6), connect='pairs')
+        self.plot_widget.addItem(self.guide_item)
         self.note_label = QGraphicsTextItem()
         self.note_label.setDefaultTextColor(pg.mkColor('w'))
         self.note_label.setFont(QFont("Arial", 16, QFont.Bold))
         self.plot_widget.addItem(self.note_label)
 
-        self.data = []
-        self.elapsed_time = 0.0
-        self.update_interval = 0.05
+        # 프레임별 (시각, 피치, 신뢰도, MIDI 음), 최근 60초만 보관
+        self.history = TimeSeries(HISTORY_SIZE, fields=('pitch', 'confidence', 'note'))
+        self.scale_start = 0.0
+        self.update_interval = 1 / 60
         self.x_range = 10.0
         self.current_note_text = ""
 
         self.sample_rate = 16000
         self.block_size = 2048
 
-        self.stream = sd.InputStream(
-            callback=self.audio_callback,
-            samplerate=self.sample_rate,
-            channels=1,
-            dtype='float32',
-            blocksize=self.block_size
-        )
-        self.stream.start()
+        # 피치 백엔드 (기본: CREPE + 블록 사이에서도 trellis를 유지하는 fixed-lag Viterbi)
+        self.viterbi_lag = 100
+        backend = settings.PITCH_BACKEND or 'crepe'
+        options = dict(fmin=midi_to_freq(60), fmax=midi_to_freq(84),
+                       viterbi=True, viterbi_lag=self.viterbi_lag, confidence_threshold=0.5)
+        self.analyzed = 0  # 마지막으로 결과를 반영한 절대 샘플 위치
+
+        if settings.DSP_PROCESS:
+            # 캡처와 CREPE 추론은 자식 프로세스에서, 여기서는 공유 메모리의 프레임을 update_plot에서 꺼냄
+            self.dsp = DSPProcess(self.sample_rate, backend, options, blocksize=self.block_size,
+                                  interval=self.block_size / self.sample_rate, audio_seconds=2,
+                                  source=source, speed=speed, record=record)
+            self.audio, self.monitor, self.stream = self.dsp.audio, self.dsp.monitor, self.dsp
+            self.startup = Startup('scailing')
+        else:
+            self.dsp = None
+            self.audio = RingBuffer(2 * self.sample_rate)
+            # 캡처부터 화면까지의 단계별 지연
+            self.monitor = LatencyMonitor(self.sample_rate)
+            self.stream = None
+            # 모델 로딩/예열은 백그라운드 스레드에서: 창은 바로 뜨고 스트림은 준비된 뒤 시작
+            self.startup = Startup('scailing', lambda: self.load_tracker(backend, options))
+        self.source_options = dict(source=source, speed=speed, record=record)
+        self.worker = None
+        # VOCALFRY_METRICS_OVERLAY=1이면 지연을 그래프에 표시
+        if settings.METRICS_OVERLAY:
+            self.monitor.attach_overlay(self.plot_widget)
+        self.current_note_text = "⏳ 피치 모델 준비 중..."
+        self.startup.start()
+        self.startup_timer = QTimer()
+        self.startup_timer.timeout.connect(self.check_startup)
+        self.startup_timer.start(STARTUP_POLL_MS)
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_plot)
         self.timer.start(int(self.update_interval * 1000))
 
+        self.metrics_timer = QTimer()
+        self.metrics_timer.timeout.connect(self.monitor.report)
+        self.metrics_timer.start(int(METRICS_INTERVAL * 1000))
+
         self.scale_step_index = 0
         self.note_timer = QTimer()
         self.note_timer.timeout.connect(self.next_note_in_scale)
 
         self.set_scale_range()
+
+    def load_tracker(self, backend, options):
+        # 백그라운드 스레드: 같은 설정의 추정기에 오디오 블록 크기로 흘려 예열한 뒤 실제 추정기를 만듦
+        prewarm(backend, self.sample_rate, options, block=self.block_size)
+        return GatedEstimator(create_estimator(backend, sr=self.sample_rate, **options))
+
+    def check_startup(self):
+        if not self.startup.ready():
+            return
+        self.startup_timer.stop()
+        self.current_note_text = ""
+        if self.startup.error is not None:
+            self.current_note_text = f"❌ 피치 모델을 불러오지 못했습니다: {self.startup.error}"
+            return
+        if self.dsp is None:
+            self.tracker = self.startup.result
+            # CREPE 추론은 별도 스레드에서 실행
+            self.worker = InferenceWorker(self.predict_block, self.audio, max_queue=4, policy=COALESCE,
+                                          monitor=self.monitor, read=False)
+            self.worker.result_ready.connect(self.on_pitch_result)
+            self.worker.error.connect(self.on_pitch_error)
+            self.worker.start()
+            self.stream = open_source(self.audio_callback, self.sample_rate, blocksize=self.block_size,
+                                      **self.source_options)
+        self.stream.start()
+        self.startup.mark('stream')
+        # 목표음 제시는 오디오가 들어오기 시작할 때부터
         self.start_scale_timing()
 
     def set_scale_range(self):
@@ -93,25 +154,28 @@ class ScailingTrainer(QMainWindow):
 
     def start_scale_timing(self):
         self.scale_step_index = 0
-        self.user_sequence = []
-        self.elapsed_time = 0.0
-        self.data = []
-        for bar, *_ in self.guide_bars:
-            self.plot_widget.removeItem(bar)
-        self.guide_bars.clear()
-        self.note_timer.start(1000)
+        # 이전 스케일의 궤적은 그리지 않음 (기록은 그대로 두고 구간만 옮김)
+        self.scale_start = self.audio.total / self.sample_rate
+        # i번째 목표음은 스케일 시작 후 (i + 1)초에 막대로 제시됨
+        cues = [self.scale_start + (i + 1) * NOTE_SECONDS for i in range(len(self.current_scale))]
+        self.report_scores(self.scorer.start(self.current_scale, cues))
+        self.score_text = ""
+        self.guide_count = 0
+        self.guide_item.setData([], [])
+        self.note_timer.start(int(NOTE_SECONDS * 1000))
 
     def next_note_in_scale(self):
         if self.scale_step_index < len(self.current_scale):
             midi = self.current_scale[self.scale_step_index]
-            bar_width = 1.0  # seconds
-            x_end = self.x_range
-            x_start = x_end - bar_width
-            bar = pg.PlotDataItem(x=[x_start, x_end], y=[midi, midi], pen=pg.mkPen('g', width=6))
-            self.plot_widget.addItem(bar)
-            self.guide_bars.append((bar, x_start, x_end, midi))
+            bar_width = NOTE_SECONDS
+            x_end = self.audio.total / self.sample_rate
+            i = 2 * self.guide_count
+            self.guide_x[i:i + 2] = (x_end - bar_width, x_end)
+            self.guide_y[i:i + 2] = midi
+            self.guide_count += 1
+            self.guide_item.setData(self.guide_x[:i + 2], self.guide_y[:i + 2], connect='pairs')
             self.scale_step_index += 1
-            self.note_timer.start(1000)
+            self.note_timer.start(int(NOTE_SECONDS * 1000))
         else:
             self.advance_scale()
 
@@ -120,72 +184,92 @@ class ScailingTrainer(QMainWindow):
         self.current_scale = self.expected_sequence[self.current_index]
         self.set_scale_range()
         self.start_scale_timing()
-        print("\n▶️ New scale:", [midi_to_note_name(m) for m in self.current_scale])
+        log.info("▶️ New scale: %s", [midi_to_note_name(m) for m in self.current_scale])
 
     def audio_callback(self, indata, frames, time, status):
+        # 블록 길이는 그대로 받음 (ResamplingSource는 블록마다 한두 샘플씩 길이가 다름)
         audio = indata[:, 0]
+        start = self.audio.total
+        stop = self.audio.write(audio)
+        self.monitor.captured(stop, status, time)
+        self.worker.submit(start, stop)
+
+    def predict_block(self, start, stop):
+        # 공유 링을 절대 위치로 분석: 버려지거나 합쳐진 블록이 있어도 프레임 번호/시각이 캡처 시계와 맞음
+        # (링에서 이미 덮어써진 구간은 추정기가 무성 프레임으로 건너뜀)
+        stop_frame = (stop - self.tracker.frame_length // 2) // self.tracker.hop_length + 1
+        return self.tracker.process(self.audio, stop_frame=stop_frame)
 
-        if len(audio) < 1024:
+    def on_pitch_result(self, stop, frames):
+        self.analyzed = stop
+        self.startup.frames(frames)
+        if len(frames.frame) == 0:
             return
+        self.stream.record_frames(frames)
+        # 프레임마다 가장 가까운 MIDI 음 (무성음은 NaN)
+        notes = DEFAULT_TABLE.nearest_midi(frames.f0)
+        notes[~frames.voiced] = np.nan
+        self.history.extend(frames.time, pitch=frames.f0, confidence=frames.confidence, note=notes)
+        self.report_scores(self.scorer.push(frames))
+
+        freq, confidence = frames.f0[-1], frames.confidence[-1]
+
+        # 주파수가 충분히 자신 있을 때만
+        if frames.voiced[-1]:
+            midi = snap_to_midi(freq)
+            note = midi_to_note_name(midi)
+            self.current_note_text = note
+
+            # ✅ 실시간 정보 출력 (DEBUG 레벨)
+            log.debug("[🎙] Freq: %.2f Hz | Confidence: %.2f | Note: %s", freq, confidence, note)
 
-        try:
-            # CREPE로 예측
-            _, freq, confidence, _ = crepe.predict(audio, self.sample_rate, viterbi=True, verbose =0)
-
-            # 주파수가 충분히 자신 있을 때만
-            if confidence[0] > 0.5:
-                midi = snap_to_midi(freq[0])
-                note = midi_to_note_name(midi)
-                self.data.append(midi)
-                self.current_note_text = note
-                self.user_sequence.append(midi)
-
-                # ✅ 실시간 정보 출력
-                print(f"[🎙] Freq: {freq[0]:.2f} Hz | Confidence: {confidence[0]:.2f} | Note: {note}")
-
-            else:
-                self.data.append(np.nan)
-                self.current_note_text = ""
-        except Exception as e:
-            print("CREPE error:", e)
-            self.data.append(np.nan)
+        else:
             self.current_note_text = ""
+        self.monitor.mark('analysis', stop)
+
+    def on_pitch_error(self, message):
+        log.error("CREPE error: %s", message)
+        # 선을 끊는 NaN은 마지막 프레임 시각에 (캡처 시각은 Viterbi 지연만큼 앞서 있어 시간 순서가 깨짐)
+        if len(self.history):
+            self.history.append(self.history.last_time)
+        self.current_note_text = ""
 
-    def check_pitch_match(self):
-        expected = self.current_scale[:len(self.user_sequence)]
-        if self.user_sequence == expected:
-            print("✅ Scale match!")
-        elif len(self.user_sequence) <= len(expected):
-            mismatch = any(abs(u - e) > 1 for u, e in zip(self.user_sequence, expected))
-            if mismatch:
-                print("❌ Incorrect note detected")
+    def report_scores(self, scores):
+        # 음 하나가 끝날 때마다 채점 결과 출력
+        for score in scores:
+            onset = f"{score.onset_error:+.2f}s" if not np.isnan(score.onset_error) else "-"
+            stability = f"{score.stability:.0f} cents" if not np.isnan(score.stability) else "-"
+            self.score_text = f"{midi_to_note_name(score.target)} {score.cents:+.0f} cents"
+            log.info("🎯 %s: %+.1f cents | 시작 %s | 흔들림 %s",
+                     midi_to_note_name(score.target), score.cents, onset, stability)
 
     def update_plot(self):
-        self.elapsed_time += self.update_interval
-
-        # shift bars to left
-        updated_bars = []
-        for bar, x_start, x_end, midi in self.guide_bars:
-            x_start -= self.update_interval
-            x_end -= self.update_interval
-            if x_end < 0:
-                self.plot_widget.removeItem(bar)
-            else:
-                bar.setData([x_start, x_end], [midi, midi])
-                updated_bars.append((bar, x_start, x_end, midi))
-        self.guide_bars = updated_bars
-
-        # update user plot
-        x_full = [i * self.update_interval for i in range(len(self.data))]
-        keep_start_idx = next((i for i, v in enumerate(x_full) if v >= 0), 0)
-        x = [self.x_range - (self.elapsed_time - i * self.update_interval) for i in range(keep_start_idx, len(self.data))]
-        y = self.data[keep_start_idx:]
-        self.plot_data.setData(x, y)
+        if self.dsp is not None:
+            self.on_pitch_result(self.dsp.analyzed, self.dsp.poll())
+        # 현재 시각이 오른쪽 끝(x_range)에 오도록 목표음 막대와 사용자 곡선을 함께 이동
+        now = self.audio.total / self.sample_rate
+        self.guide_item.setPos(self.x_range - now, 0)
+
+        # update user plot: 최근 x_range초를 복사 없이 넘김
+        window = self.history.window(max(self.scale_start, now - self.x_range))
+        self.plot_data.setData(window['time'], window['note'])
+        self.plot_data.setPos(self.x_range - now, 0)
         self.plot_widget.setXRange(0, self.x_range)
-        self.note_label.setPlainText(self.current_note_text)
+        self.note_label.setPlainText(f"{self.current_note_text}\n{self.score_text}".strip())
+        self.monitor.mark('render', self.analyzed)
+
+    def closeEvent(self, event):
+        self.startup_timer.stop()
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+        if self.worker is not None:
+            self.worker.stop()
+        self.monitor.report()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = ScailingTrainer()
+    window = ScailingTrainer(**source_options())
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,215 @@
+from collections import namedtuple
+
+import numpy as np
+
+from note_table import DEFAULT_TABLE
+
+# 완성된 한 음 (시각은 초, midi는 소수 MIDI, stability는 유지 구간의 피치 표준편차(cents))
+SungNote = namedtuple('SungNote', ['onset', 'offset', 'midi', 'stability'])
+# 목표음에 정렬된 채점 결과 (onset_error는 같은 목표음의 두 번째 조각부터 NaN)
+NoteScore = namedtuple('NoteScore', ['index', 'target', 'midi', 'cents', 'onset_error', 'stability', 'onset', 'offset'])
+
+
+def generate_scaling_sequence():
+    # 반음 다섯 개를 올라갔다 내려오는 9음 패턴 (base+0..4..0, 장음계 도레미파솔이 아님)
+    # C4부터 시작음을 반음씩 올려 20개 스케일, MIDI 번호
+    sequence = []
+    for base_midi in range(60, 80):
+        ascending = [base_midi + i for i in range(5)]
+        descending = ascending[-2::-1]
+        full_scale = ascending + descending
+        sequence.append(full_scale)
+    return sequence
+
+
+class NoteSegmenter:
+    """Cuts a streaming pitch track into sung notes, one frame at a time.
+
+    A note keeps running sums of its frames' MIDI values, so each frame costs
+    O(1). A frame more than ``split_cents`` away from the current note's mean
+    starts a tentative new note; if the departure lasts ``change_time`` seconds
+    the note is split there, otherwise the frames are folded back (vibrato,
+    scoops). Unvoiced gaps longer than ``max_gap`` end the note. Notes shorter
+    than ``min_duration`` are dropped, and the first ``attack`` seconds of a
+    note are left out of its pitch and stability.
+    """
+
+    def __init__(self, split_cents=60.0, change_time=0.05, max_gap=0.06,
+                 min_duration=0.1, attack=0.05, table=None):
+        self.split = split_cents / 100
+        self.change_time = change_time
+        self.max_gap = max_gap
+        self.min_duration = min_duration
+        self.attack = attack
+        self.table = table or DEFAULT_TABLE
+        self.reset()
+
+    def reset(self):
+        self._note = None      # [onset, last, n, sum, hold_n, hold_sum, hold_sumsq]
+        self._pending = []     # 새 음 후보 프레임 (시각, midi)
+
+    def push(self, frames):
+        notes = []
+        midi = self.table.hz_to_midi(np.where(frames.voiced, frames.f0, np.nan))
+        for t, m in zip(frames.time.tolist(), midi.tolist()):
+            note = self._step(t, m)
+            if note is not None:
+                notes.append(note)
+        return notes
+
+    def flush(self):
+        # 진행 중인 음을 끝내고 반환 (남은 후보 프레임은 change_time보다 짧으므로 현재 음에 합침)
+        for t, m in self._pending:
+            self._add(t, m)
+        self._pending = []
+        note = self._close()
+        return [note] if note is not None else []
+
+    def _step(self, t, m):
+        note = self._note
+        if m != m:  # NaN: 무성음
+            last = self._pending[-1][0] if self._pending else (note[1] if note is not None else None)
+            if last is not None and t - last > self.max_gap:
+                finished = self.flush()
+                return finished[0] if finished else None
+            return None
+        if note is None:
+            self._add(t, m)
+            return None
+        if abs(m - note[3] / note[2]) <= self.split:
+            # 잠깐 벗어났다 돌아온 프레임은 현재 음에 합침
+            for pt, pm in self._pending:
+                self._add(pt, pm)
+            self._pending = []
+            self._add(t, m)
+            return None
+        self._pending.append((t, m))
+        if t - self._pending[0][0] < self.change_time:
+            return None
+        # 충분히 오래 벗어남: 후보 지점에서 음을 나눔
+        finished = self._close()
+        pending, self._pending = self._pending, []
+        for pt, pm in pending:
+            self._add(pt, pm)
+        return finished
+
+    def _add(self, t, m):
+        if self._note is None:
+            self._note = [t, t, 0, 0.0, 0, 0.0, 0.0]
+        note = self._note
+        note[1] = t
+        note[2] += 1
+        note[3] += m
+        if t - note[0] >= self.attack:
+            note[4] += 1
+            note[5] += m
+            note[6] += m * m
+
+    def _close(self):
+        note, self._note = self._note, None
+        if note is None or note[1] - note[0] < self.min_duration:
+            return None
+        onset, offset, n, total, hold_n, hold_sum, hold_sumsq = note
+        if hold_n == 0:
+            return SungNote(onset, offset, total / n, np.nan)
+        mean = hold_sum / hold_n
+        variance = max(hold_sumsq / hold_n - mean * mean, 0.0)
+        return SungNote(onset, offset, mean, 100 * np.sqrt(variance))
+
+
+class OnlineNoteAligner:
+    """Banded online DTW from sung notes to an expected note sequence.
+
+    States are target indices (``-1`` = before the first target). For each
+    sung note a target is reached from the same target (a held note split in
+    two), the previous one, or two back (a skipped target, ``skip_penalty``).
+    The local cost is the pitch distance in semitones plus ``onset_weight``
+    times the onset distance in seconds, both capped. Only targets within
+    ``band`` of the current best state are kept, so each step is O(band)
+    whatever the exercise length, and the note is assigned to the best state
+    right away.
+    """
+
+    def __init__(self, targets, onsets=None, band=2, skip_penalty=1.0, stay_penalty=0.25,
+                 onset_weight=0.5, max_pitch_cost=3.0, max_onset_cost=1.0):
+        self.targets = np.asarray(targets, dtype=np.float64)
+        self.onsets = None if onsets is None else np.asarray(onsets, dtype=np.float64)
+        self.band = band
+        self.skip_penalty = skip_penalty
+        self.stay_penalty = stay_penalty
+        self.onset_weight = onset_weight
+        self.max_pitch_cost = max_pitch_cost
+        self.max_onset_cost = max_onset_cost
+        self.cost = {-1: 0.0}
+        self.last_index = None
+
+    def _local(self, note, j):
+        cost = min(abs(note.midi - self.targets[j]), self.max_pitch_cost)
+        if self.onsets is not None:
+            cost += self.onset_weight * min(abs(note.onset - self.onsets[j]), self.max_onset_cost)
+        return cost
+
+    def push(self, note):
+        prev = self.cost
+        lo = max(min(prev), 0)
+        hi = min(max(prev) + 2, len(self.targets) - 1)
+        cost = {}
+        for j in range(lo, hi + 1):
+            best = min(prev.get(j, np.inf) + self.stay_penalty if j >= 0 else np.inf,
+                       prev.get(j - 1, np.inf),
+                       prev.get(j - 2, np.inf) + self.skip_penalty)
+            if best < np.inf:
+                cost[j] = best + self._local(note, j)
+        if not cost:
+            # 목표음을 모두 지남: 마지막 음에 붙임
+            return len(self.targets) - 1
+        index = min(cost, key=cost.get)
+        self.cost = {j: c for j, c in cost.items() if abs(j - index) <= self.band}
+        return index
+
+
+class ScaleScorer:
+    """Streaming scorer for one scale at a time: segment, align, score.
+
+    ``start(targets, onsets)`` sets the expected MIDI notes (and optionally
+    their cue times on the same clock as the pitch frames); ``push(frames)``
+    returns a ``NoteScore`` for every sung note completed by those frames,
+    with its cents error against the aligned target, onset error against the
+    cue, and hold stability.
+    """
+
+    def __init__(self, table=None, **segmenter_options):
+        self.segmenter = NoteSegmenter(table=table, **segmenter_options)
+        self.aligner = None
+        self.scores = []
+
+    def start(self, targets, onsets=None):
+        # 이전 스케일에서 진행 중이던 음을 채점하고 새 스케일로
+        scores = self.flush()
+        self.aligner = OnlineNoteAligner(targets, onsets)
+        self.scores = []
+        return scores
+
+    def push(self, frames):
+        if self.aligner is None or len(frames.frame) == 0:
+            return []
+        return [self._score(note) for note in self.segmenter.push(frames)]
+
+    def flush(self):
+        if self.aligner is None:
+            self.segmenter.reset()
+            return []
+        return [self._score(note) for note in self.segmenter.flush()]
+
+    def _score(self, note):
+        aligner = self.aligner
+        index = aligner.push(note)
+        target = aligner.targets[index]
+        onset_error = np.nan
+        if aligner.onsets is not None and index != aligner.last_index:
+            onset_error = note.onset - aligner.onsets[index]
+        aligner.last_index = index
+        score = NoteScore(index, int(target), note.midi, 100 * (note.midi - target), onset_error,
+                          note.stability, note.onset, note.offset)
+        self.scores.append(score)
+        return score
@@ -0,0 +1,35 @@
+import os
+
+
+# 환경 변수(VOCALFRY_*)로 덮어쓸 수 있는 공통 설정
+def _env(name, default):
+    return os.environ.get('VOCALFRY_' + name, default)
+
+
+CACHE_DIR = _env('CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'vocalfry'))
+# numba JIT 디스크 캐시 (startup에서 NUMBA_CACHE_DIR로 설정, 다음 실행부터 컴파일 생략)
+NUMBA_CACHE_DIR = _env('NUMBA_CACHE_DIR', os.path.join(CACHE_DIR, 'numba'))
+
+# CREPE 모델: 용량 tiny / small / medium / large / full
+#             런타임 keras / tflite, 양자화 none / float16 / int8 (tflite 전용)
+CREPE_CAPACITY = _env('CREPE_CAPACITY', 'full')
+CREPE_RUNTIME = _env('CREPE_RUNTIME', 'keras')
+CREPE_QUANTIZATION = _env('CREPE_QUANTIZATION', 'none')
+
+# 피치 추정 백엔드: pyin / crepe / yin / numba_yin (비워두면 앱별 기본값)
+PITCH_BACKEND = _env('PITCH_BACKEND', '')
+
+# 음 이름/센트 계산의 기준 음 A4 (Hz)
+TUNING = float(_env('TUNING', 440.0))
+
+# 로그 레벨 (DEBUG면 프레임마다 피치를 출력), 지연 측정 오버레이(1이면 표시)와 JSON lines 덤프 파일
+LOG_LEVEL = _env('LOG_LEVEL', 'INFO')
+METRICS_OVERLAY = _env('METRICS_OVERLAY', '0') == '1'
+METRICS_FILE = _env('METRICS_FILE', '')
+
+# 마이크 캡처 레이트: 비워두면 앱의 분석 레이트 그대로, 'native'면 장치 기본 레이트, 숫자면 그 레이트
+# (분석 레이트와 다르면 resampler.StreamingResampler로 블록마다 변환)
+CAPTURE_RATE = _env('CAPTURE_RATE', 'native')
+
+# 1이면 캡처와 분석을 자식 프로세스에서 돌리고 GUI는 공유 메모리를 읽어 그리기만 함
+DSP_PROCESS = _env('DSP_PROCESS', '0') == '1'
@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+import numpy as np
+
+# 프레임별 스펙트럼 균형 (발성음이 아닌 프레임은 NaN)
+#   centroid: 50 Hz ~ 5 kHz 무게중심 (Hz)
+#   alpha_db: 1~5 kHz 대 50 Hz~1 kHz 에너지 비 (dB, 높을수록 눌린/긴장된 발성)
+#   hammarberg_db: 0~2 kHz 최대 대 2~5 kHz 최대 (dB, 낮을수록 긴장된 발성)
+#   nasal_db: 150~350 Hz 최대 대 400~1000 Hz 최대 (dB, P0-A1 근사; 높을수록 비성)
+SpectralFrames = namedtuple('SpectralFrames', ['frame', 'centroid', 'alpha_db', 'hammarberg_db', 'nasal_db'])
+
+
+def _band(freqs, lo, hi):
+    return slice(np.searchsorted(freqs, lo), np.searchsorted(freqs, hi))
+
+
+class SpectralBalance:
+    """Spectral tension / nasality cues from the shared STFT frames.
+
+    Reads ``FrameBlock`` spectra from a ``FrameStage`` cursor, so it adds band
+    sums over spectra that already exist rather than another pass over the
+    audio. Frames below ``min_db`` are left out, and each cue is smoothed with
+    a one-pole filter of ``smooth`` seconds. Only the ``current`` values and
+    smoothing state are kept: O(1) per frame.
+    """
+
+    def __init__(self, freqs, hop_seconds, min_db=-45.0, smooth=0.2):
+        self.freqs = freqs
+        self.min_db = min_db
+        self._coef = np.exp(-hop_seconds / smooth)
+        self._full = _band(freqs, 50, 5000)
+        self._low = _band(freqs, 50, 1000)
+        self._high = _band(freqs, 1000, 5000)
+        self._below_2k = _band(freqs, 0, 2000)
+        self._above_2k = _band(freqs, 2000, 5000)
+        self._nasal = _band(freqs, 150, 350)
+        self._f1 = _band(freqs, 400, 1000)
+        self.reset()
+
+    def reset(self):
+        self.current = dict(centroid=np.nan, alpha_db=np.nan, hammarberg_db=np.nan, nasal_db=np.nan)
+
+    def update(self, block):
+        n = len(block.level_db)
+        frame = np.arange(block.first, block.first + n)
+        power = np.asarray(block.spectrum, dtype=np.float64) ** 2
+        active = block.level_db > self.min_db
+        full = power[:, self._full]
+
+        def ratio_db(a, b):
+            return 10 * np.log10((a + 1e-12) / (b + 1e-12))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = dict(
+                centroid=(full @ self.freqs[self._full]) / full.sum(axis=1),
+                alpha_db=ratio_db(power[:, self._high].sum(axis=1), power[:, self._low].sum(axis=1)),
+                hammarberg_db=ratio_db(power[:, self._below_2k].max(axis=1), power[:, self._above_2k].max(axis=1)),
+                nasal_db=ratio_db(power[:, self._nasal].max(axis=1), power[:, self._f1].max(axis=1)),
+            )
+        result = {}
+        for name, raw in values.items():
+            out = np.full(n, np.nan)
+            state = self.current[name]
+            for i in np.flatnonzero(active):
+                state = raw[i] if state != state else self._coef * state + (1 - self._coef) * raw[i]
+                out[i] = state
+            self.current[name] = state
+            result[name] = out
+        return SpectralFrames(frame, **result)
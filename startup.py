@@ -0,0 +1,187 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import settings
+from instrumentation import get_logger, table_cell
+
+log = get_logger('startup')
+
+# 앱 진입점에서 가장 먼저 import: 시작 시각 기록 + numba JIT 캐시 위치 (numba는 import 시점에 읽음)
+STARTED = time.perf_counter()
+os.environ.setdefault('NUMBA_CACHE_DIR', settings.NUMBA_CACHE_DIR)
+
+WARM_SECONDS = 1.0   # 예열에 흘려보내는 합성 음 길이
+STAGES = ('window', 'loaded', 'stream', 'first_frame', 'first_pitch')
+STAGE_NAMES = dict(window='창', loaded='모델 준비', stream='스트림 시작', first_frame='첫 프레임', first_pitch='첫 피치')
+
+
+def warm_tone(sr, fmin, fmax, seconds=WARM_SECONDS):
+    # 범위 가운데 음의 배음 합성음 (무성 판정으로 빠지는 경로 없이 전부 돌도록)
+    f0 = np.sqrt(fmin * fmax)
+    t = np.arange(int(seconds * sr)) / sr
+    audio = sum(np.sin(2 * np.pi * k * f0 * t) / k for k in range(1, 8) if k * f0 < 0.45 * sr)
+    return (0.2 * audio).astype(np.float32)
+
+
+def prewarm(backend, sr, options, block=None, praat=False):
+    """Load and exercise a pitch backend once so the live path never pays for it.
+
+    A throwaway estimator with the same settings is fed ``WARM_SECONDS`` of
+    tone in ``block``-sized pushes, which imports the backend, builds the
+    CREPE model (cached per process by ``crepe_backend.get_backend``) and
+    compiles the numba/librosa kernels (cached on disk under
+    ``NUMBA_CACHE_DIR``). With ``praat`` parselmouth is loaded too. Returns
+    seconds spent per step.
+    """
+    from pitch_estimators import create_estimator
+    timings = {}
+    started = time.perf_counter()
+    estimator = create_estimator(backend, sr=sr, **options)
+    timings['load'] = time.perf_counter() - started
+    block = block or estimator.hop_length
+    audio = warm_tone(sr, options.get('fmin', 100.0), options.get('fmax', 800.0))
+    started = time.perf_counter()
+    for i in range(0, len(audio), block):
+        estimator.push(audio[i:i + block])
+    estimator.flush()
+    timings['warm'] = time.perf_counter() - started
+    if praat:
+        from voice_quality import analyze_voice
+        started = time.perf_counter()
+        analyze_voice(audio.astype(np.float64), sr)
+        timings['praat'] = time.perf_counter() - started
+    return timings
+
+
+class Startup:
+    """Runs ``load`` on a background thread and times the way to the first pitch.
+
+    The GUI builds its window, calls ``start()`` and polls ``ready()`` from a
+    timer; once it returns True the loaded ``result`` is used to open the
+    audio stream. Stage times (``window`` shown, model ``loaded``, ``stream``
+    started, ``first_frame`` analysed, ``first_pitch`` voiced) are seconds
+    since this module was imported, i.e. roughly since launch. They are
+    logged once the first pitch arrives and appended to
+    ``settings.METRICS_FILE``. ``load=None`` skips loading (``DSP_PROCESS``
+    mode warms up in the child process).
+    """
+
+    def __init__(self, name, load=None):
+        self.name = name
+        self.marks = {}
+        self.result = None
+        self.error = None
+        self._load = load
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._load is None:
+            self._done.set()
+            return
+        self._thread = threading.Thread(target=self._run, name="startup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.result = self._load()
+        except Exception as e:
+            self.error = e
+            log.exception("startup failed")
+        finally:
+            self._done.set()
+
+    def ready(self):
+        # GUI 타이머에서 호출: 첫 호출 = 이벤트 루프가 돌기 시작해 창이 보인 시점
+        self.mark('window')
+        if not self._done.is_set():
+            return False
+        self.mark('loaded')
+        return True
+
+    def mark(self, stage):
+        self.marks.setdefault(stage, time.perf_counter() - STARTED)
+
+    def frames(self, frames):
+        # 분석 결과마다 호출; 첫 유성 프레임에서 한 번 보고
+        if 'first_pitch' in self.marks or frames is None or len(frames.frame) == 0:
+            return
+        self.mark('first_frame')
+        if np.any(frames.voiced):
+            self.mark('first_pitch')
+            self.report()
+
+    def report(self):
+        text = ", ".join(f"{STAGE_NAMES[stage]} {self.marks[stage]:.2f} s" for stage in STAGES if stage in self.marks)
+        log.info("⏱ %s 시작: %s", self.name, text)
+        if settings.METRICS_FILE:
+            with open(settings.METRICS_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(dict(time=time.time(), startup=self.name, stages=self.marks)) + '\n')
+
+
+# ---------------------------------------------------------------- 측정 CLI
+
+def measure_start(path, warm):
+    """Cold start of one ``benchmark.PATHS`` entry; meant to run in a fresh process.
+
+    Returns the prewarm time (0 without ``warm``), the time to build the real
+    estimator, the first and the median later ``push`` of a live-sized block
+    and the time until the first voiced frame, all measured from the call.
+    """
+    from benchmark import FMAX, FMIN, PATHS
+    from pitch_estimators import create_estimator
+    config = dict(PATHS[path])
+    backend, sr, block = config.pop('backend'), config.pop('sr'), config.pop('block')
+    options = dict(fmin=FMIN, fmax=FMAX, **config)
+    started = time.perf_counter()
+    timings = prewarm(backend, sr, options, block) if warm else {}
+    prewarmed = time.perf_counter()
+    estimator = create_estimator(backend, sr=sr, **options)
+    built = time.perf_counter()
+    audio = warm_tone(sr, 196.0, 392.0, seconds=2.0)
+    times, first_pitch = [], np.nan
+    for i in range(0, len(audio), block):
+        t0 = time.perf_counter()
+        frames = estimator.push(audio[i:i + block])
+        times.append(time.perf_counter() - t0)
+        if first_pitch != first_pitch and np.any(frames.voiced):
+            first_pitch = time.perf_counter() - started
+    return dict(path=path, warm=warm, prewarm_s=prewarmed - started, build_s=built - prewarmed,
+                first_ms=times[0] * 1000, steady_ms=float(np.median(times[1:]) * 1000),
+                first_pitch_s=first_pitch, **{f"{k}_s": v for k, v in timings.items()})
+
+
+def main(argv=None):
+    from benchmark import PATHS
+    parser = argparse.ArgumentParser(description="콜드 스타트 측정: 예열 유무에 따른 첫 블록 지연과 첫 피치까지의 시간")
+    parser.add_argument('--paths', nargs='+', choices=sorted(PATHS), default=['pyin-2048', 'yin', 'numba_yin'])
+    parser.add_argument('--runs', type=int, default=2, help="경로마다 새 프로세스로 반복 (2번째부터 JIT 디스크 캐시 사용)")
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'path':<13}{'run':>4}{'warm':>6}{'prewarm s':>11}{'build s':>9}{'1st ms':>9}{'next ms':>9}{'pitch s':>9}")
+    for path in args.paths:
+        for run in range(args.runs):
+            for warm in (False, True):
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    try:
+                        r = pool.submit(measure_start, path, warm).result()
+                    except Exception as e:
+                        print(f"{path:<13}⚠️ 건너뜀: {type(e).__name__}: {e}")
+                        break
+                print(f"{path:<13}{run + 1:>4}{'o' if warm else 'x':>6}{r['prewarm_s']:>11.2f}{r['build_s']:>9.3f}"
+                      f"{r['first_ms']:>9.1f}{r['steady_ms']:>9.2f}" + table_cell(r['first_pitch_s'], '.2f', 9))
+    print(f"JIT 캐시: {os.environ['NUMBA_CACHE_DIR']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import numpy as np
+import scipy.stats
+import librosa
+
+from pitch_estimators import PitchEstimator
+
+
+def _cumulative_mean_normalized_difference(frames, win_length, min_period, max_period):
+    # frames: (n_frames, frame_length), librosa.pyin과 같은 YIN 차분 함수
+    frame_length = frames.shape[-1]
+    a = np.fft.rfft(frames, frame_length, axis=-1)
+    b = np.fft.rfft(frames[:, win_length:0:-1], frame_length, axis=-1)
+    acf = np.fft.irfft(a * b, frame_length, axis=-1)[:, win_length:]
+    acf[np.abs(acf) < 1e-6] = 0
+
+    energy = np.cumsum(frames ** 2, axis=-1)
+    energy = energy[:, win_length:] - energy[:, :-win_length]
+    energy[np.abs(energy) < 1e-6] = 0
+
+    diff = energy[:, :1] + energy - 2 * acf
+    numerator = diff[:, min_period:max_period + 1]
+    tau = np.arange(1, max_period + 1)
+    cumulative_mean = np.cumsum(diff[:, 1:max_period + 1], axis=-1) / tau
+    denominator = cumulative_mean[:, min_period - 1:max_period]
+    return numerator / (denominator + np.finfo(denominator.dtype).tiny)
+
+
+def _parabolic_interpolation(yin):
+    shifts = np.zeros_like(yin)
+    a = (yin[:, :-2] + yin[:, 2:] - 2 * yin[:, 1:-1]) / 2
+    b = (yin[:, 2:] - yin[:, :-2]) / 2
+    shifts[:, 1:-1] = -b / (2 * a + np.finfo(a.dtype).tiny)
+    shifts[np.abs(shifts) > 1] = 0
+    return shifts
+
+
+class StreamingPYIN(PitchEstimator):
+    """Incremental pYIN: analyses only the hops that arrived since the last call.
+
+    Frames follow ``librosa.pyin(center=True)`` numbering (frame ``k`` is centred
+    on sample ``k * hop_length``), and the HMM forward (max-product) state is
+    carried across calls so each emitted frame is decoded with the full history
+    instead of just the current window.
+    """
+
+    def __init__(self, fmin, fmax, sr=22050, frame_length=2048, hop_length=512,
+                 win_length=None, n_thresholds=100, beta_parameters=(2, 18),
+                 boltzmann_parameter=2, resolution=0.1, max_transition_rate=35.92,
+                 switch_prob=0.01, no_trough_prob=0.01):
+        super().__init__(sr, frame_length, hop_length)
+        self.fmin = fmin
+        self.fmax = fmax
+        self.win_length = win_length or frame_length // 2
+        self.boltzmann_parameter = boltzmann_parameter
+        self.no_trough_prob = no_trough_prob
+
+        self.min_period = max(int(np.floor(sr / fmax)), 1)
+        self.max_period = min(int(np.ceil(sr / fmin)), frame_length - self.win_length - 1)
+
+        self.thresholds = np.linspace(0, 1, n_thresholds + 1)
+        beta_cdf = scipy.stats.beta.cdf(self.thresholds, beta_parameters[0], beta_parameters[1])
+        self.beta_probs = np.diff(beta_cdf)
+
+        self.n_bins_per_semitone = int(np.ceil(1.0 / resolution))
+        self.n_pitch_bins = int(np.floor(12 * self.n_bins_per_semitone * np.log2(fmax / fmin))) + 1
+        self.freqs = fmin * 2 ** (np.arange(self.n_pitch_bins) / (12 * self.n_bins_per_semitone))
+
+        max_semitones_per_frame = round(max_transition_rate * 12 * hop_length / sr)
+        transition_width = max_semitones_per_frame * self.n_bins_per_semitone + 1
+        transition = librosa.sequence.transition_local(
+            self.n_pitch_bins, transition_width, window="triangle", wrap=False
+        )
+        t_switch = librosa.sequence.transition_loop(2, 1 - switch_prob)
+        with np.errstate(divide='ignore'):
+            self.log_transition = np.log(np.kron(t_switch, transition))
+
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.reset_state()
+
+    def reset_state(self):
+        # 무성음 상태에서 시작
+        n_states = 2 * self.n_pitch_bins
+        self.log_delta = np.full(n_states, -np.inf)
+        self.log_delta[self.n_pitch_bins:] = -np.log(self.n_pitch_bins)
+
+    def _skip(self, first, stop):
+        # 무음 뒤에는 무성음 상태에서 다시 시작
+        self.reset_state()
+        return super()._skip(first, stop)
+
+    def _analyze(self, first, frames):
+        obs, voiced_prob = self._observation_probs(frames.astype(np.float64))
+        states = np.empty(len(frames), dtype=np.int64)
+        for i in range(len(frames)):
+            states[i] = self._forward_step(obs[i])
+        voiced = states < self.n_pitch_bins
+        f0 = self.freqs[states % self.n_pitch_bins]
+        return self._frames(np.arange(first, first + len(frames)), f0, voiced, voiced_prob)
+
+    def _forward_step(self, obs):
+        with np.errstate(divide='ignore'):
+            log_obs = np.log(obs)
+        scores = self.log_delta[:, None] + self.log_transition
+        self.log_delta = scores.max(axis=0) + log_obs
+        self.log_delta -= self.log_delta.max()
+        return int(np.argmax(self.log_delta))
+
+    def _observation_probs(self, frames):
+        yin = _cumulative_mean_normalized_difference(
+            frames, self.win_length, self.min_period, self.max_period
+        )
+        shifts = _parabolic_interpolation(yin)
+        n_frames = len(frames)
+        n = self.n_pitch_bins
+        thresholds = self.thresholds[1:]
+        beta_probs = self.beta_probs
+        obs = np.zeros((n_frames, 2 * n))
+
+        for i, yin_frame in enumerate(yin):
+            is_trough = np.zeros(len(yin_frame), dtype=bool)
+            is_trough[1:-1] = (yin_frame[1:-1] < yin_frame[:-2]) & (yin_frame[1:-1] <= yin_frame[2:])
+            is_trough[0] = yin_frame[0] < yin_frame[1]
+            (trough_index,) = np.nonzero(is_trough)
+            if len(trough_index) == 0:
+                continue
+
+            heights = yin_frame[trough_index]
+            below = np.less.outer(heights, thresholds)
+            positions = np.cumsum(below, axis=0) - 1
+            n_troughs = np.count_nonzero(below, axis=0)
+            prior = scipy.stats.boltzmann.pmf(positions, self.boltzmann_parameter, n_troughs)
+            prior[~below] = 0
+            probs = prior.dot(beta_probs)
+
+            global_min = np.argmin(heights)
+            n_below_min = np.count_nonzero(~below[global_min, :])
+            probs[global_min] += self.no_trough_prob * np.sum(beta_probs[:n_below_min])
+
+            periods = self.min_period + trough_index + shifts[i, trough_index]
+            bins = 12 * self.n_bins_per_semitone * np.log2(self.sr / periods / self.fmin)
+            bins = np.clip(np.round(bins), 0, n - 1).astype(int)
+            obs[i, bins] = probs
+
+        voiced_prob = np.clip(obs[:, :n].sum(axis=1), 0, 1)
+        obs[:, n:] = ((1 - voiced_prob) / n)[:, None]
+        return obs, voiced_prob
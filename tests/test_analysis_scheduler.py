@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import QCoreApplication  # noqa: E402
+
+from analysis_scheduler import AnalysisScheduler  # noqa: E402
+
+
+def run_for(seconds, *jobs, **options):
+    # 스케줄러를 잠깐 돌리고 (결과, 오류) 신호를 모아 돌려줌
+    app = QCoreApplication.instance() or QCoreApplication([])
+    scheduler = AnalysisScheduler(**options)
+    results, errors = [], []
+    scheduler.result_ready.connect(lambda name, result: results.append((name, result)))
+    scheduler.error.connect(lambda name, message: errors.append((name, message)))
+    added = [scheduler.add_job(*job, delay=0.0) for job in jobs]
+    scheduler.start()
+    time.sleep(seconds)
+    scheduler.stop()
+    time.sleep(0.2)     # 실행 중이던 작업이 끝나길 기다림
+    app.processEvents()  # 풀 스레드에서 보낸 신호는 이 스레드의 이벤트 루프로 전달됨
+    return added, results, errors
+
+
+def busy(seconds):
+    # CPU 시간을 실제로 쓰는 작업 (sleep은 thread_time에 잡히지 않음)
+    start = time.thread_time()
+    while time.thread_time() - start < seconds:
+        pass
+
+
+def test_slow_job_is_coalesced_not_queued():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def slow():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        return 'done'
+
+    (job,), results, errors = run_for(0.55, ('slow', slow, 0.01), max_workers=4)
+    # 같은 작업이 겹쳐 돌지 않고, 밀린 주기는 합쳐짐
+    assert peak[0] == 1
+    assert 4 <= job.runs <= 7
+    assert job.coalesced > 10
+    assert results == [('slow', 'done')] * job.runs and not errors
+
+
+def test_job_over_budget_backs_off():
+    (job, other), _, _ = run_for(0.6, ('heavy', lambda: busy(0.02), 0.01, 0.005), ('light', lambda: None, 0.01))
+    # 예산의 4배를 쓰면 다음 실행까지 주기의 4배를 기다림
+    assert job.over_budget == job.runs > 0
+    assert job.runs <= 0.6 / (0.02 + 0.04) + 2
+    # 다른 작업은 영향을 받지 않음
+    assert other.runs > 30 and other.over_budget == 0
+
+
+def test_errors_come_back_as_signals():
+    def broken():
+        raise RuntimeError('boom')
+
+    (job,), results, errors = run_for(0.1, ('broken', broken, 0.05))
+    assert job.runs >= 1 and not results
+    assert errors[0] == ('broken', 'boom')
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from analysis_server import (AUDIO, HEADER, MAX_MESSAGE, AnalysisServer, FrameBatcher, read_message, run_client,
+                             write_message)
+from benchmark import _voice
+
+
+class FakeBackend:
+    # 프레임마다 (합, 길이) 한 줄; 호출마다 받은 프레임 수를 기록
+    def __init__(self):
+        self.calls = []
+
+    def activation(self, frames):
+        self.calls.append(len(frames))
+        return np.stack([frames.sum(axis=1), np.full(len(frames), frames.shape[1])], axis=1)
+
+
+class FakeWriter:
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data):
+        self.data += data
+
+
+def reader_with(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def test_message_framing_round_trip():
+    writer = FakeWriter()
+    payload = np.arange(5, dtype='<f4').tobytes()
+    write_message(writer, AUDIO, payload)
+    assert len(writer.data) == HEADER.size + len(payload)
+
+    async def read():
+        return await read_message(reader_with(writer.data))
+    assert asyncio.run(read()) == (AUDIO, payload)
+
+
+def test_oversized_message_is_rejected():
+    async def read():
+        return await read_message(reader_with(HEADER.pack(AUDIO, MAX_MESSAGE + 1)))
+    with pytest.raises(ValueError):
+        asyncio.run(read())
+
+
+def test_batcher_returns_each_session_its_own_rows():
+    backend = FakeBackend()
+    batcher = FrameBatcher(backend, max_batch=64, max_delay=0.5)
+    requests = [np.full((n, 4), i, dtype=np.float32) for i, n in enumerate([3, 5, 2, 7])]
+    results = [None] * len(requests)
+    start = threading.Barrier(len(requests))
+
+    def session(i):
+        batcher.begin()
+        try:
+            start.wait()
+            results[i] = batcher.activation(requests[i])
+        finally:
+            batcher.end()
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    for i, frames in enumerate(requests):
+        assert results[i].shape == (len(frames), 2)
+        np.testing.assert_array_equal(results[i][:, 0], 4 * i)
+    # 모든 세션이 요청을 넣을 때까지 모아서 (max_delay 전에) 한 번에 추론
+    assert sum(backend.calls) == batcher.frames == 17
+    assert batcher.batches == len(backend.calls) < len(requests)
+
+
+def test_batcher_splits_at_max_batch():
+    backend = FakeBackend()
+    batcher = FrameBatcher(backend, max_batch=8, max_delay=0.01)
+    rows = batcher.activation(np.ones((20, 3), dtype=np.float32))
+    batcher.close()
+    assert rows.shape == (20, 2)
+    # 요청 하나가 max_batch보다 커도 쪼개지 않고 한 번에
+    assert backend.calls == [20]
+
+
+@pytest.fixture(scope='module')
+def server():
+    pytest.importorskip('parselmouth')  # 서버 예열이 Praat까지 돌림
+    analysis = AnalysisServer('yin', max_sessions=2)
+    yield analysis
+    analysis.close()
+
+
+def serve_and_run(server, *clients):
+    # 빈 포트에 서버를 띄우고 클라이언트들을 동시에 돌린 결과
+    async def main():
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return await asyncio.gather(*(run_client(port=port, **client) for client in clients),
+                                        return_exceptions=True)
+    return asyncio.run(main())
+
+
+def test_session_round_trip(server):
+    audio = _voice(np.full(server.sr, 220.0), server.sr)
+    result, = serve_and_run(server, dict(audio=audio, speed=0, voice_quality=True, praat=True))
+    replies = result['replies']
+    kinds = [reply['type'] for reply in replies]
+    assert kinds[-1] == 'end' and 'error' not in kinds
+    # Praat 응답은 end보다 먼저 옴
+    assert kinds.count('praat') == 1
+
+    pitch = [reply for reply in replies if reply['type'] == 'pitch']
+    frames = [reply['frame'] + i for reply in pitch for i in range(len(reply['f0']))]
+    assert frames == list(range(frames[0], frames[0] + len(frames)))
+    assert len(frames) == replies[-1]['frames']
+    f0 = np.concatenate([reply['f0'] for reply in pitch])
+    voiced = np.concatenate([reply['voiced'] for reply in pitch]).astype(bool)
+    assert voiced.mean() > 0.8
+    assert np.median(f0[voiced]) == pytest.approx(220.0, rel=0.01)
+    assert pitch[-1]['jitter'] is not None
+    assert not server.sessions
+
+
+def test_client_at_another_rate_is_resampled(server):
+    sr = 44100
+    audio = _voice(np.full(sr, 330.0), sr)
+    result, = serve_and_run(server, dict(audio=audio, speed=0, sr=sr))
+    pitch = [reply for reply in result['replies'] if reply['type'] == 'pitch']
+    f0 = np.concatenate([reply['f0'] for reply in pitch])
+    voiced = np.concatenate([reply['voiced'] for reply in pitch]).astype(bool)
+    assert np.median(f0[voiced]) == pytest.approx(330.0, rel=0.01)
+
+
+def test_full_server_refuses_new_sessions(server):
+    audio = np.zeros(server.sr // 2, dtype=np.float32)
+    # 실시간 속도로 보내는 두 세션이 자리를 채운 동안 세 번째는 거절
+    results = serve_and_run(server, dict(audio=audio, speed=1.0), dict(audio=audio, speed=1.0),
+                            dict(audio=audio, speed=1.0))
+    errors = [r for r in results if isinstance(r, Exception)]
+    assert len(errors) == 1 and 'full' in str(errors[0])
+    assert not server.sessions
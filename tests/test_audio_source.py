@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+
+import audio_source
+from audio_source import AudioSource, RecordingSource, load_session
+from pitch_frames import PitchFrames
+
+SR = 16000
+BLOCK = 512
+
+
+class Silent(AudioSource):
+    # 콜백은 테스트가 직접 부름
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def record(path, audio, max_seconds, pace):
+    source = RecordingSource(lambda cb: Silent(cb, SR), str(path), lambda *args: None, SR, max_seconds=max_seconds)
+    sizes = set()
+    for i in range(0, len(audio), BLOCK):
+        source._callback(audio[i:i + BLOCK, None], BLOCK, None, None)
+        sizes.add(len(source.audio))
+        time.sleep(pace)
+    index = np.arange(300)
+    for i in range(0, len(index), 37):
+        k = index[i:i + 37]
+        source.record_frames(PitchFrames(k, k * 0.01, np.full(len(k), 220.0), k > 0, np.ones(len(k))))
+    source.close()
+    return source, sizes
+
+
+def test_file_is_grown_ahead_of_the_callback(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_source, 'GROW_CHECK_SECONDS', 0.01)
+    audio = np.random.default_rng(0).standard_normal(3 * SR).astype(np.float32)
+    # 실시간의 8배 정도로 넣어도 확장 스레드가 0.5초 step을 미리 늘려 둠
+    source, sizes = record(tmp_path, audio, max_seconds=0.5, pace=0.004)
+    assert source.dropped == 0 and len(sizes) > 1
+    recorded, sr, frames = load_session(str(tmp_path))
+    assert sr == SR
+    np.testing.assert_array_equal(recorded, audio)
+    np.testing.assert_array_equal(frames.frame, np.arange(300))
+
+
+def test_callback_drops_instead_of_growing(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_source, 'GROW_CHECK_SECONDS', 60.0)
+    audio = np.random.default_rng(1).standard_normal(2 * SR).astype(np.float32)
+    # 확장 스레드가 돌기 전에 1초 step을 넘겨도 콜백은 파일을 늘리지 않음
+    source, sizes = record(tmp_path, audio, max_seconds=1.0, pace=0)
+    assert sizes == {SR}
+    assert source.n_samples == SR and source.dropped == SR
+    recorded, _, _ = load_session(str(tmp_path))
+    np.testing.assert_array_equal(recorded, audio[:SR])
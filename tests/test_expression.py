@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from expression import BendTracker, PhraseTracker, StreamingExpression, VibratoTracker
+from note_table import DEFAULT_TABLE
+from pitch_frames import PitchFrames
+from ring_buffer import RingBuffer
+
+HOP = 0.01
+
+
+def contour(*parts):
+    # (길이 초, 시작 midi, 끝 midi 또는 None=무성) 구간들을 이은 10 ms 피치 곡선
+    midi = np.concatenate([np.full(int(round(seconds / HOP)), np.nan) if a is None
+                           else np.linspace(a, a if b is None else b, int(round(seconds / HOP)))
+                           for seconds, a, b in parts])
+    return np.arange(len(midi)) * HOP, midi
+
+
+def bends(*parts):
+    tracker = BendTracker()
+    events = [tracker.push(t, m) for t, m in zip(*contour(*parts))] + [tracker.flush()]
+    return [event for event in events if event is not None]
+
+
+def test_vibrato_rate_and_extent():
+    tracker = VibratoTracker()
+    t = np.arange(0, 2.0, HOP)
+    noise = np.random.default_rng(0).uniform(-2, 2, len(t))
+    rate, extent = np.array([tracker.push(*p) for p in zip(t, 6000 + 50 * np.sin(2 * np.pi * 5.5 * t) + noise)]).T
+    # 1초 창이 차면 안정적으로 잡힘
+    assert rate[t > 1.2] == pytest.approx(5.5, rel=0.05)
+    assert extent[t > 1.2] == pytest.approx(50, rel=0.1)
+
+
+def test_flat_or_stepping_pitch_is_not_vibrato():
+    tracker = VibratoTracker()
+    t = np.arange(0, 2.0, HOP)
+    flat = 6000 + np.random.default_rng(0).uniform(-3, 3, len(t))
+    assert all(np.isnan(tracker.push(*p)[0]) for p in zip(t, flat))
+    # 비브라토 중에 음이 바뀌면 (폭이 max_extent의 두 배를 넘음) 처음부터 다시 셈
+    tracker.reset()
+    cents = 6000 + 50 * np.sin(2 * np.pi * 5.5 * t) + 400 * (t >= 1.5)
+    rate = np.array([tracker.push(*p)[0] for p in zip(t, cents)])
+    assert not np.isnan(rate[(t > 1.2) & (t < 1.5)]).any()
+    assert np.isnan(rate[(t > 1.55) & (t < 1.75)]).all()
+    # 무성 프레임은 초기화
+    assert np.isnan(tracker.push(2.0, np.nan)[0])
+
+
+def test_scoop_into_a_note():
+    events = bends((0.1, 58.5, 60.0), (0.4, 60.0, None))
+    assert [e.kind for e in events] == ['scoop']
+    assert events[0].midi == 60 and events[0].cents == pytest.approx(-150)
+    assert events[0].start == 0.0
+
+
+def test_bend_away_and_back():
+    # 반음까지 가면 새 음으로 자리 잡으므로 그 사이에서 벗어났다 돌아옴
+    events = bends((0.3, 60.0, None), (0.2, 60.65, None), (0.3, 60.0, None))
+    assert [e.kind for e in events] == ['bend']
+    assert events[0].midi == 60 and events[0].cents == pytest.approx(65)
+    assert events[0].end - events[0].start == pytest.approx(0.2, abs=0.02)
+
+
+def test_glide_to_the_next_note_and_fall_at_the_end():
+    events = bends((0.3, 60.0, None), (0.15, 60.0, 64.0), (0.3, 64.0, None), (0.15, 64.0, 62.0), (0.2, None, None))
+    assert [e.kind for e in events] == ['glide', 'fall']
+    assert events[0].midi == 64
+    assert events[1].midi == 64 and events[1].cents <= -60
+
+
+def test_short_wobbles_and_gaps_are_not_events():
+    # bend_time보다 짧게 벗어나거나 max_gap보다 짧은 무성은 무시
+    assert bends((0.3, 60.0, None), (0.05, 60.65, None), (0.03, None, None), (0.3, 60.0, None)) == []
+
+
+def test_phrases_split_on_breaths():
+    tracker = PhraseTracker()
+    t, midi = contour((1.0, 60.0, None), (0.5, None, None), (1.0, 62.0, None), (0.1, None, None))
+    loudness = np.where(t < 1.0, -30.0, -40.0 + 10 * (t - 1.5))
+    phrases = [tracker.push(*p) for p in zip(t, midi == midi, loudness)] + [tracker.flush()]
+    phrases = [p for p in phrases if p is not None]
+    assert len(phrases) == 2
+    assert phrases[0].mean_db == pytest.approx(-30) and phrases[0].slope_db == pytest.approx(0, abs=1e-9)
+    assert phrases[1].start == pytest.approx(1.5) and phrases[1].slope_db == pytest.approx(10)
+
+
+def test_streaming_expression_levels_and_events():
+    sr, hop = 16000, 160
+    t = np.arange(sr) / sr
+    ring = RingBuffer(sr)
+    ring.write(0.1 * np.sin(2 * np.pi * 220 * t))
+    index = np.arange(10, 90)
+    midi = np.full(len(index), 60.0)
+    midi[:10] = np.linspace(58.5, 60.0, 10)
+    frames = PitchFrames(index, index * hop / sr, DEFAULT_TABLE.midi_to_hz(midi), np.ones(len(index), dtype=bool),
+                         np.ones(len(index)))
+    expression = StreamingExpression(sr, hop)
+    result = expression.update(ring, frames)
+    # 사인파 RMS = 진폭 / √2
+    assert result.level_db == pytest.approx(20 * np.log10(0.1 / np.sqrt(2)), abs=0.1)
+    assert result.loudness_db[-1] == pytest.approx(result.level_db[-1], abs=0.5)
+    assert result.bend_cents[-1] == pytest.approx(0)
+    events = expression.flush()
+    assert [e.kind for e in events if hasattr(e, 'kind')] == ['scoop']
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from benchmark import signal_vibrato
+from framing import FrameStage
+from pitch_estimators import create_estimator
+from pitch_frames import concat_frames
+from ring_buffer import RingBuffer
+from voice_activity import GatedEstimator, frame_levels
+
+SR = 16000
+FRAME = 1024
+HOP = 256
+
+
+def stream(seconds=1.5, block=733):
+    # 블록 길이를 hop과 어긋나게 해서 프레임 경계가 블록 중간에 걸리도록
+    audio, _ = signal_vibrato(SR)
+    audio = audio[:int(seconds * SR)].astype(np.float32)
+    audio[int(0.6 * SR):int(0.8 * SR)] = 0.0   # 게이트가 닫히는 무음 구간
+    return [audio[i:i + block] for i in range(0, len(audio), block)]
+
+
+def run_ring(estimator, blocks):
+    ring = RingBuffer(4 * SR)
+    results = []
+    for block in blocks:
+        ring.write(block)
+        results.append(estimator.process(ring))
+    return concat_frames(results)
+
+
+def run_stage(estimator, blocks):
+    ring = RingBuffer(4 * SR)
+    stage = FrameStage(SR, FRAME, HOP)
+    cursor = stage.subscribe()
+    results = []
+    for block in blocks:
+        ring.write(block)
+        stage.update(ring)
+        results.append(estimator.process_frames(cursor.read()))
+    return concat_frames(results)
+
+
+def assert_same_frames(a, b):
+    np.testing.assert_array_equal(a.frame, b.frame)
+    np.testing.assert_array_equal(a.voiced, b.voiced)
+    np.testing.assert_allclose(a.f0, b.f0, rtol=1e-6, equal_nan=True)
+    np.testing.assert_allclose(a.confidence, b.confidence, rtol=1e-6, atol=1e-9)
+
+
+@pytest.mark.parametrize('backend', ['pyin', 'yin', 'numba_yin'])
+def test_process_frames_matches_ring_path(backend):
+    blocks = stream()
+    options = dict(sr=SR, fmin=65.0, fmax=1000.0, frame_length=FRAME, hop_length=HOP)
+    expected = run_ring(create_estimator(backend, **options), blocks)
+    frames = run_stage(create_estimator(backend, **options), blocks)
+    assert len(expected.frame) > 0 and np.any(expected.voiced)
+    assert_same_frames(frames, expected)
+
+
+def test_gated_process_frames_matches_ring_path():
+    blocks = stream()
+    options = dict(sr=SR, fmin=65.0, fmax=1000.0, frame_length=FRAME, hop_length=HOP)
+    ring_gate = GatedEstimator(create_estimator('yin', **options))
+    stage_gate = GatedEstimator(create_estimator('yin', **options))
+    expected = run_ring(ring_gate, blocks)
+    assert_same_frames(run_stage(stage_gate, blocks), expected)
+    assert ring_gate.skipped == stage_gate.skipped > 0
+
+
+def test_stage_levels_and_spectrum():
+    blocks = stream()
+    audio = np.concatenate(blocks)
+    ring = RingBuffer(4 * SR)
+    stage = FrameStage(SR, FRAME, HOP)
+    for block in blocks:
+        ring.write(block)
+        stage.update(ring)
+    n = stage.next_frame
+    assert n == (len(audio) - FRAME // 2) // HOP + 1
+    # 프레임 k는 샘플 k*hop을 중심으로 (앞은 0으로 채움)
+    padded = np.concatenate((np.zeros(FRAME // 2, dtype=np.float32), audio))
+    oldest = n - stage.capacity if n > stage.capacity else 0
+    block = stage.block(oldest, n)
+    for k in (oldest, (oldest + n) // 2, n - 1):
+        np.testing.assert_array_equal(block.frames[k - oldest], padded[k * HOP:k * HOP + FRAME])
+    level_db, zcr = frame_levels(padded[:(n - 1) * HOP + FRAME], FRAME, HOP)
+    np.testing.assert_allclose(block.level_db, level_db[oldest:n], atol=1e-6)
+    np.testing.assert_allclose(block.zcr, zcr[oldest:n])
+    k = n - 1
+    spectrum = np.abs(np.fft.rfft(padded[k * HOP:k * HOP + FRAME] * stage.window))
+    np.testing.assert_allclose(block.spectrum[-1], spectrum, rtol=1e-4, atol=1e-4)
+
+
+def test_overrun_frames_are_stored_as_silence():
+    ring = RingBuffer(2048)
+    stage = FrameStage(SR, FRAME, HOP)
+    ring.write(np.ones(5000, dtype=np.float32))
+    stage.update(ring)
+    assert stage.level_db.total == stage.next_frame
+    skipped = stage.lookup('level_db', np.arange(0, 10))
+    np.testing.assert_array_equal(skipped, -120.0)
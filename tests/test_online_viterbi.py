@@ -0,0 +1,77 @@
+import numpy as np
+
+from online_viterbi import N_BINS, FixedLagViterbi
+
+
+def full_viterbi(decoder, observations):
+    # 비교 기준: 같은 HMM(전이 행렬, 관측 확률)으로 전체 시퀀스를 한 번에 푸는 dense Viterbi
+    n = decoder.n_states
+    xx, yy = np.meshgrid(range(n), range(n))
+    transition = np.maximum(decoder.width - abs(xx - yy), 0).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        log_transition = np.log(transition / transition.sum(axis=1)[:, None])
+    log_obs = np.full((len(observations), n), decoder.log_miss)
+    log_obs[np.arange(len(observations)), observations] = decoder.log_hit
+    delta = log_obs[0] - np.log(n)
+    pointers = np.zeros((len(observations), n), dtype=np.int64)
+    for t in range(1, len(observations)):
+        scores = delta[:, None] + log_transition
+        pointers[t] = np.argmax(scores, axis=0)
+        delta = scores[pointers[t], np.arange(n)] + log_obs[t]
+    path = np.empty(len(observations), dtype=np.int64)
+    path[-1] = np.argmax(delta)
+    for t in range(len(observations) - 1, 0, -1):
+        path[t - 1] = pointers[t][path[t]]
+    return path, log_transition, log_obs
+
+
+def path_score(path, log_transition, log_obs):
+    return log_obs[np.arange(len(path)), path].sum() + log_transition[path[:-1], path[1:]].sum()
+
+
+def observations(n=300, seed=0):
+    # 천천히 움직이는 음정 + 가끔 튀는 옥타브 오류
+    rng = np.random.default_rng(seed)
+    track = 180 + 40 * np.sin(np.arange(n) / 25) + rng.normal(0, 1.5, n)
+    jumps = rng.random(n) < 0.05
+    track[jumps] += rng.choice([-60, 60], jumps.sum())
+    return np.clip(np.round(track), 0, N_BINS - 1).astype(np.int64)
+
+
+def decode(decoder, obs, block=7):
+    frames, states = [], []
+    for i in range(0, len(obs), block):
+        f, s = decoder.push(obs[i:i + block])
+        frames.append(f)
+        states.append(s)
+    f, s = decoder.flush()
+    return np.concatenate(frames + [f]), np.concatenate(states + [s])
+
+
+def test_flush_matches_full_viterbi():
+    obs = observations()
+    decoder = FixedLagViterbi(lag=len(obs))
+    frames, states = decode(decoder, obs)
+    path, log_transition, log_obs = full_viterbi(decoder, obs)
+    np.testing.assert_array_equal(frames, np.arange(len(obs)))
+    assert np.isclose(path_score(states, log_transition, log_obs), path_score(path, log_transition, log_obs))
+
+
+def test_fixed_lag_is_close_to_full_viterbi():
+    obs = observations(seed=1)
+    decoder = FixedLagViterbi(lag=10)
+    frames, states = decode(decoder, obs)
+    path, _, _ = full_viterbi(decoder, obs)
+    np.testing.assert_array_equal(frames, np.arange(len(obs)))
+    # 옥타브 오류는 경로에서 걸러지고, 유한 지연 때문에 갈리는 프레임은 소수
+    assert np.mean(np.abs(states - path) <= 1) > 0.95
+    assert np.max(np.abs(np.diff(states))) <= decoder.width - 1
+
+
+def test_reset_offsets_frame_numbers():
+    obs = observations(40)
+    decoder = FixedLagViterbi(lag=5)
+    decode(decoder, obs)
+    decoder.reset(start_frame=100)
+    frames, _ = decode(decoder, obs)
+    np.testing.assert_array_equal(frames, np.arange(100, 140))
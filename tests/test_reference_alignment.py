@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from reference_alignment import _frame_costs, banded_dtw
+
+
+def dense_dtw(user_midi, ref_midi, unvoiced_cost=1.0, max_cost=3.0):
+    # 비교 기준: 전체 비용 행렬 위의 표준 DTW (대각/세로/가로 이동) 누적 비용
+    cost = _frame_costs(np.asarray(user_midi)[:, None], np.asarray(ref_midi)[None, :], unvoiced_cost, max_cost)
+    n, m = cost.shape
+    total = np.full((n + 1, m + 1), np.inf)
+    total[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            total[i, j] = cost[i - 1, j - 1] + min(total[i - 1, j - 1], total[i - 1, j], total[i, j - 1])
+    return total[n, m], cost
+
+
+def contours(seed=0):
+    # 같은 선율을 다른 빠르기로 부른 두 곡선 (무성 구간 포함)
+    rng = np.random.default_rng(seed)
+    melody = np.repeat([60, 62, 64, 65, 67, 65, 64, 62, 60], 12).astype(np.float64)
+    ref = melody + rng.normal(0, 0.1, len(melody))
+    warp = np.clip(np.cumsum(rng.uniform(0.6, 1.4, 140)), 0, len(melody) - 1).astype(np.int64)
+    user = melody[warp] + 0.3 + rng.normal(0, 0.2, len(warp))
+    user[30:36] = np.nan
+    ref[70:74] = np.nan
+    return user, ref
+
+
+def check_path(user_index, ref_index, n, m):
+    assert (user_index[0], ref_index[0]) == (0, 0)
+    assert (user_index[-1], ref_index[-1]) == (n - 1, m - 1)
+    steps = np.stack((np.diff(user_index), np.diff(ref_index)), axis=1)
+    assert set(map(tuple, steps)) <= {(1, 1), (1, 0), (0, 1)}
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_wide_band_matches_dense_dtw(seed):
+    user, ref = contours(seed)
+    user_index, ref_index, total = banded_dtw(user, ref, band=len(ref))
+    expected, cost = dense_dtw(user, ref)
+    check_path(user_index, ref_index, len(user), len(ref))
+    assert np.isclose(total, expected)
+    assert np.isclose(cost[user_index, ref_index].sum(), total)
+
+
+def test_narrow_band_finds_the_same_alignment():
+    user, ref = contours()
+    user_index, ref_index, total = banded_dtw(user, ref, band=30)
+    expected, cost = dense_dtw(user, ref)
+    check_path(user_index, ref_index, len(user), len(ref))
+    assert np.isclose(total, expected)
+    assert np.isclose(cost[user_index, ref_index].sum(), total)
+
+
+def test_empty_contour():
+    user_index, ref_index, total = banded_dtw(np.zeros(0), np.full(10, 60.0))
+    assert len(user_index) == len(ref_index) == 0
+    assert total == np.inf
@@ -0,0 +1,60 @@
+from fractions import Fraction
+
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from resampler import RATE_PAIRS, StreamingResampler, design_filter
+
+
+def run_blocks(resampler, signal, sizes):
+    out, i, k = [], 0, 0
+    while i < len(signal):
+        n = sizes[k % len(sizes)]
+        out.append(resampler.process(signal[i:i + n]))
+        i += n
+        k += 1
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize('sr_in, sr_out', RATE_PAIRS + [(16000, 48000), (22050, 16000)])
+def test_blocks_match_whole_signal_resample_poly(sr_in, sr_out):
+    rng = np.random.default_rng(0)
+    signal = rng.normal(0, 0.3, sr_in // 2)
+    ratio = Fraction(sr_out, sr_in)
+    expected = resample_poly(signal, ratio.numerator, ratio.denominator)
+    resampler = StreamingResampler(sr_in, sr_out)
+    # 장치처럼 길이가 들쭉날쭉한 블록 (1샘플, 필터보다 짧은 블록 포함)
+    out = run_blocks(resampler, signal, [512, 1, 37, 4096, 300])
+    tail = resampler.process(np.zeros(resampler.latency + 1))
+    out = np.concatenate((out, tail))[:len(expected)]
+    assert out.dtype == np.float32
+    assert len(out) == len(expected)
+    np.testing.assert_allclose(out, expected, atol=1e-5)
+
+
+def test_output_length_tracks_the_rate():
+    resampler = StreamingResampler(44100, 16000)
+    produced = 0
+    for n in range(1, 50):
+        produced += len(resampler.process(np.zeros(441)))
+        # 지연(latency)만큼을 빼면 받은 입력에 해당하는 출력이 모두 나와 있음
+        assert abs(produced - (n * 441 - resampler.latency) * 16000 / 44100) <= 2
+    assert resampler.next_output == produced
+
+
+def test_reset_restarts_the_stream():
+    rng = np.random.default_rng(1)
+    signal = rng.normal(0, 0.3, 4800)
+    resampler = StreamingResampler(48000, 16000)
+    first = resampler.process(signal)
+    resampler.process(rng.normal(0, 0.3, 1000))
+    resampler.reset()
+    np.testing.assert_array_equal(resampler.process(signal), first)
+
+
+def test_filter_is_cached_per_rate_pair():
+    assert design_filter(48000, 16000) is design_filter(48000, 16000)
+    up, down, phases, _ = design_filter(44100, 16000)
+    assert (up, down) == (160, 441)
+    assert phases.shape[0] == up
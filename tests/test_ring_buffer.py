@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from ring_buffer import RingBuffer
+
+
+def test_read_is_contiguous_across_wraparound():
+    ring = RingBuffer(10)
+    data = np.arange(37, dtype=np.float32)
+    for start in range(0, len(data), 3):
+        ring.write(data[start:start + 3])
+        total = ring.total
+        oldest = max(total - ring.capacity, 0)
+        # 감긴 위치와 상관없이 남아 있는 어떤 구간도 하나의 view
+        np.testing.assert_array_equal(ring.read(oldest, total), data[oldest:total])
+        if total >= 4:
+            np.testing.assert_array_equal(ring.latest(4), data[total - 4:total])
+    assert ring.total == len(data)
+    assert len(ring) == ring.capacity
+
+
+def test_oversized_write_keeps_the_newest_samples():
+    ring = RingBuffer(8)
+    ring.write(np.arange(5))
+    ring.write(np.arange(100, 120))
+    assert ring.total == 25
+    np.testing.assert_array_equal(ring.read(17, 25), np.arange(112, 120))
+
+
+def test_read_outside_the_ring_raises():
+    ring = RingBuffer(8)
+    ring.write(np.arange(20))
+    with pytest.raises(IndexError):
+        ring.read(11, 20)
+    with pytest.raises(ValueError):
+        ring.read(12, 21)
+
+
+def test_rows_and_append():
+    ring = RingBuffer(4, dtype=np.int16, shape=(3,), fill=-1)
+    np.testing.assert_array_equal(ring.latest(2), np.full((2, 3), -1))
+    for i in range(7):
+        ring.append(np.full(3, i))
+    np.testing.assert_array_equal(ring.read(3, 7)[:, 0], [3, 4, 5, 6])
+    ring.write(np.arange(6).reshape(2, 3))
+    np.testing.assert_array_equal(ring.latest(2), np.arange(6).reshape(2, 3))
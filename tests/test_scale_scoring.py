@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from note_table import DEFAULT_TABLE
+from pitch_frames import PitchFrames
+from scale_scoring import NoteSegmenter, OnlineNoteAligner, ScaleScorer, SungNote, generate_scaling_sequence
+
+HOP = 0.01
+
+
+def track(*parts):
+    # (길이 초, midi 또는 None=무성) 구간들을 10 ms 프레임으로 이어 붙인 피치 곡선
+    midi = np.concatenate([np.full(int(round(seconds / HOP)), np.nan if m is None else m, dtype=np.float64)
+                           for seconds, m in parts])
+    return frames_from_midi(midi)
+
+
+def frames_from_midi(midi, start=0):
+    index = np.arange(start, start + len(midi))
+    voiced = ~np.isnan(midi)
+    f0 = np.where(voiced, DEFAULT_TABLE.midi_to_hz(np.nan_to_num(midi)), np.nan)
+    return PitchFrames(index, index * HOP, f0, voiced, voiced.astype(np.float64))
+
+
+def segment(frames, block=7, **options):
+    # 블록을 나눠 넣어도 결과는 같아야 함
+    segmenter = NoteSegmenter(**options)
+    notes = []
+    for i in range(0, len(frames.frame), block):
+        notes += segmenter.push(PitchFrames(*(field[i:i + block] for field in frames)))
+    return notes + segmenter.flush()
+
+
+def test_steps_and_gaps_split_notes():
+    notes = segment(track((0.4, 60), (0.4, 62), (0.2, None), (0.4, 64)))
+    assert [round(n.midi) for n in notes] == [60, 62, 64]
+    assert notes[0].onset == pytest.approx(0.0)
+    assert notes[1].onset == pytest.approx(0.4)
+    assert notes[2].onset == pytest.approx(1.0)
+
+
+def test_vibrato_blips_and_short_gaps_stay_in_one_note():
+    t = np.arange(100) * HOP
+    midi = 60 + 0.4 * np.sin(2 * np.pi * 5.5 * t)   # ±40 cents 비브라토
+    midi[30:33] = 63.0                               # 30 ms 튀는 값 (change_time보다 짧음)
+    midi[60:64] = np.nan                             # 40 ms 끊김 (max_gap보다 짧음)
+    notes = segment(frames_from_midi(midi))
+    assert len(notes) == 1
+    # 튀는 프레임 3개는 음에 다시 합쳐지므로 평균이 조금 움직임
+    assert notes[0].midi == pytest.approx(60.0 + 3 * 3.0 / 96, abs=0.02)
+    assert notes[0].offset == pytest.approx(0.99)
+
+
+def test_short_notes_are_dropped_and_attack_is_excluded():
+    # 50 ms 스쿱 후 유지: 음높이/안정도는 attack 이후만 봄
+    midi = np.concatenate((np.linspace(59.5, 60, 5), np.full(40, 60.0), np.full(8, np.nan), np.full(5, 65.0)))
+    notes = segment(frames_from_midi(midi))
+    assert len(notes) == 1
+    assert notes[0].midi == pytest.approx(60.0)
+    assert notes[0].stability == pytest.approx(0.0, abs=1e-3)
+
+
+def test_aligner_handles_skipped_and_split_targets():
+    aligner = OnlineNoteAligner([60, 62, 64, 65, 67], onsets=[0.0, 1.0, 2.0, 3.0, 4.0])
+    # 62를 두 번에 나눠 부르고 64를 건너뜀
+    sung = [(0.0, 60.1), (1.0, 62.0), (1.5, 62.1), (3.0, 65.0), (4.0, 67.2)]
+    indices = [aligner.push(SungNote(onset, onset + 0.4, m, 5.0)) for onset, m in sung]
+    assert indices == [0, 1, 1, 3, 4]
+
+
+def test_scorer_scores_a_sharp_scale_against_cues():
+    targets = generate_scaling_sequence()[0]
+    cues = [1.0 + i for i in range(len(targets))]
+    parts = [(1.0, None)]
+    for m in targets:
+        parts += [(0.8, m + 0.2), (0.2, None)]       # 큐보다 20 cents 높게, 정확한 시각에
+    scorer = ScaleScorer()
+    assert scorer.start(targets, cues) == []
+    frames = track(*parts)
+    scores = []
+    for i in range(0, len(frames.frame), 32):
+        scores += scorer.push(PitchFrames(*(field[i:i + 32] for field in frames)))
+    scores += scorer.flush()
+    assert [s.index for s in scores] == list(range(len(targets)))
+    assert [s.target for s in scores] == targets
+    np.testing.assert_allclose([s.cents for s in scores], 20.0, atol=0.5)
+    np.testing.assert_allclose([s.onset_error for s in scores], 0.0, atol=HOP)
+
+
+def test_start_scores_the_note_left_over_from_the_previous_scale():
+    scorer = ScaleScorer()
+    scorer.start([60, 62])
+    assert scorer.push(track((0.5, 60.0))) == []
+    leftover = scorer.start([61, 63])
+    assert len(leftover) == 1 and leftover[0].target == 60
+    assert scorer.scores == []
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from benchmark import _voice
+from pitch_estimators import create_estimator
+from pitch_frames import concat_frames
+from voice_activity import EnergyGate, GatedEstimator, frame_levels
+
+SR = 16000
+
+
+def gate_run(gate, *parts):
+    # (프레임 수, dB, zcr) 구간들을 한 프레임씩 넣은 게이트 판정
+    levels = np.concatenate([np.full(n, level) for n, level, _ in parts])
+    rates = np.concatenate([np.full(n, rate) for n, _, rate in parts])
+    return np.concatenate([gate.update(levels[i:i + 1], rates[i:i + 1]) for i in range(len(levels))])
+
+
+def test_frame_levels_match_direct_computation():
+    audio = np.random.default_rng(0).standard_normal(4000) * 0.1
+    level_db, zcr = frame_levels(audio, 512, 128)
+    frames = np.lib.stride_tricks.sliding_window_view(audio, 512)[::128]
+    assert len(level_db) == len(frames)
+    np.testing.assert_allclose(level_db, 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12))
+    np.testing.assert_allclose(zcr, np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1))
+
+
+def test_gate_opens_on_voice_and_holds_for_the_hangover():
+    gate = EnergyGate(hangover=8)
+    active = gate_run(gate, (20, -80.0, 0.05), (30, -20.0, 0.05), (20, -80.0, 0.05))
+    assert not active[:20].any()
+    assert active[20:50].all()
+    # 조용해진 뒤에도 hangover 프레임 동안은 열려 있음
+    assert active[50:57].all() and not active[58:].any()
+
+
+def test_gate_hysteresis_keeps_it_open_between_the_thresholds():
+    gate = EnergyGate(open_db=12.0, close_db=6.0)
+    # 바닥 -55 dB: 열림 -43, 닫힘 -49 기준 (둘 다 min_db 위)
+    active = gate_run(gate, (20, -55.0, 0.05), (5, -30.0, 0.05), (40, -46.0, 0.05))
+    assert active[20:].all()
+    gate.reset()
+    # 닫힌 상태에서 같은 레벨은 열지 못함
+    assert not gate_run(gate, (20, -55.0, 0.05), (40, -46.0, 0.05)).any()
+
+
+def test_gate_ignores_noisy_frames_and_held_notes_do_not_raise_the_floor():
+    gate = EnergyGate()
+    assert not gate_run(gate, (20, -80.0, 0.05), (20, -20.0, 0.6)).any()
+    gate.reset()
+    active = gate_run(gate, (20, -80.0, 0.05), (2000, -20.0, 0.05))
+    assert active[20:].all()
+    assert gate.noise_floor_db == pytest.approx(-80.0, abs=0.1)
+
+
+def test_gated_estimator_skips_silence_and_matches_the_ungated_pitch():
+    f0 = np.concatenate([np.zeros(SR // 2), np.full(SR, 220.0), np.zeros(SR // 2)])
+    audio = _voice(f0, SR) + 1e-4 * np.random.default_rng(1).standard_normal(len(f0))
+    options = dict(sr=SR, fmin=60.0, fmax=1000.0, frame_length=1024, hop_length=160)
+    gated = GatedEstimator(create_estimator('yin', **options))
+    plain = create_estimator('yin', **options)
+
+    blocks = range(0, len(audio), 512)
+    frames = concat_frames([gated.push(audio[i:i + 512]) for i in blocks] + [gated.flush()])
+    reference = concat_frames([plain.push(audio[i:i + 512]) for i in blocks] + [plain.flush()])
+
+    assert np.array_equal(frames.frame, np.arange(len(frames.frame)))
+    assert np.array_equal(frames.frame, reference.frame)
+    # 무음 구간은 모델을 돌리지 않고 무성음으로 채움
+    silent = (frames.time < 0.4) | (frames.time > 1.6)
+    assert gated.skipped >= silent.sum()
+    assert not frames.voiced[silent].any() and np.isnan(frames.f0[silent]).all()
+    # 소리 구간은 게이트 없이 돌린 결과와 같음
+    sung = (frames.time > 0.6) & (frames.time < 1.4)
+    assert frames.voiced[sung].all()
+    np.testing.assert_allclose(frames.f0[sung], reference.f0[sung])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from benchmark import _voice, signal_sweep, signal_vibrato
+from pitch_estimators import create_estimator
+from ring_buffer import RingBuffer
+from voice_quality import StreamingJitterShimmer, _synthetic_voice, analyze_voice
+
+SR = 16000
+
+
+def stream(audio, block=512):
+    estimator = create_estimator('numba_yin', sr=SR, fmin=75, fmax=500, hop_length=160)
+    engine = StreamingJitterShimmer(SR, window=np.inf)
+    ring = RingBuffer(3 * SR)
+    for i in range(0, len(audio), block):
+        ring.write(audio[i:i + block])
+        engine.update(ring, estimator.process(ring))
+    return engine
+
+
+SIGNALS = {
+    # 배음이 많은 합성 목소리 (원시 샘플 피크는 주기마다 크게 흔들림)
+    'harmonic-220': lambda: _voice(np.full(3 * SR, 220.0), SR),
+    'harmonic-vibrato': lambda: signal_vibrato(SR)[0],
+    'harmonic-sweep': lambda: signal_sweep(SR)[0],
+    # 주기/진폭을 알고 흔든 펄스열
+    'pulses-low': lambda: _synthetic_voice(SR, jitter=0.005, shimmer=0.02),
+    'pulses-high': lambda: _synthetic_voice(SR, jitter=0.02, shimmer=0.1),
+}
+
+
+@pytest.mark.parametrize('name', sorted(SIGNALS))
+def test_matches_praat(name):
+    pytest.importorskip('parselmouth')
+    audio = np.asarray(SIGNALS[name](), dtype=np.float32)
+    praat_jitter, praat_shimmer = analyze_voice(audio.astype(np.float64), SR)
+    engine = stream(audio)
+    assert engine.n_cycles > 100
+    # 스트리밍은 음 시작에서, Praat는 유성 구간 가운데서 펄스 위치를 잡으므로
+    # 아주 작은 값은 절대 오차로 봄
+    assert engine.jitter() == pytest.approx(praat_jitter, rel=0.05, abs=0.02)
+    assert engine.shimmer() == pytest.approx(praat_shimmer, rel=0.05, abs=0.1)
+
+
+def test_rolling_window_forgets_old_cycles():
+    steady = _synthetic_voice(SR, jitter=0.002, shimmer=0.01, duration=2.0, seed=1)
+    rough = _synthetic_voice(SR, jitter=0.03, shimmer=0.15, duration=2.0, seed=2)
+    estimator = create_estimator('numba_yin', sr=SR, fmin=75, fmax=500, hop_length=160)
+    engine = StreamingJitterShimmer(SR, window=1.0)
+    ring = RingBuffer(3 * SR)
+    for audio in (rough, steady):
+        for i in range(0, len(audio), 512):
+            ring.write(audio[i:i + 512])
+            engine.update(ring, estimator.process(ring))
+    assert engine.n_cycles <= 230
+    assert engine.jitter() < 0.5
+    assert engine.shimmer() < 2.0
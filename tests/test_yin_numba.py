@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from benchmark import signal_sweep
+from pitch_estimators import create_estimator
+from pitch_frames import concat_frames
+
+pytest.importorskip('numba')
+
+SR = 16000
+FRAME = 1024
+HOP = 160
+
+
+def cents(a, b):
+    return 1200 * np.log2(a / b)
+
+
+def test_glide_matches_librosa_yin():
+    import librosa
+    audio, true_f0 = signal_sweep(SR)
+    audio = audio.astype(np.float32)
+    reference = librosa.yin(audio, fmin=65.0, fmax=1000.0, sr=SR, frame_length=FRAME, hop_length=HOP)
+    estimator = create_estimator('numba_yin', sr=SR, fmin=65.0, fmax=1000.0, frame_length=FRAME, hop_length=HOP)
+    frames = concat_frames([estimator.push(audio[i:i + 512]) for i in range(0, len(audio), 512)])
+    n = min(len(frames.frame), len(reference))
+    # 양 끝 (0으로 채운 구간)을 빼고 비교
+    inner = slice(FRAME // HOP, n - FRAME // HOP)
+    voiced = frames.voiced[inner]
+    assert np.mean(voiced) > 0.95
+    f0, ref = frames.f0[inner][voiced], reference[inner][voiced]
+    truth = true_f0[frames.frame[inner][voiced] * HOP]
+    diff = cents(f0, ref)
+    # 같은 프레임 중심을 분석하므로 글라이드에서도 librosa와 몇 cents 안에서 일치
+    assert np.median(np.abs(diff)) < 3.0
+    assert abs(np.mean(diff)) < 2.0
+    assert abs(np.mean(cents(f0, truth))) < 2.0
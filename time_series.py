@@ -0,0 +1,54 @@
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+
+class TimeSeries:
+    """Fixed-capacity timestamped series for the scrolling plots.
+
+    Each field (and the timestamps) lives in its own mirrored ``RingBuffer``, so
+    appending is O(1) and any window of the most recent entries is a contiguous
+    view that can go straight to pyqtgraph without copying. Timestamps must be
+    non-decreasing; the window bounds are found by binary search over at most
+    ``capacity`` entries, so memory and per-tick cost do not grow with session
+    length. A view stays valid until ``capacity - len(view)`` more entries are
+    appended, which for a plot window much shorter than the capacity is never
+    before the next redraw.
+    """
+
+    def __init__(self, capacity, fields=('value',)):
+        self.capacity = int(capacity)
+        self.fields = tuple(fields)
+        self.time = RingBuffer(self.capacity, dtype=np.float64, fill=np.nan)
+        self.columns = {name: RingBuffer(self.capacity, dtype=np.float64, fill=np.nan) for name in self.fields}
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def last_time(self):
+        return self.time.latest(1)[0] if len(self.time) else np.nan
+
+    def append(self, t, **values):
+        # 없는 필드는 NaN
+        for name, column in self.columns.items():
+            column.append(values.get(name, np.nan))
+        self.time.append(t)
+
+    def extend(self, times, **values):
+        # 프레임 묶음을 한 번에 추가 (필드 배열은 times와 같은 길이)
+        times = np.asarray(times, dtype=np.float64)
+        for name, column in self.columns.items():
+            column.write(values[name] if name in values else np.full(len(times), np.nan))
+        self.time.write(times)
+
+    def window(self, start=-np.inf, stop=np.inf):
+        # start <= t < stop 인 항목들의 view: {'time': ..., 필드: ...}
+        n = len(self.time)
+        times = self.time.latest(n)
+        lo = np.searchsorted(times, start, side='left')
+        hi = np.searchsorted(times, stop, side='left')
+        views = {'time': times[lo:hi]}
+        for name, column in self.columns.items():
+            views[name] = column.latest(n)[lo:hi]
+        return views
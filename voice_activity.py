@@ -0,0 +1,159 @@
+import numpy as np
+
+from pitch_frames import concat_frames
+from ring_buffer import RingBuffer
+
+
+def frame_levels(audio, frame_length, hop_length):
+    # 겹치는 프레임의 RMS(dB)와 zero-crossing 비율을 누적합으로 한 번에 계산
+    audio = np.asarray(audio, dtype=np.float64)
+    n_frames = 1 + (len(audio) - frame_length) // hop_length
+    starts = np.arange(n_frames) * hop_length
+    energy = np.concatenate(([0.0], np.cumsum(audio ** 2)))
+    mean_sq = (energy[starts + frame_length] - energy[starts]) / frame_length
+    crossings = np.concatenate(([0], np.cumsum(np.signbit(audio[1:]) != np.signbit(audio[:-1]))))
+    zcr = (crossings[starts + frame_length - 1] - crossings[starts]) / (frame_length - 1)
+    return 10 * np.log10(mean_sq + 1e-12), zcr
+
+
+class EnergyGate:
+    """Streaming voice-activity gate: RMS against an adaptive noise floor, with hysteresis.
+
+    The noise floor follows quieter frames immediately and only creeps upward
+    (``floor_rise_db`` per frame) while the gate is closed, so a long held note
+    never becomes the "floor". The gate opens ``open_db`` above the floor when
+    the zero-crossing rate looks voiced (breath and fricatives are noisy), and
+    closes after ``hangover`` frames below ``close_db``. The floor starts at,
+    and never rises above, ``max_floor_db`` so a take that begins mid-phrase
+    still opens and loud singing is never mistaken for noise.
+    """
+
+    def __init__(self, open_db=12.0, close_db=6.0, min_db=-60.0, max_zcr=0.3,
+                 hangover=8, floor_rise_db=0.02, max_floor_db=-35.0):
+        self.open_db = open_db
+        self.close_db = close_db
+        self.min_db = min_db
+        self.max_zcr = max_zcr
+        self.hangover = hangover
+        self.floor_rise_db = floor_rise_db
+        self.max_floor_db = max_floor_db
+        self.reset()
+
+    def reset(self):
+        self.noise_floor_db = self.max_floor_db
+        self.is_open = False
+        self._hold = 0
+
+    def update(self, level_db, zcr):
+        active = np.zeros(len(level_db), dtype=bool)
+        for i, (level, rate) in enumerate(zip(level_db, zcr)):
+            if level < self.noise_floor_db:
+                self.noise_floor_db = level
+            elif not self.is_open:
+                self.noise_floor_db = min(level, self.noise_floor_db + self.floor_rise_db, self.max_floor_db)
+
+            if self.is_open:
+                if level < max(self.noise_floor_db + self.close_db, self.min_db):
+                    self._hold -= 1
+                    if self._hold <= 0:
+                        self.is_open = False
+                else:
+                    self._hold = self.hangover
+            elif level > max(self.noise_floor_db + self.open_db, self.min_db) and rate < self.max_zcr:
+                self.is_open = True
+                self._hold = self.hangover
+            active[i] = self.is_open
+        return active
+
+
+class GatedEstimator:
+    """Runs the wrapped estimator only on frames the gate marks as active.
+
+    Exposes the same streaming interface as ``PitchEstimator``. Silent frames
+    are passed to ``inner.skip`` and come back as unvoiced (NaN) frames
+    without running the model. ``process_frames(block)`` gates on the levels
+    a shared ``framing.FrameStage`` already computed.
+    """
+
+    def __init__(self, inner, gate=None):
+        self.inner = inner
+        self.gate = gate or EnergyGate()
+        self.sr = inner.sr
+        self.frame_length = inner.frame_length
+        self.hop_length = inner.hop_length
+        self.skipped = 0
+        self._ring = None
+
+    @property
+    def next_frame(self):
+        return self.inner.next_frame
+
+    def reset(self):
+        self.inner.reset()
+        self.gate.reset()
+
+    def latency(self):
+        return self.inner.latency()
+
+    def flush(self):
+        return self.inner.flush()
+
+    def push(self, samples):
+        if self._ring is None:
+            self._ring = RingBuffer(max(4 * self.frame_length, self.sr))
+        self._ring.write(samples)
+        return self.process(self._ring)
+
+    def process(self, ring, stop_frame=None):
+        inner = self.inner
+        half = inner.frame_length // 2
+        hop = inner.hop_length
+        total = ring.total
+        results = []
+
+        first = inner.next_frame
+        oldest = total - ring.capacity
+        if first * hop - half < oldest:
+            first = -(-(oldest + half) // hop)
+            results.append(inner.skip(first))
+        last = (total - half) // hop
+        if stop_frame is not None:
+            last = min(last, stop_frame - 1)
+        if last < first:
+            return concat_frames(results)
+
+        start = first * hop - half
+        audio = ring.read(max(start, 0), last * hop + half)
+        if start < 0:
+            audio = np.concatenate((np.zeros(-start, dtype=audio.dtype), audio))
+        active = self.gate.update(*frame_levels(audio, inner.frame_length, hop))
+        results.extend(self._run(first, active, lambda stop: inner.process(ring, stop_frame=stop)))
+        return concat_frames(results)
+
+    def process_frames(self, block):
+        # FrameStage가 계산해 둔 프레임/레벨로 같은 판정 (오디오를 다시 자르지 않음)
+        inner = self.inner
+        results = []
+        first = inner.next_frame
+        if block.first > first:
+            results.append(inner.skip(block.first))
+            first = block.first
+        offset = first - block.first
+        if offset >= len(block.level_db):
+            return concat_frames(results)
+        active = self.gate.update(block.level_db[offset:], block.zcr[offset:])
+        results.extend(self._run(first, active, lambda stop: inner.process_frames(block, stop_frame=stop)))
+        return concat_frames(results)
+
+    def _run(self, first, active, analyze):
+        # 같은 판정이 이어지는 구간 단위로 분석 또는 건너뛰기
+        results = []
+        edges = np.flatnonzero(np.diff(active.astype(np.int8))) + 1
+        bounds = np.concatenate(([0], edges, [len(active)]))
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            if active[a]:
+                results.append(analyze(first + b))
+            else:
+                results.append(self.inner.skip(first + b))
+                self.skipped += b - a
+        return results
@@ -0,0 +1,275 @@
+from collections import deque
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+# Praat "Get jitter/shimmer (local)"와 같은 조건
+PERIOD_FLOOR = 0.0001
+PERIOD_CEILING = 0.02
+MAX_PERIOD_FACTOR = 1.3
+MAX_AMPLITUDE_FACTOR = 1.6
+
+
+# Jitter / Shimmer 분석 함수 (Praat 기준값)
+def analyze_voice(buffer, sr):
+    import parselmouth
+    from parselmouth.praat import call
+    snd = parselmouth.Sound(buffer, sampling_frequency=sr)
+    point_process = call(snd, "To PointProcess (periodic, cc)", 75, 500)
+    jitter = call(point_process, "Get jitter (local)", 0, 0, PERIOD_FLOOR, PERIOD_CEILING, MAX_PERIOD_FACTOR)
+    shimmer = call([snd, point_process], "Get shimmer (local)", 0, 0, PERIOD_FLOOR, PERIOD_CEILING,
+                   MAX_PERIOD_FACTOR, MAX_AMPLITUDE_FACTOR)
+    return jitter * 100, shimmer * 100  # 백분율로 반환
+
+
+MIN_CORRELATION = 0.3      # Praat "periodic, cc": 이보다 낮은 상관의 주기는 펄스로 쓰지 않음
+AMPLITUDE_WIDTH = 0.2      # 펄스 진폭 = 앞뒤 주기의 0.2배 폭 Hann 창 RMS (Praat "To AmplitudeTier (period)")
+
+
+def _parabolic_peak(x, i):
+    if i <= 0 or i >= len(x) - 1:
+        return float(i), float(x[i])
+    a, b, c = x[i - 1], x[i], x[i + 1]
+    denom = a - 2 * b + c
+    if denom == 0:
+        return float(i), float(b)
+    shift = 0.5 * (a - c) / denom
+    return i + shift, b - 0.25 * (a - c) * shift
+
+
+def _hann_rms(ring, center, left, right):
+    # center(소수 샘플 위치)에서 최대인 비대칭 Hann 창의 RMS (왼쪽 폭 left, 오른쪽 폭 right 샘플)
+    first, last = int(np.ceil(center - left)), int(np.floor(center + right))
+    x = ring.read(first, last + 1).astype(np.float64)
+    offset = np.arange(first, last + 1) - center
+    w = 0.5 + 0.5 * np.cos(np.pi * offset / np.where(offset < 0, left, right))
+    return float(np.sqrt(np.sum((x * w) ** 2) / np.sum(w * w)))
+
+
+class StreamingJitterShimmer:
+    """Incremental local jitter / shimmer from glottal pulses detected as they arrive.
+
+    Pulses are placed like Praat's ``To PointProcess (periodic, cc)``: the
+    first one at the absolute extremum of a period, each next one at the
+    (parabolically interpolated) lag between 0.8 and 1.25 periods where a
+    one-period window best correlates with the window around the previous
+    pulse. The search is guided by the pitch frames the tracker already
+    produced (``update(ring, frames)``), so every sample is visited about
+    twice. A pulse's amplitude is the Hann-windowed RMS over 0.2 of the
+    periods on either side, as in ``To AmplitudeTier (period)``; raw-sample
+    peaks of a harmonic-rich voice jump by several percent from cycle to
+    cycle. Periods and amplitudes live in a rolling window of ``window``
+    seconds and the jitter/shimmer sums are updated in O(1) per cycle as
+    cycles enter and leave it, using the same period floor/ceiling and
+    period/amplitude factors as ``analyze_voice``.
+    """
+
+    def __init__(self, sr, window=3.0, fmin=75.0, fmax=500.0):
+        self.sr = sr
+        self.window = window
+        self.fmin = fmin
+        self.fmax = fmax
+        # 프레임 번호가 아닌 시각으로 f0를 찾기 위한 최근 피치 기록
+        self._pitch_time = RingBuffer(1024, dtype=np.float64, fill=-np.inf)
+        self._pitch_f0 = RingBuffer(1024, dtype=np.float64, fill=np.nan)
+        self.reset()
+
+    def reset(self):
+        self.cursor = None       # 다음 탐색 시작 위치 (절대 샘플)
+        self._pulse = None       # 직전 펄스 위치 (소수 샘플)
+        self._period = None      # 직전 주기 길이 (초)
+        self._amp_point = None   # 직전 진폭 점 (시각, 진폭)
+        self._cycles = deque()   # (시각, 주기, 진폭 또는 None, |dT| 또는 None, |dA| 또는 None)
+        self._sum_t = 0.0
+        self._sum_dt = 0.0
+        self._n_dt = 0
+        self._sum_a = 0.0
+        self._n_a = 0
+        self._sum_da = 0.0
+        self._n_da = 0
+
+    @property
+    def n_cycles(self):
+        return len(self._cycles)
+
+    def jitter(self):
+        # local jitter (%)
+        if self._n_dt == 0 or not self._cycles:
+            return np.nan
+        return 100 * (self._sum_dt / self._n_dt) / (self._sum_t / len(self._cycles))
+
+    def shimmer(self):
+        # local shimmer (%)
+        if self._n_da == 0 or self._n_a == 0:
+            return np.nan
+        return 100 * (self._sum_da / self._n_da) / (self._sum_a / self._n_a)
+
+    def update(self, ring, frames):
+        if len(frames.frame):
+            self._pitch_time.write(frames.time)
+            self._pitch_f0.write(np.where(frames.voiced, frames.f0, np.nan))
+        if len(self._pitch_time) == 0:
+            return 0
+
+        # 피치가 나온 시각까지만, 최장 주기만큼 여유를 두고 탐색
+        max_period = int(np.ceil(1.25 * self.sr / self.fmin))
+        limit = min(ring.total, int(self._pitch_time.latest(1)[0] * self.sr) + max_period)
+        oldest = ring.total - ring.capacity
+        if self.cursor is None or self.cursor < oldest:
+            self.cursor = max(oldest, 0)
+            self._break_chain()
+
+        added = 0
+        while True:
+            f0 = self._f0_at(self.cursor / self.sr)
+            if np.isnan(f0):
+                next_voiced = self._next_voiced_time(self.cursor / self.sr)
+                self._break_chain()
+                if next_voiced is None:
+                    self.cursor = max(self.cursor, min(limit, int(self._pitch_time.latest(1)[0] * self.sr)))
+                    break
+                self.cursor = max(self.cursor + 1, int(next_voiced * self.sr))
+                continue
+            period = self.sr / f0
+            if self._pulse is not None and self._pulse - period < oldest:
+                self._break_chain()   # 직전 펄스 주변이 이미 링에서 덮어써짐
+            if self._pulse is None:
+                # 첫 펄스: 한 주기 안의 절대값 최대 (Praat도 유성 구간마다 극값에서 시작)
+                stop = self.cursor + int(np.ceil(period))
+                if stop + 1 > limit:
+                    break
+                segment = ring.read(self.cursor, stop + 1)
+                i = int(np.argmax(np.abs(segment)))
+                self._pulse = self.cursor + _parabolic_peak(segment * np.sign(segment[i]), i)[0]
+                self.cursor = int(self._pulse) + 1
+                continue
+            found = self._next_pulse(ring, period, limit)
+            if found is None:
+                break
+            pos, correlation = found
+            if correlation > MIN_CORRELATION:
+                added += self._add_cycle(ring, pos)
+            else:
+                # 상관이 낮은 주기는 펄스로 세지 않고 건너뜀 (앞뒤 주기 비교도 끊음)
+                self._pulse, self._period = pos, None
+            self.cursor = int(pos) + 1
+        self._expire()
+        return added
+
+    def _next_pulse(self, ring, period, limit):
+        # Praat findMaximumCorrelation: 직전 펄스 중심의 한 주기 창과 0.8~1.25 주기 뒤 창의 정규화 상관
+        half = 0.5 * period
+        left = int(round(self._pulse - half))
+        length = int(round(self._pulse + half)) - left + 1
+        lo = int(np.floor(self._pulse + 0.8 * period - half))
+        hi = int(np.ceil(self._pulse + 1.25 * period - half))
+        if hi + length > limit:
+            return None
+        reference = ring.read(left, left + length).astype(np.float64)
+        candidates = np.lib.stride_tricks.sliding_window_view(
+            ring.read(lo, hi + length).astype(np.float64), length)
+        product = candidates @ reference
+        norm = np.sqrt(np.dot(reference, reference) * np.einsum('ij,ij->i', candidates, candidates))
+        r = np.divide(product, norm, out=np.zeros_like(product), where=norm > 0)
+        # 가장 높은 극대값을 포물선 보간 (없으면 한 주기 뒤로 넘기고 펄스는 버림)
+        peaks = np.flatnonzero((r[1:-1] >= r[:-2]) & (r[1:-1] >= r[2:])) + 1
+        if len(peaks) == 0:
+            return self._pulse + period, -1.0
+        i = peaks[np.argmax(r[peaks])]
+        best, shift = r[i], 0.0
+        curvature = 2 * r[i] - r[i - 1] - r[i + 1]
+        if curvature != 0:
+            slope = 0.5 * (r[i + 1] - r[i - 1])
+            best += 0.5 * slope * slope / curvature
+            shift = slope / curvature
+        return self._pulse + (lo + i + shift - left), best
+
+    def _f0_at(self, t):
+        times = self._pitch_time.latest(len(self._pitch_time))
+        i = min(np.searchsorted(times, t), len(times) - 1)
+        if i > 0 and t - times[i - 1] < times[i] - t:
+            i -= 1
+        f0 = self._pitch_f0.latest(len(self._pitch_f0))[i]
+        if not (self.fmin <= f0 <= self.fmax):
+            return np.nan
+        return f0
+
+    def _next_voiced_time(self, t):
+        times = self._pitch_time.latest(len(self._pitch_time))
+        f0 = self._pitch_f0.latest(len(self._pitch_f0))
+        after = np.flatnonzero((times > t) & (f0 >= self.fmin) & (f0 <= self.fmax))
+        return times[after[0]] if len(after) else None
+
+    def _break_chain(self):
+        # 무성음/건너뛴 구간을 가로지르는 주기는 만들지 않음
+        self._pulse = None
+        self._period = None
+
+    def _add_cycle(self, ring, pos):
+        period = (pos - self._pulse) / self.sr
+        if not (PERIOD_FLOOR <= period <= PERIOD_CEILING):
+            self._break_chain()
+            return 0
+        amp = d_t = d_a = None
+        prev = self._period
+        if prev is not None and max(period, prev) / min(period, prev) <= MAX_PERIOD_FACTOR:
+            # 앞뒤 주기가 모두 유효한 펄스에만 진폭 점을 둠 (Praat와 같은 조건)
+            d_t = abs(period - prev)
+            width = AMPLITUDE_WIDTH * self.sr
+            amp = _hann_rms(ring, self._pulse, width * prev, width * period)
+            t = self._pulse / self.sr
+            if amp <= 0:
+                amp = None
+            elif self._amp_point is not None:
+                prev_t, prev_amp = self._amp_point
+                if (PERIOD_FLOOR <= t - prev_t <= PERIOD_CEILING
+                        and max(amp, prev_amp) / min(amp, prev_amp) <= MAX_AMPLITUDE_FACTOR):
+                    d_a = abs(amp - prev_amp)
+            if amp is not None:
+                self._amp_point = (t, amp)
+        self._cycles.append((pos / self.sr, period, amp, d_t, d_a))
+        self._sum_t += period
+        if amp is not None:
+            self._sum_a += amp
+            self._n_a += 1
+        if d_t is not None:
+            self._sum_dt += d_t
+            self._n_dt += 1
+        if d_a is not None:
+            self._sum_da += d_a
+            self._n_da += 1
+        self._pulse, self._period = pos, period
+        return 1
+
+    def _expire(self):
+        if not self._cycles:
+            return
+        horizon = self._cycles[-1][0] - self.window
+        while self._cycles and self._cycles[0][0] < horizon:
+            _, period, amp, d_t, d_a = self._cycles.popleft()
+            self._sum_t -= period
+            if amp is not None:
+                self._sum_a -= amp
+                self._n_a -= 1
+            if d_t is not None:
+                self._sum_dt -= d_t
+                self._n_dt -= 1
+            if d_a is not None:
+                self._sum_da -= d_a
+                self._n_da -= 1
+
+
+def _synthetic_voice(sr, f0=220.0, duration=3.0, jitter=0.01, shimmer=0.05, seed=0):
+    # 주기/진폭을 무작위로 흔든 감쇠 펄스열 (정답 jitter/shimmer를 아는 신호)
+    rng = np.random.default_rng(seed)
+    cycles, n = [], 0
+    while n < duration * sr:
+        length = int(round(sr / f0 * (1 + jitter * rng.standard_normal())))
+        amp = 1 + shimmer * rng.standard_normal()
+        t = np.arange(length) / sr
+        cycles.append(amp * (np.exp(-t * 600) * np.sin(2 * np.pi * 700 * t)
+                             + 0.5 * np.exp(-t * 300) * np.sin(2 * np.pi * f0 * t)))
+        n += length
+    return (0.3 * np.concatenate(cycles)).astype(np.float32)
+
@@ -0,0 +1,75 @@
+import numpy as np
+from numba import njit
+
+from pitch_estimators import PitchEstimator
+
+
+@njit(cache=True)
+def yin_kernel(frames, win_length, min_period, max_period, threshold):
+    # 프레임별 YIN: 누적 평균 정규화 차분 -> 절대 임계값 -> 포물선 보간
+    # 비교하는 두 창 x[o:o+W], x[o+tau:o+tau+W]는 프레임 중심에 맞춤 (앞쪽에 두면 추정이 W/2만큼 어긋남)
+    n_frames, frame_length = frames.shape
+    periods = np.zeros(n_frames)
+    aperiodicity = np.ones(n_frames)
+    cmnd = np.empty(max_period + 2)
+    for i in range(n_frames):
+        x = frames[i]
+        cmnd[0] = 1.0
+        running = 0.0
+        for tau in range(1, max_period + 2):
+            d = 0.0
+            offset = frame_length // 2 - (win_length + tau) // 2
+            for j in range(offset, offset + win_length):
+                diff = x[j] - x[j + tau]
+                d += diff * diff
+            running += d
+            cmnd[tau] = d * tau / running if running > 0.0 else 1.0
+
+        # 임계값 아래 첫 골짜기, 없으면 전역 최소
+        best = -1
+        for tau in range(min_period, max_period + 1):
+            if cmnd[tau] < threshold:
+                while tau + 1 <= max_period and cmnd[tau + 1] < cmnd[tau]:
+                    tau += 1
+                best = tau
+                break
+        if best < 0:
+            best = min_period
+            for tau in range(min_period + 1, max_period + 1):
+                if cmnd[tau] < cmnd[best]:
+                    best = tau
+
+        a = cmnd[best - 1]
+        b = cmnd[best]
+        c = cmnd[best + 1]
+        denom = a + c - 2.0 * b
+        shift = 0.5 * (a - c) / denom if abs(denom) > 1e-12 else 0.0
+        if abs(shift) > 1.0:
+            shift = 0.0
+        periods[i] = best + shift
+        aperiodicity[i] = b
+    return periods, aperiodicity
+
+
+class NumbaYIN(PitchEstimator):
+    """YIN with a numba-compiled per-frame kernel (no FFT, no HMM).
+
+    Voicing is ``aperiodicity < threshold``; confidence is ``1 - aperiodicity``.
+    """
+
+    def __init__(self, sr, fmin, fmax, frame_length=2048, hop_length=512, threshold=0.15):
+        super().__init__(sr, frame_length, hop_length)
+        self.threshold = threshold
+        self.win_length = frame_length // 2
+        self.min_period = max(int(np.floor(sr / fmax)), 1)
+        self.max_period = min(int(np.ceil(sr / fmin)), frame_length - self.win_length - 2)
+
+    def _analyze(self, first, frames):
+        periods, aperiodicity = yin_kernel(
+            np.ascontiguousarray(frames, dtype=np.float64),
+            self.win_length, self.min_period, self.max_period, self.threshold
+        )
+        voiced = aperiodicity < self.threshold
+        confidence = np.clip(1.0 - aperiodicity, 0.0, 1.0)
+        index = np.arange(first, first + len(periods))
+        return self._frames(index, self.sr / periods, voiced, confidence)